@@ -31,6 +31,14 @@ from azext_alias.hooks import (
 # This cache saves the entire command table globally so custom.py can have access to it.
 # Alter this cache through cache_reserved_commands(load_cmd_tbl_func) in util.py
 cached_reserved_commands = []
+# A dictionary of every word in cached_reserved_commands to the command levels at which the word appears.
+# Alter this cache through get_reserved_command_levels() in util.py
+cached_reserved_command_levels = {}
+# The sorted word-aligned suffixes of cached_reserved_commands along with their parent commands.
+# Alter this cache through get_reserved_command_suffixes() in util.py
+cached_reserved_command_suffixes = {}
+# The version stamp of the Azure CLI and extensions that cached_reserved_commands are loaded from
+cached_reserved_commands_version = ''
 
 
 class AliasExtCommandLoader(AzCommandsLoader):
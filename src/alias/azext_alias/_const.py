@@ -9,10 +9,13 @@ from azure.cli.core._environment import get_config_dir
 
 GLOBAL_CONFIG_DIR = get_config_dir()
 ALIAS_FILE_NAME = 'alias'
-ALIAS_HASH_FILE_NAME = 'alias.sha1'
-COLLIDED_ALIAS_FILE_NAME = 'collided_alias'
-ALIAS_TAB_COMP_TABLE_FILE_NAME = 'alias_tab_completion'
-GLOBAL_ALIAS_TAB_COMP_TABLE_PATH = os.path.join(GLOBAL_CONFIG_DIR, ALIAS_TAB_COMP_TABLE_FILE_NAME)
+ALIAS_CACHE_FILE_NAME = 'alias_cache'
+ALIAS_CACHE_MAGIC = b'AZALIAS\x00'
+ALIAS_CACHE_FORMAT_VERSION = 1
+# The files replaced by the alias cache file
+LEGACY_ALIAS_CACHE_FILE_NAMES = ['alias.sha1', 'collided_alias', 'alias_tab_completion']
+RESERVED_COMMAND_INDEX_FILE_NAME = 'alias_reserved_command_index'
+GLOBAL_RESERVED_COMMAND_INDEX_PATH = os.path.join(GLOBAL_CONFIG_DIR, RESERVED_COMMAND_INDEX_FILE_NAME)
 COLLISION_CHECK_LEVEL_DEPTH = 5
 
 INSUFFICIENT_POS_ARG_ERROR = 'alias: "{}" takes exactly {} positional argument{} ({} given)'
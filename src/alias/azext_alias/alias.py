@@ -4,21 +4,23 @@
 # --------------------------------------------------------------------------------------------
 
 import os
-import re
 import json
 import shlex
+import struct
 import hashlib
+import tempfile
 from collections import defaultdict
 
 from knack.log import get_logger
 
-import azext_alias
 from azext_alias import telemetry
 from azext_alias._const import (
     GLOBAL_CONFIG_DIR,
     ALIAS_FILE_NAME,
-    ALIAS_HASH_FILE_NAME,
-    COLLIDED_ALIAS_FILE_NAME,
+    ALIAS_CACHE_FILE_NAME,
+    ALIAS_CACHE_MAGIC,
+    ALIAS_CACHE_FORMAT_VERSION,
+    LEGACY_ALIAS_CACHE_FILE_NAMES,
     CONFIG_PARSING_ERROR,
     DEBUG_MSG,
     COLLISION_CHECK_LEVEL_DEPTH,
@@ -28,14 +30,18 @@ from azext_alias.argument import build_pos_args_table, render_template
 from azext_alias.util import (
     is_alias_command,
     cache_reserved_commands,
+    get_reserved_command_levels,
     get_config_parser,
+    build_alias_index,
     build_tab_completion_table
 )
 
 
 GLOBAL_ALIAS_PATH = os.path.join(GLOBAL_CONFIG_DIR, ALIAS_FILE_NAME)
-GLOBAL_ALIAS_HASH_PATH = os.path.join(GLOBAL_CONFIG_DIR, ALIAS_HASH_FILE_NAME)
-GLOBAL_COLLIDED_ALIAS_PATH = os.path.join(GLOBAL_CONFIG_DIR, COLLIDED_ALIAS_FILE_NAME)
+GLOBAL_ALIAS_CACHE_PATH = os.path.join(GLOBAL_CONFIG_DIR, ALIAS_CACHE_FILE_NAME)
+
+# The alias cache file starts with a fixed-size header: magic bytes, format version and payload length
+ALIAS_CACHE_HEADER = struct.Struct('<8sII')
 
 logger = get_logger(__name__)
 
@@ -48,46 +54,48 @@ class AliasManager(object):
         self.collided_alias = defaultdict(list)
         self.alias_config_str = ''
         self.alias_config_hash = ''
+        self.alias_cache = {}
+        self.alias_index = build_alias_index(self.alias_table)
+        self.tab_completion_table = {}
         self.load_alias_table()
         self.load_alias_hash()
 
     def load_alias_table(self):
         """
-        Load (create, if not exist) the alias config file.
+        Load (create, if not exist) the alias config file, along with the alias cache.
+
+        The alias config file is only parsed if the alias cache was not built from it.
         """
         try:
             # w+ creates the alias config file if it does not exist
             open_mode = 'r+' if os.path.exists(GLOBAL_ALIAS_PATH) else 'w+'
             with open(GLOBAL_ALIAS_PATH, open_mode) as alias_config_file:
                 self.alias_config_str = alias_config_file.read()
-            self.alias_table.read(GLOBAL_ALIAS_PATH)
-            telemetry.set_number_of_aliases_registered(len(self.alias_table.sections()))
+            alias_config_sha1 = hashlib.sha1(self.alias_config_str.encode('utf-8')).hexdigest()
+            self.alias_cache = AliasManager.load_alias_cache()
+            if self.alias_cache.get('hash') == alias_config_sha1:
+                self.alias_index = self.alias_cache['alias_index']
+            else:
+                self.alias_table.read(GLOBAL_ALIAS_PATH)
+                self.alias_index = build_alias_index(self.alias_table, alias_config_sha1)
+            telemetry.set_number_of_aliases_registered(len(self.alias_index['aliases']))
         except Exception as exception:  # pylint: disable=broad-except
             logger.warning(CONFIG_PARSING_ERROR, AliasManager.process_exception_message(exception))
             self.alias_table = get_config_parser()
+            self.alias_index = build_alias_index(self.alias_table)
             telemetry.set_exception(exception)
 
     def load_alias_hash(self):
         """
-        Load (create, if not exist) the alias hash file.
+        Load the hash of the alias config file that the alias cache was built from.
         """
-        # w+ creates the alias hash file if it does not exist
-        open_mode = 'r+' if os.path.exists(GLOBAL_ALIAS_HASH_PATH) else 'w+'
-        with open(GLOBAL_ALIAS_HASH_PATH, open_mode) as alias_config_hash_file:
-            self.alias_config_hash = alias_config_hash_file.read()
+        self.alias_config_hash = self.alias_cache.get('hash', '')
 
     def load_collided_alias(self):
         """
-        Load (create, if not exist) the collided alias file.
+        Load the collided aliases from the alias cache.
         """
-        # w+ creates the alias config file if it does not exist
-        open_mode = 'r+' if os.path.exists(GLOBAL_COLLIDED_ALIAS_PATH) else 'w+'
-        with open(GLOBAL_COLLIDED_ALIAS_PATH, open_mode) as collided_alias_file:
-            collided_alias_str = collided_alias_file.read()
-            try:
-                self.collided_alias = json.loads(collided_alias_str if collided_alias_str else '{}')
-            except Exception:  # pylint: disable=broad-except
-                self.collided_alias = {}
+        self.collided_alias = self.alias_cache.get('collided_alias', {})
 
     def detect_alias_config_change(self):
         """
@@ -118,16 +126,18 @@ class AliasManager(object):
         Returns:
             A list of transformed commands according to the alias configuration file.
         """
+        # The alias cache is left untouched, so next run will check the config file against the entire
+        # command table again (unless the config file is reverted to the one that the cache was built from)
         if self.parse_error():
-            # Write an empty hash so next run will check the config file against the entire command table again
-            AliasManager.write_alias_config_hash(empty_hash=True)
             return args
 
         # Only load the entire command table if it detects changes in the alias config
-        if self.detect_alias_config_change():
+        alias_config_changed = self.detect_alias_config_change()
+        if alias_config_changed:
             self.load_full_command_table()
             self.collided_alias = AliasManager.build_collision_table(self.alias_table.sections())
-            build_tab_completion_table(self.alias_table)
+            self.tab_completion_table = build_tab_completion_table(self.alias_table,
+                                                                   self.alias_cache.get('tab_completion_table'))
         else:
             self.load_collided_alias()
 
@@ -146,8 +156,8 @@ class AliasManager(object):
 
             full_alias = self.get_full_alias(alias)
 
-            if self.alias_table.has_option(full_alias, 'command'):
-                cmd_derived_from_alias = self.alias_table.get(full_alias, 'command')
+            cmd_derived_from_alias = self.alias_index['aliases'].get(full_alias)
+            if cmd_derived_from_alias is not None:
                 telemetry.set_alias_hit(full_alias)
             else:
                 transformed_commands.append(alias)
@@ -163,9 +173,15 @@ class AliasManager(object):
                     next(alias_iter)
             else:
                 logger.debug(DEBUG_MSG, full_alias, cmd_derived_from_alias)
-                transformed_commands += shlex.split(cmd_derived_from_alias)
-
-        return self.post_transform(transformed_commands)
+                split_command = self.alias_index['split_commands'].get(full_alias)
+                transformed_commands += split_command if split_command is not None \
+                    else shlex.split(cmd_derived_from_alias)
+
+        post_transform_commands = self.post_transform(transformed_commands)
+        if alias_config_changed:
+            AliasManager.write_alias_cache(self.alias_config_hash, self.alias_index, self.collided_alias,
+                                           self.tab_completion_table)
+        return post_transform_commands
 
     def get_full_alias(self, query):
         """
@@ -177,14 +193,15 @@ class AliasManager(object):
         Returns:
             The full alias (with the placeholders, if any).
         """
-        if query in self.alias_table.sections():
+        if query in self.alias_index['aliases']:
             return query
 
-        return next((section for section in self.alias_table.sections() if section.split()[0] == query), '')
+        return self.alias_index['first_words'].get(query, '')
 
     def load_full_command_table(self):
         """
         Perform a full load of the command table to get all the reserved command words.
+        The full load is skipped if the reserved commands of the installed Azure CLI and extensions are persisted.
         """
         load_cmd_tbl_func = self.kwargs.get('load_cmd_tbl_func', lambda _: {})
         cache_reserved_commands(load_cmd_tbl_func)
@@ -192,7 +209,7 @@ class AliasManager(object):
 
     def post_transform(self, args):
         """
-        Inject environment variables, and write hash to alias hash file after transforming alias to commands.
+        Inject environment variables after transforming alias to commands.
 
         Args:
             args: A list of args to post-transform.
@@ -208,9 +225,6 @@ class AliasManager(object):
             else:
                 post_transform_commands.append(os.path.expandvars(arg))
 
-        AliasManager.write_alias_config_hash(self.alias_config_hash)
-        AliasManager.write_collided_alias(self.collided_alias)
-
         return post_transform_commands
 
     def parse_error(self):
@@ -218,12 +232,12 @@ class AliasManager(object):
         Check if there is a configuration parsing error.
 
         A parsing error has occurred if there are strings inside the alias config file
-        but there is no alias loaded in self.alias_table.
+        but there is no alias loaded in self.alias_index.
 
         Returns:
             True if there is an error parsing the alias configuration file. Otherwises, false.
         """
-        return not self.alias_table.sections() and self.alias_config_str
+        return not self.alias_index['aliases'] and self.alias_config_str
 
     @staticmethod
     def build_collision_table(aliases, levels=COLLISION_CHECK_LEVEL_DEPTH):
@@ -246,41 +260,96 @@ class AliasManager(object):
             levels: the amount of levels we tranverse through the command table tree.
         """
         collided_alias = defaultdict(list)
+        reserved_command_levels = get_reserved_command_levels()
         for alias in aliases:
             # Only care about the first word in the alias because alias
             # cannot have spaces (unless they have positional arguments)
             word = alias.split()[0]
-            for level in range(1, levels + 1):
-                collision_regex = r'^{}{}($|\s)'.format(r'([a-z\-]*\s)' * (level - 1), word.lower())
-                if list(filter(re.compile(collision_regex).match, azext_alias.cached_reserved_commands)) \
-                        and level not in collided_alias[word]:
+            for level in reserved_command_levels.get(word.lower(), []):
+                if level <= levels and level not in collided_alias[word]:
                     collided_alias[word].append(level)
 
         telemetry.set_collided_aliases(list(collided_alias.keys()))
         return collided_alias
 
     @staticmethod
-    def write_alias_config_hash(alias_config_hash='', empty_hash=False):
+    def load_alias_cache():
         """
-        Write self.alias_config_hash to the alias hash file.
+        Load the alias cache file with a single read.
 
-        Args:
-            empty_hash: True if we want to write an empty string into the file. Empty string in the alias hash file
-                means that we have to perform a full load of the command table in the next run.
+        The alias cache file consists of a fixed-size header (magic bytes, format version and payload length)
+        followed by a JSON payload:
+        {
+            "hash": "<SHA1 of the alias configuration file that the cache is built from>",
+            "alias_index": <the alias index, see build_alias_index()>,
+            "collided_alias": <the collision table, see build_collision_table()>,
+            "tab_completion_table": <the tab completion table, see build_tab_completion_table()>
+        }
+
+        Returns:
+            The alias cache, or an empty dictionary if the alias cache file does not exist or is invalid.
         """
-        with open(GLOBAL_ALIAS_HASH_PATH, 'w') as alias_config_hash_file:
-            alias_config_hash_file.write('' if empty_hash else alias_config_hash)
+        try:
+            with open(GLOBAL_ALIAS_CACHE_PATH, 'rb') as alias_cache_file:
+                alias_cache_bytes = alias_cache_file.read()
+            magic, format_version, payload_length = ALIAS_CACHE_HEADER.unpack_from(alias_cache_bytes)
+            if magic != ALIAS_CACHE_MAGIC or format_version != ALIAS_CACHE_FORMAT_VERSION or \
+                    payload_length != len(alias_cache_bytes) - ALIAS_CACHE_HEADER.size:
+                return {}
+            alias_cache = json.loads(alias_cache_bytes[ALIAS_CACHE_HEADER.size:].decode('utf-8'))
+        except Exception:  # pylint: disable=broad-except
+            return {}
+
+        if not isinstance(alias_cache, dict) or \
+                not all(key in alias_cache for key in ['hash', 'alias_index', 'collided_alias', 'tab_completion_table']):
+            return {}
+        return alias_cache
 
     @staticmethod
-    def write_collided_alias(collided_alias_dict):
+    def write_alias_cache(alias_config_hash, alias_index, collided_alias, tab_completion_table):
         """
-        Write the collided aliases string into the collided alias file.
+        Atomically replace the alias cache file, so concurrent runs never read a partially written cache.
+        The hash, collided alias and tab completion files that the alias cache replaced are removed.
+
+        Args:
+            alias_config_hash: The hash of the alias config file that the cache is built from.
+            alias_index: The alias index.
+            collided_alias: The collision table.
+            tab_completion_table: The tab completion table.
         """
-        # w+ creates the alias config file if it does not exist
-        open_mode = 'r+' if os.path.exists(GLOBAL_COLLIDED_ALIAS_PATH) else 'w+'
-        with open(GLOBAL_COLLIDED_ALIAS_PATH, open_mode) as collided_alias_file:
-            collided_alias_file.truncate()
-            collided_alias_file.write(json.dumps(collided_alias_dict))
+        payload = json.dumps({
+            'hash': alias_config_hash,
+            'alias_index': alias_index,
+            'collided_alias': collided_alias,
+            'tab_completion_table': tab_completion_table
+        }).encode('utf-8')
+
+        alias_cache_dir = os.path.dirname(GLOBAL_ALIAS_CACHE_PATH)
+        fd, temp_path = tempfile.mkstemp(dir=alias_cache_dir, prefix=ALIAS_CACHE_FILE_NAME)
+        try:
+            with os.fdopen(fd, 'wb') as alias_cache_file:
+                alias_cache_file.write(ALIAS_CACHE_HEADER.pack(ALIAS_CACHE_MAGIC, ALIAS_CACHE_FORMAT_VERSION,
+                                                               len(payload)))
+                alias_cache_file.write(payload)
+            if hasattr(os, 'replace'):
+                os.replace(temp_path, GLOBAL_ALIAS_CACHE_PATH)
+            else:
+                # Python 2.x: os.rename does not overwrite existing files on Windows
+                if os.name == 'nt' and os.path.exists(GLOBAL_ALIAS_CACHE_PATH):
+                    os.remove(GLOBAL_ALIAS_CACHE_PATH)
+                os.rename(temp_path, GLOBAL_ALIAS_CACHE_PATH)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        for legacy_file_name in LEGACY_ALIAS_CACHE_FILE_NAMES:
+            legacy_path = os.path.join(alias_cache_dir, legacy_file_name)
+            try:
+                if os.path.exists(legacy_path):
+                    os.remove(legacy_path)
+            except OSError:
+                pass
 
     @staticmethod
     def process_exception_message(exception):
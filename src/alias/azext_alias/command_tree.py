@@ -3,6 +3,12 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import re
+from collections import defaultdict
+
+# Words that a command group can consist of when looking up the level of a command word
+COMMAND_GROUP_REGEX = re.compile(r'^[a-z\-]*$')
+
 
 class CommandTree(object):
     """ a command tree """
@@ -54,6 +60,23 @@ class CommandTree(object):
                 leftover_args.append(arg)
         return tree, ' '.join(current_command), leftover_args
 
+    def get_levels(self):
+        """ returns a dictionary of every word in the tree to the levels at which the word appears """
+        levels = defaultdict(list)
+        level = 1
+        branches = list(self.children.values())
+        while branches:
+            next_branches = []
+            for branch in branches:
+                if level not in levels[branch.data]:
+                    levels[branch.data].append(level)
+                # Only descend into words that can be part of a command group
+                if COMMAND_GROUP_REGEX.match(branch.data):
+                    next_branches.extend(branch.children.values())
+            branches = next_branches
+            level += 1
+        return dict(levels)
+
 
 class CommandHead(CommandTree):
     """ represents the head of the tree, no data"""
@@ -66,3 +89,15 @@ class CommandBranch(CommandTree):
     """ represents a branch of the tree """
     def __init__(self, data, children=None):
         CommandTree.__init__(self, data, children=children)
+
+
+def build_command_tree(commands):
+    """ builds a command tree out of a list of space-delimited commands """
+    head = CommandHead()
+    for command in commands:
+        tree = head
+        for word in command.split(' '):
+            if not tree.has_child(word):
+                tree.add_child(CommandBranch(word))
+            tree = tree.get_child(word)
+    return head
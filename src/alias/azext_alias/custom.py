@@ -15,6 +15,7 @@ from azext_alias.util import (
     get_alias_table,
     is_url,
     build_tab_completion_table,
+    build_alias_index,
     get_config_parser,
     retrieve_file_from_url
 )
@@ -122,7 +123,7 @@ def remove_all_aliases():
 def _commit_change(alias_table, export_path=None, post_commit=True):
     """
     Record changes to the alias table.
-    Also write new alias config hash and collided alias, if any.
+    Also write the alias cache (alias config hash, alias index, collided alias and tab completion table).
 
     Args:
         alias_table: The alias table to commit.
@@ -134,7 +135,8 @@ def _commit_change(alias_table, export_path=None, post_commit=True):
         if post_commit:
             alias_config_file.seek(0)
             alias_config_hash = hashlib.sha1(alias_config_file.read().encode('utf-8')).hexdigest()
-            AliasManager.write_alias_config_hash(alias_config_hash)
-            collided_alias = AliasManager.build_collision_table(alias_table.sections())
-            AliasManager.write_collided_alias(collided_alias)
-            build_tab_completion_table(alias_table)
+            previous_tab_completion_table = AliasManager.load_alias_cache().get('tab_completion_table')
+            AliasManager.write_alias_cache(alias_config_hash,
+                                           build_alias_index(alias_table, alias_config_hash),
+                                           AliasManager.build_collision_table(alias_table.sections()),
+                                           build_tab_completion_table(alias_table, previous_tab_completion_table))
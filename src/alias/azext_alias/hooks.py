@@ -3,7 +3,6 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
-import json
 import timeit
 
 from knack.log import get_logger
@@ -16,7 +15,7 @@ from azext_alias.util import (
     get_alias_table,
     filter_aliases
 )
-from azext_alias._const import DEBUG_MSG_WITH_TIMING, GLOBAL_ALIAS_TAB_COMP_TABLE_PATH
+from azext_alias._const import DEBUG_MSG_WITH_TIMING
 from azext_alias.command_tree import CommandBranch
 
 logger = get_logger(__name__)
@@ -62,9 +61,11 @@ def enable_aliases_autocomplete(_, **kwargs):
     # Transform aliases if they are in current commands,
     # so parser can get the correct subparser when chaining aliases
     _transform_cur_commands(cur_commands, alias_table=alias_table)
+    tab_completion_table = AliasManager.load_alias_cache().get('tab_completion_table', {}).get('table', {})
 
     for alias, alias_command in filter_aliases(alias_table):
-        if alias.startswith(prefix) and alias.strip() != prefix and _is_autocomplete_valid(cur_commands, alias_command):
+        if alias.startswith(prefix) and alias.strip() != prefix and \
+                _is_autocomplete_valid(cur_commands, alias_command, tab_completion_table):
             # Only autocomplete the first word because alias is space-delimited
             external_completions.append(alias)
 
@@ -104,25 +105,20 @@ def enable_aliases_autocomplete_interactive(_, **kwargs):
             subtree.add_child(CommandBranch(alias))
 
 
-def _is_autocomplete_valid(cur_commands, alias_command):
+def _is_autocomplete_valid(cur_commands, alias_command, tab_completion_table):
     """
     Determine whether autocomplete can be performed at the current state.
 
     Args:
-        parser: The current CLI parser.
         cur_commands: The current commands typed in the console.
         alias_command: The alias command.
+        tab_completion_table: The tab completion table of the alias cache.
 
     Returns:
         True if autocomplete can be performed.
     """
     parent_command = ' '.join(cur_commands[1:])
-    with open(GLOBAL_ALIAS_TAB_COMP_TABLE_PATH, 'r') as tab_completion_table_file:
-        try:
-            tab_completion_table = json.loads(tab_completion_table_file.read())
-            return alias_command in tab_completion_table and parent_command in tab_completion_table[alias_command]
-        except Exception:  # pylint: disable=broad-except
-            return False
+    return alias_command in tab_completion_table and parent_command in tab_completion_table[alias_command]
 
 
 def _transform_cur_commands(cur_commands, alias_table=None):
@@ -8,6 +8,8 @@
 import os
 import sys
 import shlex
+import shutil
+import tempfile
 import unittest
 from mock import Mock, patch
 from six.moves import configparser
@@ -15,6 +17,8 @@ from six.moves import configparser
 from knack.util import CLIError
 
 import azext_alias
+from azext_alias.util import build_alias_index, get_config_parser
+from azext_alias._const import ALIAS_FILE_NAME, ALIAS_CACHE_FILE_NAME
 from azext_alias.tests._const import (DEFAULT_MOCK_ALIAS_STRING,
                                       COLLISION_MOCK_ALIAS_STRING,
                                       TEST_RESERVED_COMMANDS,
@@ -148,13 +152,15 @@ TEST_FN = {
 class TestAlias(unittest.TestCase):
 
     def setUp(self):
-        azext_alias.alias.AliasManager.write_alias_config_hash = Mock()
-        azext_alias.alias.AliasManager.write_collided_alias = Mock()
-        self.patcher = patch('azext_alias.cached_reserved_commands', TEST_RESERVED_COMMANDS)
-        self.patcher.start()
+        self.patchers = []
+        self.patchers.append(patch.object(azext_alias.alias.AliasManager, 'write_alias_cache', Mock()))
+        self.patchers.append(patch.multiple('azext_alias', cached_reserved_commands=TEST_RESERVED_COMMANDS, cached_reserved_command_levels={}, cached_reserved_command_suffixes={}, cached_reserved_commands_version=''))
+        for patcher in self.patchers:
+            patcher.start()
 
     def tearDown(self):
-        self.patcher.stop()
+        for patcher in self.patchers:
+            patcher.stop()
 
     def test_build_empty_collision_table(self):
         alias_manager = self.get_alias_manager(DEFAULT_MOCK_ALIAS_STRING)
@@ -180,6 +186,12 @@ class TestAlias(unittest.TestCase):
         alias_manager.alias_config_str = ''
         self.assertTrue(alias_manager.detect_alias_config_change())
 
+    def test_get_full_alias(self):
+        alias_manager = self.get_alias_manager()
+        self.assertEqual('ac', alias_manager.get_full_alias('ac'))
+        self.assertEqual('cp {{ arg_1 }} {{ arg_2 }}', alias_manager.get_full_alias('cp'))
+        self.assertEqual('', alias_manager.get_full_alias('account'))
+
     """
     Helper functions
     """
@@ -197,6 +209,75 @@ class TestAlias(unittest.TestCase):
         self.assertEqual(shlex.split(value[1]), alias_manager.post_transform(shlex.split(value[0])))
 
 
+class TestAliasCache(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_config_dir = tempfile.mkdtemp()
+        self.mock_alias_path = os.path.join(self.mock_config_dir, ALIAS_FILE_NAME)
+        self.mock_alias_cache_path = os.path.join(self.mock_config_dir, ALIAS_CACHE_FILE_NAME)
+        self.patchers = []
+        self.patchers.append(patch('azext_alias.alias.GLOBAL_ALIAS_PATH', self.mock_alias_path))
+        self.patchers.append(patch('azext_alias.alias.GLOBAL_ALIAS_CACHE_PATH', self.mock_alias_cache_path))
+        self.patchers.append(patch.multiple('azext_alias', cached_reserved_commands=TEST_RESERVED_COMMANDS, cached_reserved_command_levels={}, cached_reserved_command_suffixes={}, cached_reserved_commands_version=''))
+        for patcher in self.patchers:
+            patcher.start()
+        with open(self.mock_alias_path, 'w') as alias_config_file:
+            alias_config_file.write(DEFAULT_MOCK_ALIAS_STRING)
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        shutil.rmtree(self.mock_config_dir)
+
+    def test_alias_cache_round_trip(self):
+        tab_completion_table = {'version': 'test-version', 'table': {'account': ['']}}
+        azext_alias.alias.AliasManager.write_alias_cache('test-hash', build_alias_index(get_config_parser()), {'account': [1]}, tab_completion_table)
+        self.assertDictEqual({
+            'hash': 'test-hash',
+            'alias_index': build_alias_index(get_config_parser()),
+            'collided_alias': {'account': [1]},
+            'tab_completion_table': tab_completion_table
+        }, azext_alias.alias.AliasManager.load_alias_cache())
+        self.assertListEqual([ALIAS_FILE_NAME, ALIAS_CACHE_FILE_NAME], sorted(os.listdir(self.mock_config_dir)))
+
+    def test_legacy_alias_cache_files_removed(self):
+        for legacy_file_name in ['alias.sha1', 'collided_alias', 'alias_tab_completion']:
+            with open(os.path.join(self.mock_config_dir, legacy_file_name), 'w') as legacy_file:
+                legacy_file.write('{}')
+        azext_alias.alias.AliasManager.write_alias_cache('test-hash', {}, {}, {})
+        self.assertListEqual([ALIAS_FILE_NAME, ALIAS_CACHE_FILE_NAME], sorted(os.listdir(self.mock_config_dir)))
+
+    def test_load_invalid_alias_cache(self):
+        self.assertDictEqual({}, azext_alias.alias.AliasManager.load_alias_cache())
+
+        azext_alias.alias.AliasManager.write_alias_cache('test-hash', {}, {}, {})
+        with open(self.mock_alias_cache_path, 'rb') as alias_cache_file:
+            alias_cache_bytes = alias_cache_file.read()
+        for invalid_alias_cache_bytes in [b'', b'invalid', alias_cache_bytes[:-1], b'X' + alias_cache_bytes[1:]]:
+            with open(self.mock_alias_cache_path, 'wb') as alias_cache_file:
+                alias_cache_file.write(invalid_alias_cache_bytes)
+            self.assertDictEqual({}, azext_alias.alias.AliasManager.load_alias_cache())
+
+    def test_alias_cache_warm_path(self):
+        with patch.object(azext_alias.alias.AliasManager, 'write_alias_cache', wraps=azext_alias.alias.AliasManager.write_alias_cache) as mock_write_alias_cache:
+            alias_manager = azext_alias.alias.AliasManager()
+            self.assertEqual(['account', 'list'], alias_manager.transform(['ac', 'list']))
+            self.assertEqual(1, mock_write_alias_cache.call_count)
+
+            # The alias config file is neither parsed nor is the alias cache rewritten if the alias config is unchanged
+            alias_manager = azext_alias.alias.AliasManager()
+            self.assertFalse(alias_manager.alias_table.sections())
+            self.assertEqual(['account', 'list'], alias_manager.transform(['ac', 'list']))
+            self.assertEqual(1, mock_write_alias_cache.call_count)
+
+            with open(self.mock_alias_path, 'a') as alias_config_file:
+                alias_config_file.write('[grp]\ncommand = group\n')
+            alias_manager = azext_alias.alias.AliasManager()
+            self.assertEqual(['group', 'list'], alias_manager.transform(['grp', 'list']))
+            self.assertEqual(2, mock_write_alias_cache.call_count)
+            self.assertIn('grp', azext_alias.alias.AliasManager.load_alias_cache()['alias_index']['aliases'])
+
+
 class MockAliasManager(azext_alias.alias.AliasManager):
 
     def load_alias_table(self):
@@ -212,6 +293,7 @@ class MockAliasManager(azext_alias.alias.AliasManager):
                 self.alias_table.readfp(StringIO(self.alias_config_str))
         except Exception:  # pylint: disable=broad-except
             self.alias_table = configparser.ConfigParser()
+        self.alias_index = build_alias_index(self.alias_table)
 
     def load_alias_hash(self):
         import hashlib
@@ -0,0 +1,128 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# pylint: disable=line-too-long,no-self-use
+
+import os
+import json
+import shlex
+import shutil
+import timeit
+import hashlib
+import tempfile
+import unittest
+from mock import patch
+
+from knack.log import get_logger
+
+import azext_alias
+from azext_alias.util import get_config_parser
+from azext_alias._const import ALIAS_FILE_NAME, ALIAS_CACHE_FILE_NAME
+from azext_alias.tests._const import TEST_RESERVED_COMMANDS
+
+NUMBER_OF_ALIASES = 600
+NUMBER_OF_INVOCATIONS = 50
+TEST_ARGS = ['alias-599', 'list', '-otable']
+
+logger = get_logger(__name__)
+
+
+def legacy_invocation(config_dir, args):
+    """
+    Reproduce the per-invocation overhead of the alias extension before the alias cache was introduced:
+    parse the alias config file, read the alias hash file and the collided alias file, resolve aliases
+    with a linear scan over the alias table and rewrite the hash and collided alias files.
+    """
+    alias_path = os.path.join(config_dir, ALIAS_FILE_NAME)
+    alias_hash_path = os.path.join(config_dir, 'alias.sha1')
+    collided_alias_path = os.path.join(config_dir, 'collided_alias')
+
+    alias_table = get_config_parser()
+    with open(alias_path, 'r') as alias_config_file:
+        alias_config_str = alias_config_file.read()
+    alias_table.read(alias_path)
+    with open(alias_hash_path, 'a+') as alias_config_hash_file:
+        alias_config_hash_file.seek(0)
+        alias_config_hash = alias_config_hash_file.read()
+    with open(collided_alias_path, 'a+') as collided_alias_file:
+        collided_alias_file.seek(0)
+        collided_alias_str = collided_alias_file.read()
+        collided_alias = json.loads(collided_alias_str or '{}')
+
+    transformed_commands = []
+    for alias in args:
+        full_alias = next((section for section in alias_table.sections() if section.split()[0] == alias), '')
+        if alias not in collided_alias and alias_table.has_option(full_alias, 'command'):
+            transformed_commands += shlex.split(alias_table.get(full_alias, 'command'))
+        else:
+            transformed_commands.append(alias)
+
+    with open(alias_hash_path, 'w') as alias_config_hash_file:
+        alias_config_hash_file.write(alias_config_hash or hashlib.sha1(alias_config_str.encode('utf-8')).hexdigest())
+    with open(collided_alias_path, 'w') as collided_alias_file:
+        collided_alias_file.write(json.dumps(collided_alias))
+
+    return transformed_commands
+
+
+class TestAliasBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_config_dir = tempfile.mkdtemp()
+        self.patchers = []
+        self.patchers.append(patch('azext_alias.alias.GLOBAL_ALIAS_PATH', os.path.join(self.mock_config_dir, ALIAS_FILE_NAME)))
+        self.patchers.append(patch('azext_alias.alias.GLOBAL_ALIAS_CACHE_PATH', os.path.join(self.mock_config_dir, ALIAS_CACHE_FILE_NAME)))
+        self.patchers.append(patch.multiple('azext_alias', cached_reserved_commands=TEST_RESERVED_COMMANDS, cached_reserved_command_levels={}, cached_reserved_command_suffixes={}, cached_reserved_commands_version=''))
+        for patcher in self.patchers:
+            patcher.start()
+
+        alias_table = get_config_parser()
+        for i in range(NUMBER_OF_ALIASES):
+            alias_table.add_section('alias-{}'.format(i))
+            alias_table.set('alias-{}'.format(i), 'command', 'group show -n test-group-{}'.format(i))
+        with open(azext_alias.alias.GLOBAL_ALIAS_PATH, 'w') as alias_config_file:
+            alias_table.write(alias_config_file)
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        shutil.rmtree(self.mock_config_dir)
+
+    def test_per_invocation_overhead(self):
+        expected_args = ['group', 'show', '-n', 'test-group-599', 'list', '-otable']
+        self.assertEqual(expected_args, legacy_invocation(self.mock_config_dir, TEST_ARGS))
+        # The first invocation builds the alias cache
+        self.assertEqual(expected_args, azext_alias.alias.AliasManager().transform(list(TEST_ARGS)))
+
+        legacy_time = min(timeit.repeat(lambda: legacy_invocation(self.mock_config_dir, TEST_ARGS),
+                                        number=NUMBER_OF_INVOCATIONS, repeat=3))
+        cached_time = min(timeit.repeat(lambda: azext_alias.alias.AliasManager().transform(list(TEST_ARGS)),
+                                        number=NUMBER_OF_INVOCATIONS, repeat=3))
+        logger.warning('Per-invocation alias overhead with %d aliases: before %.3fms, after %.3fms',
+                       NUMBER_OF_ALIASES, legacy_time * 1000 / NUMBER_OF_INVOCATIONS,
+                       cached_time * 1000 / NUMBER_OF_INVOCATIONS)
+        self.assertLess(cached_time, legacy_time)
+
+    def test_warm_invocation_uses_alias_cache(self):
+        expected_args = ['group', 'show', '-n', 'test-group-599', 'list', '-otable']
+        # The first invocation builds the alias cache
+        self.assertEqual(expected_args, azext_alias.alias.AliasManager().transform(list(TEST_ARGS)))
+
+        # The other invocations only read the alias cache, without parsing the alias config file or checking
+        # the aliases against the command table
+        with patch.object(azext_alias.alias.AliasManager, 'write_alias_cache') as mock_write_alias_cache, \
+                patch.object(azext_alias.alias.AliasManager, 'build_collision_table') as mock_build_collision_table, \
+                patch.object(azext_alias.alias.AliasManager, 'load_full_command_table') as mock_load_full_command_table:
+            for _ in range(NUMBER_OF_INVOCATIONS):
+                alias_manager = azext_alias.alias.AliasManager()
+                self.assertFalse(alias_manager.alias_table.sections())
+                self.assertEqual(expected_args, alias_manager.transform(list(TEST_ARGS)))
+        mock_write_alias_cache.assert_not_called()
+        mock_build_collision_table.assert_not_called()
+        mock_load_full_command_table.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
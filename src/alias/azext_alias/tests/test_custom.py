@@ -23,7 +23,7 @@ from azext_alias.custom import (
 class AliasCustomCommandTest(unittest.TestCase):
 
     def setUp(self):
-        self.patcher = patch('azext_alias.cached_reserved_commands', TEST_RESERVED_COMMANDS)
+        self.patcher = patch.multiple('azext_alias', cached_reserved_commands=TEST_RESERVED_COMMANDS, cached_reserved_command_levels={}, cached_reserved_command_suffixes={}, cached_reserved_commands_version='')
         self.patcher.start()
         azext_alias.custom._commit_change = Mock()
 
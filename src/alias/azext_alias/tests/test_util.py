@@ -11,8 +11,17 @@ import tempfile
 import unittest
 import mock
 
-from azext_alias.util import remove_pos_arg_placeholders, build_tab_completion_table, get_config_parser
-from azext_alias._const import ALIAS_TAB_COMP_TABLE_FILE_NAME
+import azext_alias
+from azext_alias.util import (
+    remove_pos_arg_placeholders,
+    build_tab_completion_table,
+    build_alias_index,
+    get_config_parser,
+    get_reserved_command_levels,
+    get_parent_commands,
+    cache_reserved_commands
+)
+from azext_alias._const import RESERVED_COMMAND_INDEX_FILE_NAME
 from azext_alias.tests._const import TEST_RESERVED_COMMANDS
 
 
@@ -21,8 +30,8 @@ class TestUtil(unittest.TestCase):
     def setUp(self):
         self.mock_config_dir = tempfile.mkdtemp()
         self.patchers = []
-        self.patchers.append(mock.patch('azext_alias.util.GLOBAL_ALIAS_TAB_COMP_TABLE_PATH', os.path.join(self.mock_config_dir, ALIAS_TAB_COMP_TABLE_FILE_NAME)))
-        self.patchers.append(mock.patch('azext_alias.cached_reserved_commands', TEST_RESERVED_COMMANDS))
+        self.patchers.append(mock.patch('azext_alias.util.GLOBAL_RESERVED_COMMAND_INDEX_PATH', os.path.join(self.mock_config_dir, RESERVED_COMMAND_INDEX_FILE_NAME)))
+        self.patchers.append(mock.patch.multiple('azext_alias', cached_reserved_commands=TEST_RESERVED_COMMANDS, cached_reserved_command_levels={}, cached_reserved_command_suffixes={}, cached_reserved_commands_version=''))
         for patcher in self.patchers:
             patcher.start()
 
@@ -55,12 +64,117 @@ class TestUtil(unittest.TestCase):
         mock_alias_table.set('al', 'command', 'account list-locations')
         tab_completion_table = build_tab_completion_table(mock_alias_table)
         self.assertDictEqual({
-            'account': ['', 'storage'],
-            'list-locations': ['account'],
-            'network': [''],
-            'account list-locations': ['']
+            'version': '',
+            'table': {
+                'account': ['', 'storage'],
+                'list-locations': ['account'],
+                'network': [''],
+                'account list-locations': ['']
+            }
         }, tab_completion_table)
 
+    @mock.patch('azext_alias.cached_reserved_commands_version', 'azure-cli-core==2.0.0')
+    def test_build_tab_completion_table_incremental(self):
+        mock_alias_table = get_config_parser()
+        mock_alias_table.add_section('ac')
+        mock_alias_table.set('ac', 'command', 'account')
+        mock_alias_table.add_section('n')
+        mock_alias_table.set('n', 'command', 'network')
+        tab_completion_table = build_tab_completion_table(mock_alias_table)
+
+        mock_alias_table.remove_section('n')
+        mock_alias_table.add_section('ll')
+        mock_alias_table.set('ll', 'command', 'list-locations')
+        with mock.patch('azext_alias.util.get_parent_commands', wraps=get_parent_commands) as mock_get_parent_commands:
+            tab_completion_table = build_tab_completion_table(mock_alias_table, tab_completion_table)
+            # Only the entry of the newly added alias command should be computed
+            mock_get_parent_commands.assert_called_once_with('list-locations')
+        self.assertDictEqual({
+            'version': 'azure-cli-core==2.0.0',
+            'table': {
+                'account': ['', 'storage'],
+                'list-locations': ['account']
+            }
+        }, tab_completion_table)
+
+        # The entire table should be rebuilt if the reserved commands change
+        with mock.patch('azext_alias.cached_reserved_commands_version', 'azure-cli-core==2.0.1'), \
+                mock.patch('azext_alias.util.get_parent_commands', wraps=get_parent_commands) as mock_get_parent_commands:
+            build_tab_completion_table(mock_alias_table, tab_completion_table)
+            self.assertEqual(2, mock_get_parent_commands.call_count)
+
+    def test_get_parent_commands(self):
+        self.assertListEqual(['', 'storage'], get_parent_commands('account'))
+        self.assertListEqual([''], get_parent_commands('account list-locations'))
+        self.assertListEqual(['storage account'], get_parent_commands('create'))
+        self.assertListEqual([], get_parent_commands('acc'))
+        self.assertListEqual([], get_parent_commands('list'))
+
+    def test_build_alias_index(self):
+        mock_alias_table = get_config_parser()
+        mock_alias_table.add_section('ac')
+        mock_alias_table.set('ac', 'command', 'account')
+        mock_alias_table.add_section('cp {{ arg_1 }}')
+        mock_alias_table.set('cp {{ arg_1 }}', 'command', 'storage blob copy start --source-uri {{ arg_1 }}')
+        mock_alias_table.add_section('cp')
+        mock_alias_table.set('cp', 'command', 'storage blob copy start')
+        mock_alias_table.add_section('ls')
+        mock_alias_table.set('ls', 'cmmand', 'list')
+        self.assertDictEqual({
+            'hash': 'test-hash',
+            'aliases': {
+                'ac': 'account',
+                'cp {{ arg_1 }}': 'storage blob copy start --source-uri {{ arg_1 }}',
+                'cp': 'storage blob copy start',
+                'ls': None
+            },
+            'first_words': {
+                'ac': 'ac',
+                'cp': 'cp {{ arg_1 }}',
+                'ls': 'ls'
+            },
+            'split_commands': {
+                'ac': ['account'],
+                'cp {{ arg_1 }}': ['storage', 'blob', 'copy', 'start', '--source-uri', '{{', 'arg_1', '}}'],
+                'cp': ['storage', 'blob', 'copy', 'start']
+            }
+        }, build_alias_index(mock_alias_table, 'test-hash'))
+
+    def test_get_reserved_command_levels(self):
+        self.assertDictEqual({
+            'account': [1, 2],
+            'list-locations': [2],
+            'network': [1],
+            'dns': [2],
+            'storage': [1],
+            'create': [3],
+            'group': [1],
+            'delete': [2]
+        }, get_reserved_command_levels())
+
+    @mock.patch('azext_alias.util.get_reserved_command_version_stamp', mock.Mock(return_value='azure-cli-core==2.0.0'))
+    def test_cache_reserved_commands(self):
+        load_cmd_tbl_func = mock.Mock(return_value={command: None for command in TEST_RESERVED_COMMANDS})
+        with mock.patch.multiple('azext_alias', cached_reserved_commands=[], cached_reserved_command_levels={}, cached_reserved_command_suffixes={}, cached_reserved_commands_version=''):
+            cache_reserved_commands(load_cmd_tbl_func)
+            self.assertListEqual(TEST_RESERVED_COMMANDS, azext_alias.cached_reserved_commands)
+        load_cmd_tbl_func.assert_called_once_with([])
+
+        # The persisted reserved commands should be reused without loading the command table again
+        with mock.patch.multiple('azext_alias', cached_reserved_commands=[], cached_reserved_command_levels={}, cached_reserved_command_suffixes={}, cached_reserved_commands_version=''):
+            cache_reserved_commands(load_cmd_tbl_func)
+            self.assertListEqual(TEST_RESERVED_COMMANDS, azext_alias.cached_reserved_commands)
+            self.assertEqual([1, 2], azext_alias.cached_reserved_command_levels['account'])
+        load_cmd_tbl_func.assert_called_once_with([])
+
+    def test_cache_reserved_commands_version_change(self):
+        load_cmd_tbl_func = mock.Mock(return_value={command: None for command in TEST_RESERVED_COMMANDS})
+        for version_stamp in ['azure-cli-core==2.0.0', 'azure-cli-core==2.0.0 alias==0.5.2']:
+            with mock.patch('azext_alias.util.get_reserved_command_version_stamp', mock.Mock(return_value=version_stamp)), \
+                    mock.patch.multiple('azext_alias', cached_reserved_commands=[], cached_reserved_command_levels={}, cached_reserved_command_suffixes={}, cached_reserved_commands_version=''):
+                cache_reserved_commands(load_cmd_tbl_func)
+        self.assertEqual(2, load_cmd_tbl_func.call_count)
+
 
 if __name__ == '__main__':
     unittest.main()
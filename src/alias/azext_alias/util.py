@@ -5,11 +5,12 @@
 
 # pylint: disable=wrong-import-order,import-error,relative-import
 
+import os
 import re
 import sys
 import json
 import shlex
-from collections import defaultdict
+from bisect import bisect_left
 from six.moves import configparser
 from six.moves.urllib.parse import urlparse
 from six.moves.urllib.request import urlretrieve
@@ -17,7 +18,12 @@ from six.moves.urllib.request import urlretrieve
 from knack.util import CLIError
 
 import azext_alias
-from azext_alias._const import COLLISION_CHECK_LEVEL_DEPTH, GLOBAL_ALIAS_TAB_COMP_TABLE_PATH, ALIAS_FILE_URL_ERROR
+from azext_alias._const import (
+    COLLISION_CHECK_LEVEL_DEPTH,
+    GLOBAL_RESERVED_COMMAND_INDEX_PATH,
+    ALIAS_FILE_URL_ERROR
+)
+from azext_alias.command_tree import build_command_tree
 
 
 def get_config_parser():
@@ -72,11 +78,160 @@ def cache_reserved_commands(load_cmd_tbl_func):
     This cache saves the entire command table globally so custom.py can have access to it.
     Alter this cache through cache_reserved_commands(load_cmd_tbl_func) in util.py.
 
+    The reserved commands are persisted along with their command levels, so the entire command table
+    only has to be loaded again when the installed Azure CLI or extensions change.
+
     Args:
         load_cmd_tbl_func: The function to load the entire command table.
     """
-    if not azext_alias.cached_reserved_commands:
-        azext_alias.cached_reserved_commands = list(load_cmd_tbl_func([]).keys())
+    if azext_alias.cached_reserved_commands:
+        return
+
+    version_stamp = get_reserved_command_version_stamp()
+    azext_alias.cached_reserved_commands_version = version_stamp
+    reserved_command_index = load_reserved_command_index(version_stamp)
+    if reserved_command_index:
+        azext_alias.cached_reserved_commands = reserved_command_index['commands']
+        azext_alias.cached_reserved_command_levels = reserved_command_index['levels']
+        azext_alias.cached_reserved_command_suffixes = reserved_command_index['suffixes']
+        return
+
+    azext_alias.cached_reserved_commands = list(load_cmd_tbl_func([]).keys())
+    azext_alias.cached_reserved_command_levels = {}
+    azext_alias.cached_reserved_command_suffixes = {}
+    write_reserved_command_index(version_stamp)
+
+
+def get_reserved_command_levels():
+    """
+    Get the levels at which each word appears in the reserved commands.
+
+    For example, given the reserved commands ['account list', 'storage account create']:
+    {
+        "account": [1, 2],
+        "list": [2],
+        "storage": [1],
+        "create": [3]
+    }
+
+    Returns:
+        A dictionary of every word in the reserved commands to the command levels at which the word appears.
+    """
+    if not azext_alias.cached_reserved_command_levels and azext_alias.cached_reserved_commands:
+        command_tree = build_command_tree(azext_alias.cached_reserved_commands)
+        azext_alias.cached_reserved_command_levels = command_tree.get_levels()
+    return azext_alias.cached_reserved_command_levels
+
+
+def get_reserved_command_suffixes():
+    """
+    Get a sorted index of every word-aligned suffix of the reserved commands, along with the parent command
+    that precedes each suffix.
+
+    For example, given the reserved commands ['account list', 'storage account create']:
+    {
+        "suffixes": ["account create", "account list", "create", "list", "storage account create"],
+        "parents": ["storage", "", "storage account", "account", ""]
+    }
+
+    Returns:
+        A dictionary of two parallel lists: the sorted suffixes and their parent commands.
+    """
+    if not azext_alias.cached_reserved_command_suffixes and azext_alias.cached_reserved_commands:
+        suffix_index = []
+        for reserved_command in azext_alias.cached_reserved_commands:
+            words = reserved_command.split(' ')
+            for i in range(len(words)):
+                suffix_index.append((' '.join(words[i:]), ' '.join(words[:i])))
+        suffix_index.sort()
+        azext_alias.cached_reserved_command_suffixes = {
+            'suffixes': [suffix for suffix, _ in suffix_index],
+            'parents': [parent for _, parent in suffix_index]
+        }
+    return azext_alias.cached_reserved_command_suffixes or {'suffixes': [], 'parents': []}
+
+
+def get_parent_commands(alias_command):
+    """
+    Get all the parent commands under which alias_command is a reserved command (group).
+
+    Args:
+        alias_command: The alias command (without positional argument placeholders).
+
+    Returns:
+        A sorted list of parent commands, where an empty string means that alias_command has no parent command.
+    """
+    suffix_index = get_reserved_command_suffixes()
+    suffixes = suffix_index['suffixes']
+    parent_commands = set()
+    # All the suffixes that are either alias_command or start with 'alias_command ' are within this range,
+    # because '!' is the character right after ' '
+    for i in range(bisect_left(suffixes, alias_command), bisect_left(suffixes, alias_command + '!')):
+        if suffixes[i] == alias_command or suffixes[i].startswith(alias_command + ' '):
+            parent_commands.add(suffix_index['parents'][i])
+    return sorted(parent_commands)
+
+
+def get_reserved_command_version_stamp():
+    """
+    Get a string identifying the installed Azure CLI and extensions, which determine the reserved commands.
+
+    Returns:
+        The version stamp of the reserved commands.
+    """
+    from azure.cli.core import __version__ as core_version
+    from azure.cli.core.extension import get_extensions
+
+    versions = ['azure-cli-core=={}'.format(core_version)]
+    try:
+        versions += sorted('{}=={}'.format(ext.name, ext.version) for ext in get_extensions())
+    except Exception:  # pylint: disable=broad-except
+        # Never reuse the persisted reserved commands if the installed extensions are unknown
+        return ''
+    return ' '.join(versions)
+
+
+def load_reserved_command_index(version_stamp):
+    """
+    Load the persisted reserved commands and their command levels.
+
+    Args:
+        version_stamp: The version stamp of the currently installed Azure CLI and extensions.
+
+    Returns:
+        The reserved command index if it was persisted with the same version stamp. Otherwise, None.
+    """
+    if not version_stamp or not os.path.exists(GLOBAL_RESERVED_COMMAND_INDEX_PATH):
+        return None
+
+    with open(GLOBAL_RESERVED_COMMAND_INDEX_PATH, 'r') as reserved_command_index_file:
+        try:
+            reserved_command_index = json.loads(reserved_command_index_file.read())
+        except Exception:  # pylint: disable=broad-except
+            return None
+
+    if not isinstance(reserved_command_index, dict) or reserved_command_index.get('version') != version_stamp:
+        return None
+    return reserved_command_index
+
+
+def write_reserved_command_index(version_stamp):
+    """
+    Write the cached reserved commands and their command levels into the reserved command index file.
+
+    Args:
+        version_stamp: The version stamp of the currently installed Azure CLI and extensions.
+    """
+    if not version_stamp:
+        return
+
+    with open(GLOBAL_RESERVED_COMMAND_INDEX_PATH, 'w') as reserved_command_index_file:
+        reserved_command_index_file.write(json.dumps({
+            'version': version_stamp,
+            'commands': azext_alias.cached_reserved_commands,
+            'levels': get_reserved_command_levels(),
+            'suffixes': get_reserved_command_suffixes()
+        }))
 
 
 def remove_pos_arg_placeholders(alias_command):
@@ -116,43 +271,94 @@ def filter_aliases(alias_table):
             yield (alias.split()[0], remove_pos_arg_placeholders(alias_table.get(alias, 'command')))
 
 
-def build_tab_completion_table(alias_table):
+def build_alias_index(alias_table, alias_config_hash=''):
+    """
+    Compile the alias table into a dictionary-based index, so aliases can be resolved without
+    scanning through the sections of the alias table.
+
+    For example:
+    {
+        "hash": "<SHA1 of the alias configuration file>",
+        "aliases": {"ac": "account", "cp {{ arg_1 }} {{ arg_2 }}": "storage blob copy start-batch ..."},
+        "first_words": {"ac": "ac", "cp": "cp {{ arg_1 }} {{ arg_2 }}"},
+        "split_commands": {"ac": ["account"], "cp {{ arg_1 }} {{ arg_2 }}": ["storage", "blob", ...]}
+    }
+
+    Args:
+        alias_table: The alias table.
+        alias_config_hash: The hash of the alias configuration file that the alias table is loaded from.
+
+    Returns:
+        The alias index.
+    """
+    aliases = {}
+    first_words = {}
+    split_commands = {}
+    for alias in alias_table.sections():
+        # An alias without a command field still shadows aliases with the same first word
+        first_words.setdefault(alias.split()[0], alias)
+        if not alias_table.has_option(alias, 'command'):
+            aliases[alias] = None
+            continue
+
+        alias_command = alias_table.get(alias, 'command')
+        aliases[alias] = alias_command
+        try:
+            split_commands[alias] = shlex.split(alias_command)
+        except ValueError:
+            # Leave malformed commands to be split (and reported) when the alias is used
+            pass
+
+    return {
+        'hash': alias_config_hash,
+        'aliases': aliases,
+        'first_words': first_words,
+        'split_commands': split_commands
+    }
+
+
+def build_tab_completion_table(alias_table, previous_tab_completion_table=None):
     """
     Build a dictionary where the keys are all the alias commands (without positional argument placeholders)
-    and the values are all the parent commands of the keys. After that, write the table into a file.
+    and the values are all the parent commands of the keys.
     The purpose of the dictionary is to validate the alias tab completion state.
 
     For example:
     {
-        "group": ["", "ad"],
-        "dns": ["network"]
+        "version": "<version stamp of the reserved commands that the table is built against>",
+        "table": {
+            "group": ["", "ad"],
+            "dns": ["network"]
+        }
     }
 
+    The table is updated incrementally: if the previous table was built against the same reserved commands,
+    only the entries of alias commands that were added or removed are recomputed.
+
     Args:
         alias_table: The alias table.
+        previous_tab_completion_table: The tab completion table built from the previous alias table, if any.
 
     Returns:
         The tab completion table.
     """
-    alias_commands = [t[1] for t in filter_aliases(alias_table)]
-    tab_completion_table = defaultdict(list)
-    for alias_command in alias_commands:
-        for reserved_command in azext_alias.cached_reserved_commands:
-            # Check if alias_command has no parent command
-            if reserved_command == alias_command or reserved_command.startswith(alias_command + ' ') \
-                    and '' not in tab_completion_table[alias_command]:
-                tab_completion_table[alias_command].append('')
-            elif ' {} '.format(alias_command) in reserved_command or reserved_command.endswith(' ' + alias_command):
-                # Extract parent commands
-                index = reserved_command.index(alias_command)
-                parent_command = reserved_command[:index - 1]
-                if parent_command not in tab_completion_table[alias_command]:
-                    tab_completion_table[alias_command].append(parent_command)
-
-    with open(GLOBAL_ALIAS_TAB_COMP_TABLE_PATH, 'w') as f:
-        f.write(json.dumps(tab_completion_table))
-
-    return tab_completion_table
+    alias_commands = set(t[1] for t in filter_aliases(alias_table))
+    previous_tab_completion_table = previous_tab_completion_table or {}
+    version = previous_tab_completion_table.get('version', '')
+    table = dict(previous_tab_completion_table.get('table', {}))
+    # Rebuild the entire table if it was built against different (or unknown) reserved commands
+    if azext_alias.cached_reserved_commands and not (version and version == azext_alias.cached_reserved_commands_version):
+        version, table = azext_alias.cached_reserved_commands_version, {}
+
+    for alias_command in set(table) - alias_commands:
+        del table[alias_command]
+
+    # Entries of new alias commands can only be computed if the reserved commands are loaded
+    if azext_alias.cached_reserved_commands:
+        for alias_command in alias_commands - set(table):
+            table[alias_command] = get_parent_commands(alias_command)
+
+    return {'version': version, 'table': table}
 
 
 def is_url(s):
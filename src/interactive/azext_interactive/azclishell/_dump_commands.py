@@ -3,8 +3,10 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import hashlib
 import json
 import os
+import six
 import yaml  # pylint: disable=import-error
 
 from azure.cli.core import MainCommandsLoader
@@ -13,9 +15,17 @@ from knack.help import REQUIRED_TAG
 from knack.help_files import helps
 from knack.log import get_logger
 
+from .command_store import get_store_dir, get_version_stamp, load_command_index, write_command_store
+
 
 logger = get_logger(__name__)
 
+HELP_CACHE_FILE_NAME = 'help_yaml_cache.json'
+# the number of help entries parsed by a worker at a time
+HELP_CHUNK_SIZE = 200
+# the number of threads parsing the help entries
+HELP_PARSE_WORKERS = 4
+
 
 class AzInteractiveCommandsLoader(MainCommandsLoader):  # pylint: disable=too-few-public-methods
 
@@ -90,6 +100,14 @@ class FreshTable(object):
         register_ids_argument(shell_ctx.cli_ctx)
         shell_ctx.cli_ctx.raise_event(events.EVENT_INVOKER_POST_CMD_TBL_CREATE, commands_loader=main_loader)
         cmd_table = main_loader.command_table
+        FreshTable.loader = main_loader
+
+        # the command store only changes when azure-cli-core or the extensions do
+        store_dir = get_store_dir(shell_ctx.config)
+        version = get_version_stamp()
+        if version and load_command_index(store_dir).get('version') == version:
+            logger.debug('Command store is up to date: %s sec', timeit.default_timer() - start_time)
+            return
 
         cmd_table_data = {}
         for command_name, cmd in cmd_table.items():
@@ -119,22 +137,73 @@ class FreshTable(object):
             except (ImportError, ValueError):
                 pass
 
-        load_help_files(cmd_table_data)
+        load_help_files(cmd_table_data, os.path.join(get_cache_dir(shell_ctx), HELP_CACHE_FILE_NAME))
         elapsed = timeit.default_timer() - start_time
         logger.debug('Command table dumped: %s sec', elapsed)
-        FreshTable.loader = main_loader
 
-        # dump into the cache file
-        command_file = shell_ctx.config.get_help_files()
-        with open(os.path.join(get_cache_dir(shell_ctx), command_file), 'w') as help_file:
-            json.dump(cmd_table_data, help_file, default=lambda x: x.target or '', skipkeys=True)
+        # dump into the command store, one file per command group
+        write_command_store(cmd_table_data, store_dir, version)
+
+
+def _hash_help(help_yaml):
+    if isinstance(help_yaml, six.text_type):
+        help_yaml = help_yaml.encode('utf-8')
+    return hashlib.sha1(help_yaml).hexdigest()
+
+
+def _parse_help_chunk(chunk):
+    """ parses a list of (hash, help yaml), run in the worker threads """
+    return [(help_hash, yaml.safe_load(help_yaml)) for help_hash, help_yaml in chunk]
+
+
+def parse_help_files(help_files, help_cache_path=None):
+    """
+    parses the help yaml of every command, returns a dictionary from the command to the parsed help.
+    help entries whose content is found in the cache are not parsed again, the others are parsed by a
+    pool of threads when there are many of them
+    """
+    parsed_cache = {}
+    if help_cache_path:
+        try:
+            with open(help_cache_path, 'r') as help_cache_file:
+                parsed_cache = json.load(help_cache_file)
+        except (IOError, OSError, ValueError):
+            parsed_cache = {}
+
+    help_hashes = {command_name: _hash_help(help_yaml) for command_name, help_yaml in help_files.items()}
+    unparsed = {}
+    for command_name, help_yaml in help_files.items():
+        if help_hashes[command_name] not in parsed_cache:
+            unparsed[help_hashes[command_name]] = help_yaml
+    unparsed = list(unparsed.items())
+
+    if unparsed:
+        chunks = [unparsed[i:i + HELP_CHUNK_SIZE] for i in range(0, len(unparsed), HELP_CHUNK_SIZE)]
+        if len(chunks) > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=HELP_PARSE_WORKERS) as executor:
+                parsed = list(executor.map(_parse_help_chunk, chunks))
+        else:
+            parsed = [_parse_help_chunk(chunk) for chunk in chunks]
+        for chunk in parsed:
+            parsed_cache.update(chunk)
+        logger.debug('Parsed %s help entries', len(unparsed))
+
+        if help_cache_path:
+            # only keep the entries of the installed commands
+            parsed_cache = {help_hash: parsed_cache[help_hash] for help_hash in set(help_hashes.values())}
+            with open(help_cache_path, 'w') as help_cache_file:
+                json.dump(parsed_cache, help_cache_file, default=str)
+
+    return {command_name: parsed_cache[help_hash] for command_name, help_hash in help_hashes.items()}
 
 
-def load_help_files(data):
+def load_help_files(data, help_cache_path=None):
     """ loads all the extra information from help files """
-    for command_name, help_yaml in helps.items():
+    parsed_helps = parse_help_files(helps, help_cache_path)
+    for command_name in helps:
 
-        help_entry = yaml.safe_load(help_yaml)
+        help_entry = parsed_helps[command_name]
         try:
             help_type = help_entry['type']
         except KeyError:
@@ -12,6 +12,7 @@ import os
 import re
 import subprocess
 import sys
+import timeit
 from threading import Thread
 
 from six.moves import configparser
@@ -19,8 +20,6 @@ from knack.log import get_logger
 from knack.util import CLIError
 from azure.cli.core.commands.client_factory import ENV_ADDITIONAL_USER_AGENT
 from azure.cli.core._profile import _SUBSCRIPTION_NAME, Profile
-from azure.cli.core._session import ACCOUNT, CONFIG, SESSION
-from azure.cli.core.api import get_config_dir
 from azure.cli.core.util import handle_exception
 
 # pylint: disable=import-error
@@ -39,6 +38,7 @@ from . import VERSION
 from .az_completer import AzCompleter
 from .az_lexer import get_az_lexer, ExampleLexer, ToolbarLexer
 from .configuration import Configuration, SELECT_SYMBOL
+from .executor import CommandExecutor
 from .frequency_heuristic import DISPLAY_TIME, frequency_heuristic
 from .gather_commands import add_new_lines, GatherCommands
 from .key_bindings import InteractiveKeyBindings
@@ -119,6 +119,8 @@ class AzInteractiveShell(object):
         self.intermediate_sleep = intermediate_sleep
         self.final_sleep = final_sleep
         self.command_table_thread = None
+        # runs the commands, reusing the command table and profile
+        self.executor = CommandExecutor(cli_ctx)
 
         # try to consolidate state information here...
         # Used by key bindings and layout
@@ -483,6 +485,12 @@ class AzInteractiveShell(object):
         elif cmd_stripped == "clear-history":
             continue_flag = True
             self.reset_history()
+        elif args and args[0] == "run-batch":
+            continue_flag = True
+            self.handle_batch(args[1:])
+        elif args and args[0] == "completion-profile":
+            continue_flag = True
+            self.handle_completion_profile(args[1:])
         elif cmd_stripped == CLEAR_WORD:
             outside = True
             cmd = CLEAR_WORD
@@ -613,6 +621,58 @@ class AzInteractiveShell(object):
             default_split = default_split[1:]
         return continue_flag, cmd
 
+    def handle_batch(self, args):
+        """ runs every command in a file, printing how long each took """
+        if len(args) != 1:
+            print("Usage: run-batch FILE", file=self.output)
+            return
+        try:
+            with open(os.path.expanduser(args[0]), 'r') as batch_file:
+                commands = [line.strip() for line in batch_file]
+        except (IOError, OSError) as ex:
+            print("Unable to read the batch file: {}".format(ex), file=self.output)
+            return
+        # skip blank lines and comments
+        commands = [cmd for cmd in commands if cmd and not cmd.startswith('#')]
+
+        failures = 0
+        batch_start = timeit.default_timer()
+        for index, cmd in enumerate(commands):
+            if cmd.split(' ', 1)[0].lower() == 'az':
+                cmd = ' '.join(cmd.split()[1:])
+            start = timeit.default_timer()
+            self.cli_execute(cmd)
+            elapsed = timeit.default_timer() - start
+            if self.last_exit:
+                failures += 1
+            print("[{}/{}] {:.0f} ms, exit code {}: {}".format(
+                index + 1, len(commands), elapsed * 1000, self.last_exit, cmd), file=self.output)
+        print("Ran {} commands, {} failed, in {:.2f} s".format(
+            len(commands), failures, timeit.default_timer() - batch_start), file=self.output)
+
+    def handle_completion_profile(self, args):
+        """ turns the completion profiling on or off, shows or dumps the timings """
+        completion_profiler = self.completer.profiler
+        action = args[0] if args else 'show'
+        if action == 'on':
+            completion_profiler.enabled = True
+            print("Completion profiling is on", file=self.output)
+        elif action == 'off':
+            completion_profiler.enabled = False
+            print("Completion profiling is off", file=self.output)
+        elif action == 'clear':
+            completion_profiler.clear()
+        elif action == 'show':
+            print(completion_profiler.summary(), file=self.output)
+        elif action == 'dump' and len(args) == 2:
+            try:
+                completion_profiler.dump(os.path.expanduser(args[1]))
+                print("Completion timings written to " + args[1], file=self.output)
+            except (IOError, OSError) as ex:
+                print("Unable to write the completion timings: {}".format(ex), file=self.output)
+        else:
+            print("Usage: completion-profile [on | off | show | clear | dump FILE]", file=self.output)
+
     def reset_history(self):
         history_file_path = os.path.join(self.config.get_config_dir(), self.config.get_history())
         os.remove(history_file_path)
@@ -629,17 +689,7 @@ class AzInteractiveShell(object):
                 self.config.set_feedback('yes')
                 self.user_feedback = False
 
-            azure_folder = get_config_dir()
-            if not os.path.exists(azure_folder):
-                os.makedirs(azure_folder)
-            ACCOUNT.load(os.path.join(azure_folder, 'azureProfile.json'))
-            CONFIG.load(os.path.join(azure_folder, 'az.json'))
-            SESSION.load(os.path.join(azure_folder, 'az.sess'), max_age=3600)
-
-            invocation = self.cli_ctx.invocation_cls(cli_ctx=self.cli_ctx,
-                                                     parser_cls=self.cli_ctx.parser_cls,
-                                                     commands_loader_cls=self.cli_ctx.commands_loader_cls,
-                                                     help_cls=self.cli_ctx.help_cls)
+            invocation = self.executor.create_invocation()
 
             if '--progress' in args:
                 args.remove('--progress')
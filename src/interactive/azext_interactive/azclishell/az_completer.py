@@ -6,6 +6,8 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import os
+import threading
+import timeit
 
 from azure.cli.core.parser import AzCliCommandParser
 from azure.cli.core.commands.events import (
@@ -17,9 +19,15 @@ from prompt_toolkit.completion import Completer, Completion  # pylint: disable=i
 
 from . import configuration
 from .argfinder import ArgsFinder
+from .completion_cache import CompletionCache, depends_on_prefix, get_completion_key
+from .prefix_index import PrefixIndex
+from .profiler import (CompletionProfiler, ARGUMENT_PARSE, DYNAMIC_COMPLETIONS, POST_SUB_TREE_EVENT,
+                       PRE_COMPLETER_EVENT, STATIC_COMPLETIONS, SUB_TREE_LOOKUP)
 from .util import parse_quotes
 
 SELECT_SYMBOL = configuration.SELECT_SYMBOL
+# the number of argument completers warmed when a command is typed
+PREFETCH_LIMIT = 3
 
 
 def error_pass(_, message):  # pylint: disable=unused-argument
@@ -87,6 +95,16 @@ class AzCompleter(Completer):
         self.parser = AzCliCommandParser(parents=[self.global_parser])
         self.argsfinder = ArgsFinder(self.parser)
         self.cmdtab = {}
+        # a dictionary of command to the argument name of each option (e.g. {'vm create': {'-n': 'name'}})
+        self.command_arg_names = {}
+        # a dictionary of command to the index of the required and optional parameters
+        self.param_indexes = {}
+
+        # the dynamic completions by command, argument and the other arguments on the line
+        self.completion_cache = CompletionCache()
+        self.prefetched_command = None
+        # timings of the completion phases, when turned on
+        self.profiler = CompletionProfiler()
 
         if commands:
             self.start(commands, global_params=global_params)
@@ -101,7 +119,10 @@ class AzCompleter(Completer):
         self.command_tree = commands.command_tree
         self.param_description = commands.param_descript
         self.command_examples = commands.command_example
-        self.command_param_info = commands.command_param_info or self.command_param_info
+        # assigned even when empty, the command store loads it by command group on first use
+        self.command_param_info = commands.command_param_info
+        self.command_tree.build_prefix_indexes()
+        self.param_indexes = {}
 
         if global_params:
             self.global_param = commands.global_param
@@ -114,6 +135,13 @@ class AzCompleter(Completer):
         loader = FreshTable(self.shell_ctx).loader
         if loader and loader.command_table:
             self.cmdtab = loader.command_table
+            self.command_arg_names = {}
+            for command_name, command in self.cmdtab.items():
+                arg_names = {}
+                for arg_name, arg in command.arguments.items():
+                    for option in arg.options_list:
+                        arg_names.setdefault(option, arg_name)
+                self.command_arg_names[command_name] = arg_names
             self.parser.load_command_table(loader)
             self.argsfinder = ArgsFinder(self.parser)
 
@@ -154,10 +182,20 @@ class AzCompleter(Completer):
             return
 
         text = self.reformat_cmd(document.text_before_cursor)
+        self.profiler.start(text)
+        try:
+            for comp in self._get_completions(text):
+                yield comp
+        finally:
+            self.profiler.finish()
+
+    def _get_completions(self, text):
         event_payload = {
             'text': text
         }
-        self.shell_ctx.cli_ctx.raise_event(EVENT_INTERACTIVE_PRE_COMPLETER_TEXT_PARSING, event_payload=event_payload)
+        with self.profiler.phase(PRE_COMPLETER_EVENT):
+            self.shell_ctx.cli_ctx.raise_event(EVENT_INTERACTIVE_PRE_COMPLETER_TEXT_PARSING,
+                                               event_payload=event_payload)
         # Reload various attributes from event_payload
         text = event_payload.get('text', text)
         text_split = text.split()
@@ -167,18 +205,26 @@ class AzCompleter(Completer):
             self.unfinished_word = text_split[-1]
             text_split = text_split[:-1]
 
-        self.subtree, self.current_command, self.leftover_args = self.command_tree.get_sub_tree(text_split)
-        self.shell_ctx.cli_ctx.raise_event(EVENT_INTERACTIVE_POST_SUB_TREE_CREATE, subtree=self.subtree)
+        with self.profiler.phase(SUB_TREE_LOOKUP):
+            self.subtree, self.current_command, self.leftover_args = self.command_tree.get_sub_tree(text_split)
+        with self.profiler.phase(POST_SUB_TREE_EVENT):
+            self.shell_ctx.cli_ctx.raise_event(EVENT_INTERACTIVE_POST_SUB_TREE_CREATE, subtree=self.subtree)
         self.complete_command = not self.subtree.children
 
-        for comp in sort_completions(self.gen_cmd_and_param_completions()):
-            yield comp
+        if self.complete_command and self.cmdtab:
+            self.prefetch_dynamic_completions(text)
 
-        for comp in sort_completions(self.gen_global_params_and_arg_completions()):
+        with self.profiler.phase(STATIC_COMPLETIONS):
+            # generated in order from the prefix indexes
+            completions = list(self.gen_cmd_and_param_completions())
+            completions.extend(sort_completions(self.gen_global_params_and_arg_completions()))
+        for comp in completions:
             yield comp
 
         if self.complete_command and self.cmdtab and self.leftover_args and self.leftover_args[-1].startswith('-'):
-            for comp in sort_completions(self.gen_dynamic_completions(text)):
+            with self.profiler.phase(DYNAMIC_COMPLETIONS):
+                completions = sort_completions(self.gen_dynamic_completions(text))
+            for comp in completions:
                 yield comp
 
     def gen_enum_completions(self, arg_name):
@@ -193,13 +239,23 @@ class AzCompleter(Completer):
 
     def get_arg_name(self, param):
         """ gets the argument name used in the command table for a parameter """
-        if self.current_command in self.cmdtab:
-            for arg in self.cmdtab[self.current_command].arguments:
-
-                for name in self.cmdtab[self.current_command].arguments[arg].options_list:
-                    if name == param:
-                        return arg
-        return None
+        return self.command_arg_names.get(self.current_command, {}).get(param)
+
+    def get_param_indexes(self, command):
+        """ gets the indexes of the required and the optional parameters of a command """
+        from knack.help import REQUIRED_TAG
+
+        if command not in self.param_indexes:
+            # built on first use so only the command groups used are loaded from the command store
+            required, optional = [], []
+            for param in self.command_param_info.get(command, []):
+                description = self.param_description.get(command + " " + str(param), '')
+                if description.startswith(REQUIRED_TAG):
+                    required.append(param)
+                else:
+                    optional.append(param)
+            self.param_indexes[command] = (PrefixIndex(required), PrefixIndex(optional))
+        return self.param_indexes[command]
 
     # pylint: disable=protected-access
     def mute_parse_args(self, text):
@@ -211,8 +267,10 @@ class AzCompleter(Completer):
         AzCliCommandParser._check_value = _check_value_muted
 
         # No exception is expected. However, we add this try-catch block, as this may have far-reaching effects.
+        parse_args = None
         try:
-            parse_args = self.argsfinder.get_parsed_args(parse_quotes(text, quotes=False, string=False))
+            with self.profiler.phase(ARGUMENT_PARSE):
+                parse_args = self.argsfinder.get_parsed_args(parse_quotes(text, quotes=False, string=False))
         except Exception:  # pylint: disable=broad-except
             pass
 
@@ -234,30 +292,76 @@ class AzCompleter(Completer):
 
             parsed_args = self.mute_parse_args(text)
 
+            for comp in self.get_dynamic_values(self.current_command, arg_name, parsed_args, self.unfinished_word):
+                for completion in self.process_dynamic_completion(comp):
+                    yield completion
+
+        # if the user isn't logged in
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+    def get_dynamic_values(self, command, arg_name, parsed_args, prefix='', prefetch=False):
+        """
+        gets the values of an argument from its completer, or from the cache if recently completed. Only the
+        completers that depend on the prefix get it, the values of the others are cached once and filtered as the
+        word is typed
+        """
+        completer = self.cmdtab[command].arguments[arg_name].completer
+        if not depends_on_prefix(completer):
+            prefix = ''
+        key = get_completion_key(command, arg_name, parsed_args, prefix)
+        completions = self.completion_cache.get(key)
+        if completions is None:
+            start_time = timeit.default_timer()
+            completions = self.call_completer(completer, parsed_args, prefix)
+            self.profiler.record_completer(command, arg_name, timeit.default_timer() - start_time, prefetch=prefetch)
+            self.completion_cache.set(key, completions)
+        return completions
+
+    def call_completer(self, completer, parsed_args, prefix=''):
+        """ calls an argument completer with the prefix typed """
+        completions = []
+        if completer:
             # there are 3 formats for completers the cli uses
             # this try catches which format it is
-            if self.cmdtab[self.current_command].arguments[arg_name].completer:
-                completions = []
+            try:
+                completions = completer(prefix=prefix, action=None, parsed_args=parsed_args)
+            except TypeError:
                 try:
-                    completions = self.cmdtab[self.current_command].arguments[arg_name].completer(
-                        prefix=self.unfinished_word, action=None, parsed_args=parsed_args)
+                    completions = completer(prefix=prefix)
                 except TypeError:
                     try:
-                        completions = self.cmdtab[self.current_command].arguments[arg_name].completer(
-                            prefix=self.unfinished_word)
+                        completions = completer()
                     except TypeError:
-                        try:
-                            completions = self.cmdtab[self.current_command].arguments[arg_name].completer()
-                        except TypeError:
-                            pass  # other completion method used
+                        pass  # other completion method used
+        return list(completions or [])
 
-                for comp in completions:
-                    for completion in self.process_dynamic_completion(comp):
-                        yield completion
+    def prefetch_dynamic_completions(self, text):
+        """ warms the completion cache for the arguments of a fully typed command in the background """
+        command = self.current_command
+        if command == self.prefetched_command or command not in self.cmdtab:
+            return
+        self.prefetched_command = command
 
-        # if the user isn't logged in
-        except Exception:  # pylint: disable=broad-except
-            pass
+        # required arguments are the most likely to be completed next
+        arguments = self.cmdtab[command].arguments
+        arg_names = sorted((arg_name for arg_name in arguments if arguments[arg_name].completer),
+                           key=lambda arg_name: not arguments[arg_name].type.settings.get('required'))
+        if not arg_names:
+            return
+
+        parsed_args = self.mute_parse_args(text)
+        thread = threading.Thread(target=self._prefetch, args=(command, arg_names[:PREFETCH_LIMIT], parsed_args))
+        thread.daemon = True
+        thread.start()
+
+    def _prefetch(self, command, arg_names, parsed_args):
+        for arg_name in arg_names:
+            try:
+                self.get_dynamic_values(command, arg_name, parsed_args, prefetch=True)
+            except Exception:  # pylint: disable=broad-except
+                # e.g. the user isn't logged in, the completion is tried again when typed
+                pass
 
     def yield_param_completion(self, param, last_word):
         """ yields a parameter """
@@ -267,13 +371,14 @@ class AzCompleter(Completer):
     def gen_cmd_and_param_completions(self):
         """ generates command and parameter completions """
         if self.complete_command:
-            for param in self.command_param_info.get(self.current_command, []):
-                if self.validate_param_completion(param, self.leftover_args):
-                    yield self.yield_param_completion(param, self.unfinished_word)
+            # required parameters first, the same order sort_completions gives
+            for param_index in self.get_param_indexes(self.current_command):
+                for param in param_index.get_range(self.unfinished_word):
+                    if self.validate_param_completion(param, self.leftover_args):
+                        yield self.yield_param_completion(param, self.unfinished_word)
         elif not self.leftover_args:
-            for child_command in self.subtree.children:
-                if self.validate_completion(child_command):
-                    yield Completion(child_command, -len(self.unfinished_word))
+            for child_command in self.subtree.get_prefix_index().get_range(self.unfinished_word):
+                yield Completion(child_command, -len(self.unfinished_word))
 
     def gen_global_params_and_arg_completions(self):
         # global parameters
@@ -295,7 +400,7 @@ class AzCompleter(Completer):
 
     def has_description(self, param):
         """ if a parameter has a description """
-        return param in self.param_description.keys() and \
+        return param in self.param_description and \
             not self.param_description[param].isspace()
 
     def reformat_cmd(self, text):
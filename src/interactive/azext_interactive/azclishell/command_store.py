@@ -0,0 +1,100 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+
+from knack.log import get_logger
+
+
+logger = get_logger(__name__)
+
+COMMAND_INDEX_FILE_NAME = 'index.json'
+SUPPRESS_HELP = '==SUPPRESS=='
+
+
+def get_store_dir(config):
+    """ gets the directory of the command store, which sits next to the legacy help file """
+    command_file = os.path.splitext(config.get_help_files())[0]
+    return os.path.join(config.get_config_dir(), 'cache', command_file)
+
+
+def get_group(command):
+    """ the top level command group a command belongs to """
+    words = command.split()
+    return words[0] if words else ''
+
+
+def get_version_stamp():
+    """ a string identifying the installed azure-cli-core and extensions, which make up the command table """
+    from azure.cli.core import __version__ as core_version
+    from azure.cli.core.extension import get_extensions
+
+    versions = ['azure-cli-core=={}'.format(core_version)]
+    try:
+        versions += sorted('{}=={}'.format(ext.name, ext.version) for ext in get_extensions())
+    except Exception:  # pylint: disable=broad-except
+        # never reuse a command store when the installed extensions are unknown
+        return ''
+    return ' '.join(versions)
+
+
+def load_command_index(store_dir):
+    """ loads the index of the command store, empty if there is no usable store """
+    try:
+        with open(os.path.join(store_dir, COMMAND_INDEX_FILE_NAME), 'r') as index_file:
+            index = json.load(index_file)
+    except (IOError, OSError, ValueError):
+        return {}
+    if not isinstance(index, dict) or any(key not in index for key in ('version', 'commands', 'params', 'groups')):
+        return {}
+    return index
+
+
+def load_command_group(store_dir, shard):
+    """ loads the descriptions, parameters and examples of one command group """
+    try:
+        with open(os.path.join(store_dir, shard), 'r') as shard_file:
+            return json.load(shard_file)
+    except (IOError, OSError, ValueError) as ex:
+        logger.debug('Unable to load command group %s: %s', shard, ex)
+        return {}
+
+
+def write_command_store(data, store_dir, version):
+    """ dumps the command data into one file per top level command group, plus an index of the names """
+    index_path = os.path.join(store_dir, COMMAND_INDEX_FILE_NAME)
+    if not os.path.exists(store_dir):
+        os.makedirs(store_dir)
+    elif os.path.exists(index_path):
+        os.remove(index_path)
+
+    groups = {}
+    params = set()
+    for command_name, command_data in data.items():
+        groups.setdefault(get_group(command_name), {})[command_name] = command_data
+        for param in (command_data.get('parameters') or {}).values():
+            if SUPPRESS_HELP not in (param['help'] or ''):
+                params.update(param['name'])
+
+    shards = {}
+    for group, group_data in groups.items():
+        shards[group] = group + '.json'
+        with open(os.path.join(store_dir, shards[group]), 'w') as shard_file:
+            json.dump(group_data, shard_file, default=lambda x: x.target or '', skipkeys=True)
+
+    # remove the groups of uninstalled extensions
+    for file_name in os.listdir(store_dir):
+        if file_name not in shards.values():
+            os.remove(os.path.join(store_dir, file_name))
+
+    # the index is written last so a partially written store is never picked up
+    with open(index_path, 'w') as index_file:
+        json.dump({
+            'version': version,
+            'commands': sorted(data),
+            'params': sorted(params),
+            'groups': shards
+        }, index_file)
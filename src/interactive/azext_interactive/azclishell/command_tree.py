@@ -3,6 +3,8 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+from .prefix_index import PrefixIndex
+
 
 class CommandTree(object):
     """ a command tree """
@@ -12,6 +14,7 @@ class CommandTree(object):
             self.children = {}
         else:
             self.children = children
+        self.prefix_index = None
 
     def get_child(self, child_name):  # pylint: disable=no-self-use
         """ returns the object with the name supplied """
@@ -24,6 +27,19 @@ class CommandTree(object):
         """ adds a child to this branch """
         # TODO allow adding child_name
         self.children[child.data] = child
+        self.prefix_index = None
+
+    def get_prefix_index(self):
+        """ returns the index of the children by prefix """
+        if self.prefix_index is None:
+            self.prefix_index = PrefixIndex(self.children)
+        return self.prefix_index
+
+    def build_prefix_indexes(self):
+        """ indexes the children of every branch of the tree """
+        self.get_prefix_index()
+        for child in self.children.values():
+            child.build_prefix_indexes()
 
     def has_child(self, name):
         """ whether this has a child """
@@ -0,0 +1,83 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import time
+from collections import OrderedDict
+
+import six
+
+
+# how long in seconds dynamic completions are reused
+COMPLETION_TTL = 60
+# how many argument completions are kept
+COMPLETION_CACHE_SIZE = 128
+
+
+def depends_on_prefix(completer):
+    """
+    whether the completer only returns the values under the prefix typed, like the files of a directory, the
+    values of the others are the same for every prefix and are filtered as the word is typed
+    """
+    try:
+        from argcomplete.completers import FilesCompleter, DirectoriesCompleter
+    except ImportError:
+        return False
+    return isinstance(completer, (FilesCompleter, DirectoriesCompleter))
+
+
+def get_completion_key(command, arg_name, parsed_args, prefix=''):
+    """
+    the key of the completions of an argument, the scope is every other argument given a value on the line,
+    since completers narrow down their results with them (e.g. names in a resource group), and the prefix of the
+    completers that depend on it
+    """
+    scope = []
+    if parsed_args is not None:
+        for dest, value in sorted(vars(parsed_args).items()):
+            if dest != arg_name and isinstance(value, six.string_types):
+                scope.append((dest, value))
+    return command, arg_name, tuple(scope), prefix
+
+
+class CompletionCache(object):
+    """ a thread safe cache of dynamic completions that expire and are evicted least recently used first """
+    def __init__(self, ttl=COMPLETION_TTL, max_size=COMPLETION_CACHE_SIZE, timer=time.time):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.timer = timer
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """ returns the completions of the key, None if not cached or expired """
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return None
+            created, completions = entry
+            if self.timer() - created > self.ttl:
+                return None
+            # move to the most recently used end
+            self.entries[key] = entry
+            return completions
+
+    def set(self, key, completions):
+        """ caches the completions of the key """
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (self.timer(), list(completions))
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
@@ -0,0 +1,107 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import copy
+import os
+import time
+from collections import defaultdict
+
+from azure.cli.core import MainCommandsLoader
+from knack.arguments import ArgumentRegistry
+from azure.cli.core._session import ACCOUNT, CONFIG, SESSION
+from azure.cli.core.api import get_config_dir
+
+from ._dump_commands import FreshTable
+
+
+SESSION_MAX_AGE = 3600
+
+
+class PreloadedCommandsLoader(MainCommandsLoader):
+    """
+    a commands loader that uses the command table the shell already loaded, the arguments of the command run are
+    loaded like in a normal invocation into copies of its command and loaders, the ones of the shell are left as
+    the completer uses them
+    """
+
+    def __init__(self, cli_ctx=None):
+        super(PreloadedCommandsLoader, self).__init__(cli_ctx)
+        self.preloaded = False
+
+    def load_command_table(self, args):
+        loader = FreshTable.loader
+        if not loader or not loader.command_table:
+            return super(PreloadedCommandsLoader, self).load_command_table(args)
+
+        # copies, since the invocation trims the command table down to the command it runs
+        self.command_table = dict(loader.command_table)
+        self.command_group_table = loader.command_group_table
+        self.cmd_to_loader_map = dict(loader.cmd_to_loader_map)
+        self.loaders = loader.loaders
+        self.preloaded = True
+        return self.command_table
+
+    def load_arguments(self, command=None):
+        if self.preloaded and command in self.command_table:
+            # the shell loaded the arguments of every command at once without the applicability checks, the
+            # command and its loaders are copied with empty arguments and registries like in a normal invocation
+            command_copy = copy.copy(self.command_table[command])
+            command_copy.arguments = {}
+            loader_copies = []
+            for command_loader in self.cmd_to_loader_map.get(command, []):
+                loader_copy = copy.copy(command_loader)
+                loader_copy.skip_applicability = False
+                loader_copy.argument_registry = ArgumentRegistry()
+                loader_copy.extra_argument_registry = defaultdict(lambda: {})
+                loader_copy.command_table = {command: command_copy}
+                if command_copy.loader is command_loader:
+                    command_copy.loader = loader_copy
+                loader_copies.append(loader_copy)
+            self.command_table[command] = command_copy
+            self.cmd_to_loader_map[command] = loader_copies
+        super(PreloadedCommandsLoader, self).load_arguments(command)
+
+
+class CommandExecutor(object):
+    """ runs commands in process, reusing the loaded command table and profile across commands """
+
+    def __init__(self, cli_ctx):
+        self.cli_ctx = cli_ctx
+        # the modification time of each session file when it was loaded
+        self.file_times = {}
+        self.session_load_time = None
+
+    def load_session_files(self):
+        """ loads the profile, config and session files, again only if they changed since they were loaded """
+        azure_folder = get_config_dir()
+        if not os.path.exists(azure_folder):
+            os.makedirs(azure_folder)
+
+        for store, file_name in ((ACCOUNT, 'azureProfile.json'), (CONFIG, 'az.json'), (SESSION, 'az.sess')):
+            path = os.path.join(azure_folder, file_name)
+            mtime = os.path.getmtime(path) if os.path.exists(path) else None
+            expired = store is SESSION and (self.session_load_time is None or
+                                            time.time() - self.session_load_time > SESSION_MAX_AGE)
+            if path in self.file_times and self.file_times[path] == mtime and not expired:
+                continue
+
+            if store is SESSION:
+                store.load(path, max_age=SESSION_MAX_AGE)
+                self.session_load_time = time.time()
+            else:
+                store.load(path)
+            self.file_times[path] = os.path.getmtime(path) if os.path.exists(path) else None
+
+    def create_invocation(self):
+        """ creates the invocation of a command """
+        self.load_session_files()
+        return self.cli_ctx.invocation_cls(cli_ctx=self.cli_ctx,
+                                           parser_cls=self.cli_ctx.parser_cls,
+                                           commands_loader_cls=PreloadedCommandsLoader,
+                                           help_cls=self.cli_ctx.help_cls)
+
+    def execute(self, args):
+        """ runs the command, returns the command result """
+        return self.create_invocation().execute(args)
@@ -8,6 +8,7 @@ import os
 import json
 from knack.log import get_logger
 
+from .command_store import get_group, get_store_dir, load_command_group, load_command_index
 from .command_tree import CommandBranch, CommandHead
 from .util import get_window_dim
 
@@ -68,31 +69,61 @@ def add_new_lines(long_phrase, line_min=None, tolerance=TOLERANCE):
     return long_phrase + "\n"
 
 
+class LazyCommandData(dict):
+    """ a dictionary keyed by command that loads the command group of a key on first use """
+    def __init__(self, load_group):
+        super(LazyCommandData, self).__init__()
+        self.load_group = load_group
+
+    def __getitem__(self, key):
+        self.load_group(key)
+        return super(LazyCommandData, self).__getitem__(key)
+
+    def __contains__(self, key):
+        self.load_group(key)
+        return super(LazyCommandData, self).__contains__(key)
+
+    def get(self, key, default=None):
+        self.load_group(key)
+        return super(LazyCommandData, self).get(key, default)
+
+
 # pylint: disable=too-many-instance-attributes
 class GatherCommands(object):
     """ grabs all the cached commands from files """
     def __init__(self, config):
         # everything that is completable
         self.completable = []
+        # all the commands and command groups
+        self.command_names = []
         # a completable to the description of what is does
-        self.descrip = {}
+        self.descrip = LazyCommandData(self._load_group)
         # from a command to a list of parameters
         self.command_param = {}
 
         self.completable_param = []
-        self.command_example = {}
+        self.command_example = LazyCommandData(self._load_group)
         self.command_tree = CommandHead()
-        self.param_descript = {}
+        self.param_descript = LazyCommandData(self._load_group)
         self.completer = None
-        self.command_param_info = {}
+        self.command_param_info = LazyCommandData(self._load_group)
 
         self.global_param_descriptions = GLOBAL_PARAM_DESCRIPTIONS
         self.output_choices = OUTPUT_CHOICES
         self.output_options = OUTPUT_OPTIONS
         self.global_param = GLOBAL_PARAM
 
+        # the command store and the command groups which are not loaded yet
+        self.store_dir = get_store_dir(config)
+        self.unloaded_groups = {}
+        self.cols = _get_window_columns()
+
         try:
-            self._gather_from_files(config)
+            index = load_command_index(self.store_dir)
+            if index:
+                self._gather_from_index(index)
+            else:
+                self._gather_from_files(config)
         except (TypeError, KeyError, ValueError):
             logger.warning('Encountered unrecognizable cache, interactive will create a new updated cache for use.')
 
@@ -100,6 +131,8 @@ class GatherCommands(object):
         """ adds the exits from the application """
         self.completable.append("quit")
         self.completable.append("exit")
+        self.command_names.append("quit")
+        self.command_names.append("exit")
 
         self.descrip["quit"] = "Exits the program"
         self.descrip["exit"] = "Exits the program"
@@ -110,62 +143,87 @@ class GatherCommands(object):
         self.command_param["quit"] = ""
         self.command_param["exit"] = ""
 
+    def _gather_from_index(self, index):
+        """ gathers the command names from the command store, the rest is loaded per command group on demand """
+        self.add_exit()
+        for command in index['commands']:
+            self._add_command_name(command)
+        self.completable_param.extend(index['params'])
+        self.unloaded_groups = dict(index['groups'])
+
+    def _load_group(self, key):
+        """ loads the descriptions, parameters and examples of the command group of the key """
+        group = get_group(key)
+        shard = self.unloaded_groups.pop(group, None)
+        if shard:
+            data = load_command_group(self.store_dir, shard)
+            for command in data:
+                self._add_command_data(command, data[command])
+
     def _gather_from_files(self, config):
         """ gathers from the files in a way that is convienent to use """
         command_file = config.get_help_files()
         cache_path = os.path.join(config.get_config_dir(), 'cache')
-        cols = _get_window_columns()
 
         with open(os.path.join(cache_path, command_file), 'r') as help_file:
             data = json.load(help_file)
         self.add_exit()
-        commands = data.keys()
 
-        for command in commands:
-            branch = self.command_tree
-            for word in command.split():
-                if word not in self.completable:
-                    self.completable.append(word)
-                if not branch.has_child(word):
-                    branch.add_child(CommandBranch(word))
-                branch = branch.get_child(word)
-
-            description = data[command]['help']
-            self.descrip[command] = add_new_lines(description, line_min=int(cols) - 2 * TOLERANCE)
-
-            if 'examples' in data[command]:
-                examples = []
-                for example in data[command]['examples']:
-                    examples.append([
-                        add_new_lines(example[0], line_min=int(cols) - 2 * TOLERANCE),
-                        add_new_lines(example[1], line_min=int(cols) - 2 * TOLERANCE)])
-                self.command_example[command] = examples
-
-            command_params = data[command].get('parameters', {})
-            for param in command_params:
-                if '==SUPPRESS==' not in command_params[param]['help']:
-                    param_aliases = set()
-
-                    for par in command_params[param]['name']:
-                        param_aliases.add(par)
-
-                        self.param_descript[command + " " + par] = \
-                            add_new_lines(
-                                command_params[param]['required'] +
-                                " " + command_params[param]['help'],
-                                line_min=int(cols) - 2 * TOLERANCE)
-                        if par not in self.completable_param:
-                            self.completable_param.append(par)
-
-                    param_doubles = self.command_param_info.get(command, {})
-                    for alias in param_aliases:
-                        param_doubles[alias] = param_aliases
-                    self.command_param_info[command] = param_doubles
+        for command in data:
+            self._add_command_name(command)
+            self._add_command_data(command, data[command])
+
+    def _add_command_name(self, command):
+        """ adds the command to the command tree """
+        self.command_names.append(command)
+        branch = self.command_tree
+        for word in command.split():
+            if word not in self.completable:
+                self.completable.append(word)
+            if not branch.has_child(word):
+                branch.add_child(CommandBranch(word))
+            branch = branch.get_child(word)
+
+    def _add_command_data(self, command, command_data):
+        """ adds the description, examples and parameters of the command """
+        line_min = int(self.cols) - 2 * TOLERANCE
+
+        description = command_data['help']
+        self.descrip[command] = add_new_lines(description, line_min=line_min)
+
+        if 'examples' in command_data:
+            examples = []
+            for example in command_data['examples']:
+                examples.append([
+                    add_new_lines(example[0], line_min=line_min),
+                    add_new_lines(example[1], line_min=line_min)])
+            self.command_example[command] = examples
+
+        command_params = command_data.get('parameters', {})
+        for param in command_params:
+            if '==SUPPRESS==' not in command_params[param]['help']:
+                param_aliases = set()
+
+                for par in command_params[param]['name']:
+                    param_aliases.add(par)
+
+                    self.param_descript[command + " " + par] = \
+                        add_new_lines(
+                            command_params[param]['required'] +
+                            " " + command_params[param]['help'],
+                            line_min=line_min)
+                    if par not in self.completable_param:
+                        self.completable_param.append(par)
+
+                param_doubles = self.command_param_info.get(command, {})
+                for alias in param_aliases:
+                    param_doubles[alias] = param_aliases
+                self.command_param_info[command] = param_doubles
 
     def get_all_subcommands(self):
         """ returns all the subcommands """
         subcommands = []
-        for command in self.descrip:
+        for command in self.command_names:
             for word in command.split():
                 for kid in self.command_tree.children:
                     if word != kid and word not in subcommands:
@@ -0,0 +1,27 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+from bisect import bisect_left
+
+# sorts after every character a command, parameter or value could have
+MAX_CHAR = u'\uffff'
+
+
+class PrefixIndex(object):
+    """ the words sorted case insensitively, to find the words starting with a prefix by bisection """
+    def __init__(self, words=None):
+        entries = sorted((word.lower(), word) for word in set(words or []))
+        self.keys = [key for key, _ in entries]
+        self.words = [word for _, word in entries]
+
+    def get_range(self, prefix):
+        """ the words that start with the prefix, ignoring the case, in sorted order """
+        prefix = prefix.lower()
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + MAX_CHAR, lo=start)
+        return self.words[start:end]
+
+    def __len__(self):
+        return len(self.words)
@@ -0,0 +1,138 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import timeit
+from collections import deque, OrderedDict
+
+
+# how many completions and completer calls are kept
+PROFILE_SIZE = 500
+
+PRE_COMPLETER_EVENT = 'pre completer text parsing event'
+SUB_TREE_LOOKUP = 'subtree lookup'
+POST_SUB_TREE_EVENT = 'post subtree event'
+STATIC_COMPLETIONS = 'static completions'
+ARGUMENT_PARSE = 'argument parse'
+DYNAMIC_COMPLETIONS = 'dynamic completions'
+
+
+class _NoPhase(object):
+    """ does nothing when the profiler is off """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class _Phase(object):
+    """ adds the time spent in the block to a phase of the current completion """
+    def __init__(self, timings, name, timer):
+        self.timings = timings
+        self.name = name
+        self.timer = timer
+        self.start = None
+
+    def __enter__(self):
+        self.start = self.timer()
+        return self
+
+    def __exit__(self, *args):
+        self.timings[self.name] = self.timings.get(self.name, 0) + self.timer() - self.start
+        return False
+
+
+NO_PHASE = _NoPhase()
+
+
+class CompletionProfiler(object):
+    """ records how long each phase of generating the completions of a keystroke takes """
+    def __init__(self, size=PROFILE_SIZE, timer=timeit.default_timer):
+        self.enabled = False
+        self.timer = timer
+        self.completions = deque(maxlen=size)
+        self.completer_calls = deque(maxlen=size)
+        self.current = None
+
+    def start(self, text):
+        """ starts recording the completions for the text """
+        if self.enabled:
+            self.current = {'text': text, 'start': self.timer(), 'phases': OrderedDict()}
+
+    def phase(self, name):
+        """ a context manager timing a phase of the current completion """
+        if self.enabled and self.current is not None:
+            return _Phase(self.current['phases'], name, self.timer)
+        return NO_PHASE
+
+    def finish(self):
+        """ stops recording the current completions """
+        if self.current is not None:
+            record = self.current
+            self.current = None
+            record['total'] = self.timer() - record.pop('start')
+            self.completions.append(record)
+
+    def record_completer(self, command, arg_name, elapsed, prefetch=False):
+        """ records a call to the completer of an argument """
+        if self.enabled:
+            self.completer_calls.append({
+                'command': command,
+                'argument': arg_name,
+                'time': elapsed,
+                'prefetch': prefetch
+            })
+
+    def clear(self):
+        self.completions.clear()
+        self.completer_calls.clear()
+
+    def get_phase_stats(self):
+        """ the number of times, mean and max time of each phase, totals under 'total' """
+        times = OrderedDict()
+        for record in list(self.completions):
+            for name, elapsed in record['phases'].items():
+                times.setdefault(name, []).append(elapsed)
+            times.setdefault('total', []).append(record['total'])
+        return OrderedDict((name, _stats(values)) for name, values in times.items())
+
+    def get_completer_stats(self):
+        """ the number of calls, mean and max time of each argument completer, slowest first """
+        times = {}
+        for call in list(self.completer_calls):
+            times.setdefault((call['command'], call['argument']), []).append(call['time'])
+        stats = [(key, _stats(values)) for key, values in times.items()]
+        return sorted(stats, key=lambda stat: stat[1]['max'], reverse=True)
+
+    def summary(self):
+        """ the phase and completer timings formatted as text """
+        lines = ['{:<34}{:>8}{:>12}{:>12}'.format('Phase', 'Count', 'Mean (ms)', 'Max (ms)')]
+        for name, stats in self.get_phase_stats().items():
+            lines.append(_format_stats(name, stats))
+        completer_stats = self.get_completer_stats()
+        if completer_stats:
+            lines.append('')
+            lines.append('{:<34}{:>8}{:>12}{:>12}'.format('Completer', 'Count', 'Mean (ms)', 'Max (ms)'))
+            for (command, arg_name), stats in completer_stats:
+                lines.append(_format_stats('{} {}'.format(command, arg_name), stats))
+        return '\n'.join(lines)
+
+    def dump(self, path):
+        """ writes the recorded timings into a JSON file """
+        with open(path, 'w') as profile_file:
+            json.dump({
+                'completions': list(self.completions),
+                'completer_calls': list(self.completer_calls)
+            }, profile_file, indent=2)
+
+
+def _stats(values):
+    return {'count': len(values), 'mean': sum(values) / len(values), 'max': max(values)}
+
+
+def _format_stats(name, stats):
+    return '{:<34}{:>8}{:>12.2f}{:>12.2f}'.format(
+        name[:33], stats['count'], stats['mean'] * 1000, stats['max'] * 1000)
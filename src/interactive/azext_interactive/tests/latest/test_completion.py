@@ -4,12 +4,17 @@
 # --------------------------------------------------------------------------------------------
 
 import os
+import shutil
+import tempfile
 import unittest
 import mock
 
+from argcomplete.completers import FilesCompleter
 from azure.cli.core.mock import DummyCli
 from azext_interactive.azclishell.configuration import Configuration
 from azext_interactive.azclishell.app import AzInteractiveShell
+from azext_interactive.azclishell.command_store import get_store_dir, write_command_store
+from azext_interactive.azclishell.gather_commands import GatherCommands
 
 from prompt_toolkit.document import Document
 
@@ -142,6 +147,68 @@ class CompletionTest(unittest.TestCase):
         self.assertEqual(completion.text, '-g')
         self.assertIn('Name of resource group', completion._display_meta)
 
+    def test_param_completion_from_command_store(self):
+        command_data = {
+            'vm create': {
+                'help': 'Create an Azure Virtual Machine.',
+                'parameters': {
+                    '--name': {'name': ['--name', '-n'], 'required': '[REQUIRED]', 'help': 'Name of the VM.'},
+                    '--size': {'name': ['--size'], 'required': '', 'help': 'The VM size.'}
+                }
+            }
+        }
+        config_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, config_dir)
+        with mock.patch.object(Configuration, 'get_config_dir', lambda _: config_dir):
+            write_command_store(command_data, get_store_dir(self.shell_ctx.config), 'azure-cli-core==2.0.0')
+            commands = GatherCommands(self.shell_ctx.config)
+        self.assertTrue(commands.unloaded_groups)
+        self.completer.start(commands)
+
+        # the parameters of the command group loaded on first use
+        doc = Document(u'vm create ')
+        gen = self.completer.get_completions(doc, None)
+        self.verify_completions(gen, set(['--name', '--size']), 0, all_completions_expected=False)
+
+        # test duplicated parameter alias
+        doc = Document(u'vm create --name Bob -')
+        gen = self.completer.get_completions(doc, None)
+        self.verify_completions(gen, set(), -1, all_completions_expected=False, unexpected_completions=set(['-n']))
+
+        # test displayed help
+        doc = Document(u'vm create --si')
+        completion = next(self.completer.get_completions(doc, None))
+        self.assertEqual('--size', completion.text)
+        self.assertIn('The VM size.', completion._display_meta)
+
+    def test_dynamic_values_cached_for_every_prefix(self):
+        prefixes = []
+
+        def _completer(prefix, action, parsed_args):  # pylint: disable=unused-argument
+            prefixes.append(prefix)
+            return ['rg1', 'rg2', 'other']
+
+        class _FilesCompleter(FilesCompleter):
+            def __call__(self, prefix, **kwargs):  # pylint: disable=arguments-differ
+                prefixes.append(prefix)
+                return [prefix + 'file']
+
+        self.completer.cmdtab = {'group show': mock.Mock(arguments={
+            'name': mock.Mock(completer=_completer), 'path': mock.Mock(completer=_FilesCompleter())})}
+        self.completer.completion_cache.clear()
+
+        # the values are filtered by the typed word, the completer is called once
+        for prefix in ['', 'r', 'rg']:
+            self.assertEqual(['rg1', 'rg2', 'other'],
+                             self.completer.get_dynamic_values('group show', 'name', None, prefix))
+        self.assertEqual([''], prefixes)
+
+        # the files depend on the directory typed
+        self.assertEqual(['src/file'], self.completer.get_dynamic_values('group show', 'path', None, 'src/'))
+        self.assertEqual(['src/file'], self.completer.get_dynamic_values('group show', 'path', None, 'src/'))
+        self.assertEqual(['lib/file'], self.completer.get_dynamic_values('group show', 'path', None, 'lib/'))
+        self.assertEqual(['', 'src/', 'lib/'], prefixes)
+
 
 if __name__ == '__main__':
     unittest.main()
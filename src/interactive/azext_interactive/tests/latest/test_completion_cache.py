@@ -0,0 +1,74 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import argparse
+import unittest
+
+from argcomplete.completers import DirectoriesCompleter, FilesCompleter
+
+from azext_interactive.azclishell.completion_cache import CompletionCache, depends_on_prefix, get_completion_key
+
+
+class MockTimer(object):
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class CompletionCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.timer = MockTimer()
+        self.cache = CompletionCache(ttl=10, max_size=2, timer=self.timer)
+
+    def test_get_and_set(self):
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.set('key', (name for name in ['rg1', 'rg2']))
+        self.assertEqual(['rg1', 'rg2'], self.cache.get('key'))
+        self.assertIn('key', self.cache)
+
+    def test_expiry(self):
+        self.cache.set('key', ['rg1'])
+        self.timer.now = 10
+        self.assertEqual(['rg1'], self.cache.get('key'))
+        self.timer.now = 11
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(0, len(self.cache))
+
+    def test_lru_eviction(self):
+        self.cache.set('first', ['1'])
+        self.cache.set('second', ['2'])
+        # using the first entry makes the second the least recently used
+        self.cache.get('first')
+        self.cache.set('third', ['3'])
+        self.assertEqual(2, len(self.cache))
+        self.assertIsNone(self.cache.get('second'))
+        self.assertEqual(['1'], self.cache.get('first'))
+        self.assertEqual(['3'], self.cache.get('third'))
+
+    def test_completion_key(self):
+        parsed_args = argparse.Namespace(resource_group_name='rg1', name='vm', tags=None, no_wait=False)
+        self.assertEqual(('vm show', 'name', (('resource_group_name', 'rg1'),), ''),
+                         get_completion_key('vm show', 'name', parsed_args))
+        self.assertEqual(('vm show', 'name', (), ''), get_completion_key('vm show', 'name', None))
+
+        other_group = argparse.Namespace(resource_group_name='rg2', name='vm')
+        self.assertNotEqual(get_completion_key('vm show', 'name', parsed_args),
+                            get_completion_key('vm show', 'name', other_group))
+
+        # completers of paths return the entries under the prefix
+        self.assertNotEqual(get_completion_key('storage blob upload', 'file_path', None, 'src/'),
+                            get_completion_key('storage blob upload', 'file_path', None, 'src/lib/'))
+
+    def test_depends_on_prefix(self):
+        self.assertTrue(depends_on_prefix(FilesCompleter()))
+        self.assertTrue(depends_on_prefix(DirectoriesCompleter()))
+        self.assertFalse(depends_on_prefix(lambda prefix, action, parsed_args: ['rg1']))
+        self.assertFalse(depends_on_prefix(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
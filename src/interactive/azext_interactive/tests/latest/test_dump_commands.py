@@ -0,0 +1,77 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from azext_interactive.azclishell import _dump_commands
+from azext_interactive.azclishell._dump_commands import parse_help_files, HELP_CACHE_FILE_NAME
+
+
+def _get_help_yaml(index):
+    return """
+type: command
+short-summary: Command number {}.
+examples:
+  - name: Run command number {}.
+    text: az test command{}
+""".format(index, index, index)
+
+
+class ParseHelpFilesTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.help_cache_path = os.path.join(self.cache_dir, HELP_CACHE_FILE_NAME)
+        self.help_files = {'test command{}'.format(i): _get_help_yaml(i) for i in range(10)}
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_parse_help_files(self):
+        with mock.patch.object(_dump_commands, 'HELP_CHUNK_SIZE', 3):
+            parsed = parse_help_files(self.help_files, self.help_cache_path)
+        self.assertEqual(10, len(parsed))
+        self.assertEqual('Command number 7.', parsed['test command7']['short-summary'])
+        self.assertEqual('az test command7', parsed['test command7']['examples'][0]['text'])
+        self.assertTrue(os.path.exists(self.help_cache_path))
+
+    def test_parse_help_files_in_chunks(self):
+        # the chunks are parsed by the worker threads, the results are merged in order
+        with mock.patch.object(_dump_commands, 'HELP_CHUNK_SIZE', 3), \
+                mock.patch.object(_dump_commands, '_parse_help_chunk', wraps=_dump_commands._parse_help_chunk) as parse:
+            parsed = parse_help_files(self.help_files)
+        self.assertEqual(4, parse.call_count)
+        self.assertEqual(sorted(self.help_files), sorted(parsed))
+        for index in range(10):
+            self.assertEqual('Command number {}.'.format(index), parsed['test command{}'.format(index)]['short-summary'])
+
+    def test_parse_help_files_cached(self):
+        parse_help_files(self.help_files, self.help_cache_path)
+
+        # only the changed help entry is parsed again
+        self.help_files['test command3'] = _get_help_yaml(30)
+        with mock.patch.object(_dump_commands, '_parse_help_chunk', wraps=_dump_commands._parse_help_chunk) as parse:
+            parsed = parse_help_files(self.help_files, self.help_cache_path)
+        parse.assert_called_once_with([(mock.ANY, self.help_files['test command3'])])
+        self.assertEqual('Command number 30.', parsed['test command3']['short-summary'])
+        self.assertEqual('Command number 4.', parsed['test command4']['short-summary'])
+
+        with mock.patch.object(_dump_commands, '_parse_help_chunk') as parse:
+            parse_help_files(self.help_files, self.help_cache_path)
+        parse.assert_not_called()
+
+    def test_parse_help_files_invalid_cache(self):
+        with open(self.help_cache_path, 'w') as help_cache_file:
+            help_cache_file.write('{"abc": ')
+        parsed = parse_help_files(self.help_files, self.help_cache_path)
+        self.assertEqual('Command number 0.', parsed['test command0']['short-summary'])
+
+
+if __name__ == '__main__':
+    unittest.main()
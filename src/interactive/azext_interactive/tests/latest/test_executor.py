@@ -0,0 +1,133 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from azure.cli.core.mock import DummyCli
+
+from azext_interactive.azclishell import executor
+from azext_interactive.azclishell._dump_commands import FreshTable
+from azext_interactive.azclishell.executor import CommandExecutor, PreloadedCommandsLoader
+
+
+class CommandExecutorTest(unittest.TestCase):
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp()
+        self.stores = {name: mock.MagicMock() for name in ('ACCOUNT', 'CONFIG', 'SESSION')}
+        self.patchers = [mock.patch.object(executor, 'get_config_dir', lambda: self.config_dir)]
+        self.patchers += [mock.patch.object(executor, name, store) for name, store in self.stores.items()]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        shutil.rmtree(self.config_dir)
+
+    def test_load_session_files_once(self):
+        command_executor = CommandExecutor(mock.MagicMock())
+        command_executor.load_session_files()
+        command_executor.load_session_files()
+        for store in self.stores.values():
+            self.assertEqual(1, store.load.call_count)
+        self.stores['SESSION'].load.assert_called_with(os.path.join(self.config_dir, 'az.sess'), max_age=3600)
+
+    def test_load_changed_session_files(self):
+        command_executor = CommandExecutor(mock.MagicMock())
+        command_executor.load_session_files()
+
+        # e.g. az login run outside of the shell
+        with open(os.path.join(self.config_dir, 'azureProfile.json'), 'w') as profile_file:
+            profile_file.write('{}')
+        command_executor.load_session_files()
+        self.assertEqual(2, self.stores['ACCOUNT'].load.call_count)
+        self.assertEqual(1, self.stores['CONFIG'].load.call_count)
+
+        # the session expires
+        command_executor.session_load_time -= executor.SESSION_MAX_AGE + 1
+        command_executor.load_session_files()
+        self.assertEqual(2, self.stores['SESSION'].load.call_count)
+
+    def test_create_invocation(self):
+        cli_ctx = mock.MagicMock()
+        CommandExecutor(cli_ctx).create_invocation()
+        cli_ctx.invocation_cls.assert_called_once_with(cli_ctx=cli_ctx,
+                                                       parser_cls=cli_ctx.parser_cls,
+                                                       commands_loader_cls=PreloadedCommandsLoader,
+                                                       help_cls=cli_ctx.help_cls)
+
+
+class LocalCommandsLoader(object):  # pylint: disable=too-few-public-methods
+    """ a command loader of the shell, its arguments loaded without the applicability checks """
+
+    def __init__(self):
+        self.skip_applicability = True
+        self.argument_registry = object()
+        self.extra_argument_registry = {}
+        self.command_table = {}
+
+
+class LocalCommand(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, loader):
+        self.loader = loader
+        self.arguments = {'name': object()}
+
+
+class PreloadedCommandsLoaderTest(unittest.TestCase):
+    def tearDown(self):
+        FreshTable.loader = None
+
+    def test_preloaded_command_table(self):
+        vm_loader = LocalCommandsLoader()
+        shell_loader = mock.MagicMock()
+        shell_loader.command_table = {'vm create': LocalCommand(vm_loader), 'vm list': LocalCommand(vm_loader)}
+        shell_loader.cmd_to_loader_map = {'vm create': [vm_loader], 'vm list': [vm_loader]}
+        vm_loader.command_table = shell_loader.command_table
+        shell_arguments = shell_loader.command_table['vm list'].arguments
+        shell_registry = vm_loader.argument_registry
+        FreshTable.loader = shell_loader
+
+        loader = PreloadedCommandsLoader(DummyCli())
+        command_table = loader.load_command_table(['vm', 'list'])
+        self.assertEqual(shell_loader.command_table, command_table)
+        self.assertIsNot(shell_loader.command_table, command_table)
+        self.assertIsNot(shell_loader.argument_registry, loader.argument_registry)
+
+        # the arguments of the command run are loaded like in a normal invocation
+        with mock.patch('azure.cli.core.MainCommandsLoader.load_arguments') as load_arguments:
+            loader.load_arguments('vm list')
+        load_arguments.assert_called_once_with('vm list')
+        command = loader.command_table['vm list']
+        command_loader = loader.cmd_to_loader_map['vm list'][0]
+        self.assertEqual({}, command.arguments)
+        self.assertIs(command_loader, command.loader)
+        self.assertFalse(command_loader.skip_applicability)
+        self.assertIsNot(shell_registry, command_loader.argument_registry)
+        self.assertEqual({'vm list': command}, command_loader.command_table)
+
+        # what the completer uses is left as it was
+        self.assertIsNot(shell_loader.command_table['vm list'], command)
+        self.assertIs(shell_arguments, shell_loader.command_table['vm list'].arguments)
+        self.assertEqual(['name'], list(shell_arguments))
+        self.assertEqual([vm_loader], shell_loader.cmd_to_loader_map['vm list'])
+        self.assertTrue(vm_loader.skip_applicability)
+        self.assertIs(shell_registry, vm_loader.argument_registry)
+        self.assertIs(shell_loader.command_table, vm_loader.command_table)
+
+    def test_without_preloaded_command_table(self):
+        with mock.patch('azure.cli.core.MainCommandsLoader.load_command_table', return_value={}) as load_table:
+            loader = PreloadedCommandsLoader(DummyCli())
+            loader.load_command_table(['vm', 'list'])
+        load_table.assert_called_once_with(['vm', 'list'])
+        self.assertFalse(loader.preloaded)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,8 +3,45 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import os
+import shutil
+import tempfile
 import unittest
-from azext_interactive.azclishell.gather_commands import add_new_lines as nl
+
+import mock
+
+from azext_interactive.azclishell.command_store import get_store_dir, load_command_index, write_command_store
+from azext_interactive.azclishell.gather_commands import add_new_lines as nl, GatherCommands
+
+TEST_COMMAND_DATA = {
+    'vm': {'help': 'Manage Linux or Windows virtual machines.'},
+    'vm create': {
+        'help': 'Create an Azure Virtual Machine.',
+        'parameters': {
+            '--name': {'name': ['--name', '-n'], 'required': '[REQUIRED]', 'help': 'Name of the virtual machine.'},
+            '--hidden': {'name': ['--hidden'], 'required': '', 'help': '==SUPPRESS=='}
+        },
+        'examples': [['Create a VM.', 'az vm create -n MyVm']]
+    },
+    'storage account list': {
+        'help': 'List storage accounts.',
+        'parameters': {
+            '--resource-group': {'name': ['--resource-group', '-g'], 'required': '', 'help': 'Name of resource group.'}
+        },
+        'examples': ''
+    }
+}
+
+
+class MockConfig(object):
+    def __init__(self, config_dir):
+        self.config_dir = config_dir
+
+    def get_config_dir(self):
+        return self.config_dir
+
+    def get_help_files(self):
+        return 'help_dump.json'
 
 
 class GatherTest(unittest.TestCase):
@@ -56,5 +93,55 @@ class GatherTest(unittest.TestCase):
         )
 
 
+class CommandStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.config = MockConfig(tempfile.mkdtemp())
+        self.store_dir = get_store_dir(self.config)
+
+    def tearDown(self):
+        shutil.rmtree(self.config.get_config_dir())
+
+    def test_write_command_store(self):
+        write_command_store(TEST_COMMAND_DATA, self.store_dir, 'azure-cli-core==2.0.0')
+        index = load_command_index(self.store_dir)
+        self.assertEqual('azure-cli-core==2.0.0', index['version'])
+        self.assertEqual(['storage account list', 'vm', 'vm create'], index['commands'])
+        self.assertEqual(['--name', '--resource-group', '-g', '-n'], index['params'])
+        self.assertEqual({'storage': 'storage.json', 'vm': 'vm.json'}, index['groups'])
+
+        # groups which are no longer installed are removed
+        write_command_store({'vm': TEST_COMMAND_DATA['vm']}, self.store_dir, 'azure-cli-core==2.0.1')
+        self.assertEqual(['index.json', 'vm.json'], sorted(os.listdir(self.store_dir)))
+
+    def test_load_command_index_invalid(self):
+        self.assertEqual({}, load_command_index(self.store_dir))
+        os.makedirs(self.store_dir)
+        with open(os.path.join(self.store_dir, 'index.json'), 'w') as index_file:
+            index_file.write('{"version": ')
+        self.assertEqual({}, load_command_index(self.store_dir))
+
+    def test_gather_from_store(self):
+        write_command_store(TEST_COMMAND_DATA, self.store_dir, 'azure-cli-core==2.0.0')
+        with mock.patch('azext_interactive.azclishell.gather_commands._get_window_columns', lambda: 100):
+            commands = GatherCommands(self.config)
+
+        self.assertTrue(commands.command_tree.in_tree(['storage', 'account', 'list']))
+        self.assertTrue(commands.command_tree.in_tree(['vm', 'create']))
+        self.assertIn('-g', commands.completable_param)
+        self.assertNotIn('--hidden', commands.completable_param)
+        self.assertEqual(sorted(['vm', 'storage']), sorted(commands.unloaded_groups))
+
+        # only the group of the command is loaded
+        self.assertEqual('Create an Azure Virtual Machine.\n', commands.descrip['vm create'])
+        self.assertEqual(['storage'], list(commands.unloaded_groups))
+        self.assertIn('vm create -n', commands.param_descript)
+        self.assertEqual({'--name': {'--name', '-n'}, '-n': {'--name', '-n'}}, commands.command_param_info['vm create'])
+        self.assertEqual(1, len(commands.command_example['vm create']))
+        self.assertNotIn('storage account list', dict(commands.descrip))
+
+        self.assertIn('storage account list -g', commands.param_descript)
+        self.assertEqual({}, commands.unloaded_groups)
+
+
 if __name__ == '__main__':
     unittest.main()
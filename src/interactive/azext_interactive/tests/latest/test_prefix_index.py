@@ -0,0 +1,44 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+
+from azext_interactive.azclishell.command_tree import CommandBranch, CommandHead
+from azext_interactive.azclishell.prefix_index import PrefixIndex
+
+
+class PrefixIndexTest(unittest.TestCase):
+    def test_get_range(self):
+        index = PrefixIndex(['vmss', 'vm', 'storage', 'sql', 'Sf', 'vm'])
+        self.assertEqual(5, len(index))
+        self.assertEqual(['Sf', 'sql', 'storage', 'vm', 'vmss'], index.get_range(''))
+        self.assertEqual(['Sf', 'sql', 'storage'], index.get_range('s'))
+        self.assertEqual(['Sf'], index.get_range('SF'))
+        self.assertEqual(['vm', 'vmss'], index.get_range('vm'))
+        self.assertEqual(['vmss'], index.get_range('vms'))
+        self.assertEqual([], index.get_range('vmsss'))
+        self.assertEqual([], index.get_range('z'))
+
+    def test_parameters(self):
+        index = PrefixIndex(['--name', '-n', '--resource-group', '-g', '--no-wait'])
+        self.assertEqual(['--name', '--no-wait', '--resource-group', '-g', '-n'], index.get_range('-'))
+        self.assertEqual(['--name', '--no-wait', '--resource-group'], index.get_range('--'))
+        self.assertEqual(['--name', '--no-wait'], index.get_range('--n'))
+
+    def test_command_tree_prefix_index(self):
+        tree = CommandHead()
+        tree.add_child(CommandBranch('vm'))
+        tree.get_child('vm').add_child(CommandBranch('create'))
+        tree.build_prefix_indexes()
+        self.assertEqual(['vm'], tree.get_prefix_index().get_range('v'))
+        self.assertEqual(['create'], tree.get_child('vm').get_prefix_index().get_range(''))
+
+        # adding a child updates the index
+        tree.add_child(CommandBranch('vmss'))
+        self.assertEqual(['vm', 'vmss'], tree.get_prefix_index().get_range('v'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from azext_interactive.azclishell.profiler import CompletionProfiler, STATIC_COMPLETIONS, SUB_TREE_LOOKUP
+
+
+class MockTimer(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CompletionProfilerTest(unittest.TestCase):
+    def setUp(self):
+        self.timer = MockTimer()
+        self.profiler = CompletionProfiler(size=2, timer=self.timer)
+
+    def _complete(self, text, lookup_time, static_time):
+        self.profiler.start(text)
+        with self.profiler.phase(SUB_TREE_LOOKUP):
+            self.timer.now += lookup_time
+        with self.profiler.phase(STATIC_COMPLETIONS):
+            self.timer.now += static_time
+        self.profiler.finish()
+
+    def test_off_by_default(self):
+        self._complete('vm ', 1, 1)
+        self.profiler.record_completer('vm show', 'name', 1)
+        self.assertEqual(0, len(self.profiler.completions))
+        self.assertEqual(0, len(self.profiler.completer_calls))
+
+    def test_phase_stats(self):
+        self.profiler.enabled = True
+        self._complete('vm ', 0.001, 0.003)
+        self._complete('vm c', 0.003, 0.001)
+        stats = self.profiler.get_phase_stats()
+        self.assertEqual([SUB_TREE_LOOKUP, STATIC_COMPLETIONS, 'total'], list(stats))
+        self.assertEqual(2, stats[SUB_TREE_LOOKUP]['count'])
+        self.assertAlmostEqual(0.002, stats[SUB_TREE_LOOKUP]['mean'])
+        self.assertAlmostEqual(0.003, stats[STATIC_COMPLETIONS]['max'])
+        self.assertAlmostEqual(0.004, stats['total']['max'])
+
+        # only the latest completions are kept
+        self._complete('vm cr', 0.005, 0.005)
+        self.assertEqual(['vm c', 'vm cr'], [record['text'] for record in self.profiler.completions])
+
+    def test_completer_stats(self):
+        self.profiler.enabled = True
+        self.profiler.record_completer('vm show', 'name', 0.5)
+        self.profiler.record_completer('vm show', 'resource_group_name', 2.0, prefetch=True)
+        stats = self.profiler.get_completer_stats()
+        self.assertEqual([('vm show', 'resource_group_name'), ('vm show', 'name')], [key for key, _ in stats])
+        self.assertIn('vm show resource_group_name', self.profiler.summary())
+
+    def test_dump(self):
+        self.profiler.enabled = True
+        self._complete('vm ', 0.001, 0.003)
+        self.profiler.record_completer('vm show', 'name', 0.5)
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, 'profile.json')
+            self.profiler.dump(path)
+            with open(path, 'r') as profile_file:
+                profile = json.load(profile_file)
+        finally:
+            shutil.rmtree(temp_dir)
+        self.assertEqual('vm ', profile['completions'][0]['text'])
+        self.assertEqual('name', profile['completer_calls'][0]['argument'])
+
+
+if __name__ == '__main__':
+    unittest.main()
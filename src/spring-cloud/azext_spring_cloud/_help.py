@@ -125,6 +125,10 @@ helps['spring-cloud app deploy'] = """
       text: az spring-cloud app deploy -n MyApp -s MyCluster -g MyResourceGroup --jar-path app.jar --jvm-options="-XX:+UseG1GC -XX:+UseStringDeduplication" --env foo=bar
     - name: Deploy source code to a specific deployment of an app.
       text: az spring-cloud app deploy -n MyApp -s MyCluster -g MyResourceGroup -d green-deployment
+    - name: Deploy a large pre-built jar to an app over 16 parallel upload connections.
+      text: az spring-cloud app deploy -n MyApp -s MyCluster -g MyResourceGroup --jar-path app.jar --upload-connections 16
+    - name: Deploy a pre-built jar to an app, uploading only the content changed since the previous deployment.
+      text: az spring-cloud app deploy -n MyApp -s MyCluster -g MyResourceGroup --jar-path app.jar --incremental-upload
 """
 
 helps['spring-cloud app scale'] = """
@@ -145,6 +149,9 @@ helps['spring-cloud app show-deploy-log'] = """
 helps['spring-cloud app log tail'] = """
     type: command
     short-summary: Show logs of an app instance, logs will be streamed when setting '-f/--follow'.
+    examples:
+    - name: Stream the logs of all the instances of an app, in the order of their timestamps.
+      text: az spring-cloud app log tail -n MyApp -s MyCluster -g MyResourceGroup -f --all-instances --sort-by-time
 """
 
 helps['spring-cloud app set-deployment'] = """
@@ -164,6 +171,9 @@ helps['spring-cloud app log'] = """
 helps['spring-cloud app logs'] = """
     type: command
     short-summary: Show logs of an app instance, logs will be streamed when setting '-f/--follow'.
+    examples:
+    - name: Stream the logs of all the instances of an app, in the order of their timestamps.
+      text: az spring-cloud app logs -n MyApp -s MyCluster -g MyResourceGroup -f --all-instances --sort-by-time
 """
 
 helps['spring-cloud app deployment'] = """
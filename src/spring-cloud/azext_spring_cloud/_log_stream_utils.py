@@ -0,0 +1,181 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Streams the logs of the instances of an app at once, each instance over its own connection of a shared pool. The
+lines are prefixed with their instance and can be merged in the order of their timestamps.
+"""
+
+import re
+import sys
+import threading
+import timeit
+from collections import deque
+
+import certifi
+import urllib3
+from six.moves import queue
+from knack.log import get_logger
+from knack.util import CLIError
+
+logger = get_logger(__name__)
+
+LOG_CHUNK_SIZE = 2 ** 16
+# the chunks read but not written yet, past that the connections wait for the terminal
+LOG_QUEUE_SIZE = 64
+# how long in seconds a line waits for the lines of the other instances to write it in the order of time
+ORDER_WINDOW = 1.0
+# e.g. the 2020-03-20 08:12:37.420 of Spring Boot logs, or an ISO 8601 time
+TIMESTAMP_PATTERN = re.compile(r'\s*\[?(\d{4}-\d{2}-\d{2})[T ](\d{2}:\d{2}:\d{2}(?:[.,]\d+)?)')
+
+
+def get_log_pool_manager(max_connections):
+    try:
+        from urllib3.contrib import pyopenssl
+        pyopenssl.inject_into_urllib3()
+    except ImportError:
+        pass
+    return urllib3.PoolManager(maxsize=max_connections, cert_reqs='CERT_REQUIRED', ca_certs=certifi.where())
+
+
+def iter_response(response, amt=LOG_CHUNK_SIZE):
+    """ the chunks of a streamed response, ending when the server closes a chunked response """
+    if response.chunked and response.supports_chunked_reads():
+        try:
+            for chunk in response.read_chunked(amt):
+                yield chunk
+        except urllib3.exceptions.ProtocolError:
+            return
+    else:
+        while not response.is_fp_closed(response._fp):  # pylint: disable=protected-access
+            data = response.read(amt=amt)
+
+            if data:
+                yield data
+
+
+class LogMerger(object):
+    """
+    Writes the lines of the instances prefixed with their instance. Ordered by time, a line is written once every
+    instance still streaming has a line after it, or after it waited the order window. The lines without a
+    timestamp, e.g. of a stack trace, keep the timestamp of the line before them.
+    """
+
+    def __init__(self, instances, write, sort_by_time=False, window=ORDER_WINDOW, timer=timeit.default_timer):
+        width = max(len(instance) for instance in instances) + 3
+        self.prefixes = {instance: '[{}]'.format(instance).ljust(width) for instance in instances}
+        self.write = write
+        self.sort_by_time = sort_by_time
+        self.window = window
+        self.timer = timer
+        self.pending = {instance: deque() for instance in instances}
+        self.timestamps = {instance: '' for instance in instances}
+        self.streaming = set(instances)
+
+    def add(self, instance, lines):
+        """ add the lines of the instance, bytes without their line break """
+        received = self.timer()
+        for line in lines:
+            text = line.decode('utf-8', errors='replace').rstrip('\r')
+            if not self.sort_by_time:
+                self.write(self.prefixes[instance] + text)
+                continue
+            match = TIMESTAMP_PATTERN.match(text)
+            if match:
+                self.timestamps[instance] = '{} {}'.format(match.group(1), match.group(2).replace(',', '.'))
+            self.pending[instance].append((self.timestamps[instance], received, text))
+        self.flush()
+
+    def end(self, instance):
+        self.streaming.discard(instance)
+        self.flush()
+
+    def flush(self, force=False):
+        """ write the lines that can be ordered, or all of them when forced """
+        now = self.timer()
+        while True:
+            heads = [(lines[0][0], instance) for instance, lines in self.pending.items() if lines]
+            if not heads:
+                return
+            _, instance = min(heads)
+            _, received, text = self.pending[instance][0]
+            if not force and received + self.window > now and \
+                    any(not self.pending[waiting] for waiting in self.streaming):
+                return
+            self.pending[instance].popleft()
+            self.write(self.prefixes[instance] + text)
+
+
+def stream_instance_logs(urls, headers, sort_by_time=False, write=None, http=None, queue_size=LOG_QUEUE_SIZE):
+    """
+    Stream the logs of the instances until they all end, writing their lines as they come.
+
+    The connections put the lines read into a bounded queue. When the terminal is slower than the logs the queue
+    fills up and the connections stop reading, so the lines waiting to be written stay within queue_size chunks.
+
+    :param urls: The log streaming URL of each instance, keyed by instance name.
+    :param headers: The headers of the requests, e.g. their basic authentication.
+    :return: The errors of the instances whose logs failed to stream.
+    """
+    http = http or get_log_pool_manager(len(urls))
+    chunks = queue.Queue(queue_size)
+    merger = LogMerger(sorted(urls), write or _write_stdout, sort_by_time)
+    for instance, url in urls.items():
+        reader = threading.Thread(target=_read_instance_log, args=(http, url, headers, instance, chunks))
+        reader.daemon = True
+        reader.start()
+
+    errors = []
+    streaming = len(urls)
+    while streaming:
+        try:
+            # with a timeout so that ctrl+c can stop the command
+            instance, lines = chunks.get(timeout=merger.window / 2)
+        except queue.Empty:
+            merger.flush()
+            continue
+        if isinstance(lines, list):
+            merger.add(instance, lines)
+            continue
+        streaming -= 1
+        if lines is not None:
+            logger.warning("Failed to stream the logs of instance '%s': %s", instance, lines)
+            errors.append(lines)
+        merger.end(instance)
+
+    merger.flush(force=True)
+    return errors
+
+
+def _read_instance_log(http, url, headers, instance, chunks):
+    """ put the lines of the instance into the queue, then None or the error it ended with """
+    try:
+        response = http.request('GET', url, headers=headers, preload_content=False)
+        try:
+            if response.status != 200:
+                raise CLIError("Failed to connect to the server with status code '{}' and reason '{}'".format(
+                    response.status, response.reason))
+            partial = b''
+            for chunk in iter_response(response):
+                lines = (partial + chunk).split(b'\n')
+                partial = lines.pop()
+                if lines:
+                    chunks.put((instance, lines))
+            if partial:
+                chunks.put((instance, [partial]))
+        finally:
+            response.release_conn()
+    except CLIError as e:
+        chunks.put((instance, e))
+        return
+    except Exception as e:  # pylint: disable=broad-except
+        chunks.put((instance, CLIError(e)))
+        return
+    chunks.put((instance, None))
+
+
+def _write_stdout(text):
+    std_encoding = sys.stdout.encoding or 'utf-8'
+    sys.stdout.write(text.encode(std_encoding, errors='replace').decode(std_encoding, errors='replace') + '\n')
@@ -61,6 +61,8 @@ def load_arguments(self, _):
         c.argument('follow', options_list=['--follow ', '-f'], help='Specify if the logs should be streamed.', action='store_true')
         c.argument('since', help='Only return logs newer than a relative duration like 5s, 2m, or 1h. Maximum is 1h', validator=validate_log_since)
         c.argument('limit', type=int, help='Maximum kilobytes of logs to return. Ceiling number is 2048.', validator=validate_log_limit)
+        c.argument('all_instances', help='Show the logs of all the instances of the deployment, each line prefixed with its instance.', action='store_true')
+        c.argument('sort_by_time', help='With --all-instances, write the lines of the instances in the order of their timestamps. Streamed lines are delayed up to a second to be ordered.', action='store_true')
 
     with self.argument_context('spring-cloud app log tail') as c:
         c.argument('instance', options_list=['--instance', '-i'], help='Name of an existing instance of the deployment.')
@@ -68,6 +70,8 @@ def load_arguments(self, _):
         c.argument('follow', options_list=['--follow ', '-f'], help='Specify if the logs should be streamed.', action='store_true')
         c.argument('since', help='Only return logs newer than a relative duration like 5s, 2m, or 1h. Maximum is 1h', validator=validate_log_since)
         c.argument('limit', type=int, help='Maximum kilobytes of logs to return. Ceiling number is 2048.', validator=validate_log_limit)
+        c.argument('all_instances', help='Show the logs of all the instances of the deployment, each line prefixed with its instance.', action='store_true')
+        c.argument('sort_by_time', help='With --all-instances, write the lines of the instances in the order of their timestamps. Streamed lines are delayed up to a second to be ordered.', action='store_true')
 
     with self.argument_context('spring-cloud app set-deployment') as c:
         c.argument('deployment', options_list=[
@@ -112,6 +116,10 @@ def load_arguments(self, _):
                 'target_module', help='Child module to be deployed, required for multiple jar packages built from source code')
             c.argument(
                 'version', help='Deployment version, keep unchanged if not set.')
+            c.argument(
+                'upload_connections', type=int, help='Number of parallel connections to upload the package with, tuned to the package size if not set.')
+            c.argument(
+                'incremental_upload', arg_type=get_three_state_flag(), help='Upload only the content of the package changed since the previous deployments from this machine. Source code is packed so unchanged files compress the same. The chunks uploaded into the upload file share of the app are not deleted.')
 
     with self.argument_context('spring-cloud app deployment create') as c:
         c.argument('skip_clone_settings', help='Create staging deployment will automatically copy settings from production deployment.',
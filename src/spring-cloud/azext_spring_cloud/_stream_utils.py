@@ -7,7 +7,6 @@
 
 import time
 import colorama   # pylint: disable=import-error
-from io import BytesIO
 from random import uniform
 from knack.util import CLIError
 from knack.log import get_logger
@@ -19,6 +18,8 @@ from ._utils import get_blob_info
 logger = get_logger(__name__)
 
 DEFAULT_CHUNK_SIZE = 1024 * 4
+# the largest range read at once, when the reads are far behind the end of the log
+MAX_CHUNK_SIZE = 1024 * 1024 * 4
 DEFAULT_LOG_TIMEOUT_IN_SEC = 60 * 30  # 30 minutes
 
 
@@ -63,6 +64,45 @@ def stream_logs(client,
                  logger_level_func)
 
 
+class _LineBuffer(object):
+    """
+    The bytes of the log read but not printed yet. The bytes read are appended to a buffer in place, and only they
+    are scanned for the last line break. The printed lines are dropped by moving the start of the buffer, which is
+    compacted once most of it was printed.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.start = 0
+
+    def write(self, data):
+        self.buffer += data
+
+    def __len__(self):
+        return len(self.buffer) - self.start
+
+    def pop_lines(self, scan_start=0):
+        """ the complete lines, finding the last line break from scan_start bytes into the pending bytes """
+        scan_start = self.start + max(scan_start - 1, 0)
+        # a \r at the end may be followed by the \n of the next read
+        end = max(self.buffer.rfind(b'\n', scan_start), self.buffer.rfind(b'\r', scan_start, len(self.buffer) - 1))
+        if end < 0:
+            return None
+        text_end = end - 1 if self.buffer[end:end + 1] == b'\n' and self.buffer[end - 1:end] == b'\r' else end
+        text = self.buffer[self.start:max(text_end, self.start)].decode('utf-8', errors='ignore')
+        self.start = end + 1
+        if self.start * 2 >= len(self.buffer):
+            del self.buffer[:self.start]
+            self.start = 0
+        return text
+
+    def pop_all(self):
+        text = self.buffer[self.start:].decode('utf-8', errors='ignore')
+        self.buffer = bytearray()
+        self.start = 0
+        return text
+
+
 def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-statements, too-many-branches
                  byte_size,
                  timeout_in_seconds,
@@ -75,10 +115,10 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
     if not no_format:
         colorama.init()
 
-    stream = BytesIO()
+    lines = _LineBuffer()
     metadata = {}
+    etag = None
     start = 0
-    end = byte_size - 1
     available = 0
     sleep_time = 1
     max_sleep_time = 15
@@ -86,89 +126,71 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
     num_fails_for_backoff = 3
     consecutive_sleep_in_sec = 0
 
-    # Try to get the initial properties so there's no waiting.
-    # If the storage call fails, we'll just sleep and try again after.
-    try:
-        props = blob_service.get_blob_properties(
-            container_name=container_name, blob_name=blob_name)
-        metadata = props.metadata
-        available = props.properties.content_length
-    except (AttributeError, AzureHttpError):
-        pass
-
-    while (_blob_is_not_complete(metadata) or start < available):
-        while start < available:
-            # Success! Reset our polling backoff.
-            sleep_time = 1
-            num_fails = 0
-            consecutive_sleep_in_sec = 0
-
-            try:
-                old_byte_size = len(stream.getvalue())
-                blob_service.get_blob_to_stream(
-                    container_name=container_name,
-                    blob_name=blob_name,
-                    start_range=start,
-                    end_range=end,
-                    stream=stream)
-
-                curr_bytes = stream.getvalue()
-                new_byte_size = len(curr_bytes)
-                amount_read = new_byte_size - old_byte_size
-                start += amount_read
-                end = start + byte_size - 1
-
-                # Only scan what's newly read. If nothing is read, default to 0.
-                min_scan_range = max(new_byte_size - amount_read - 1, 0)
-                for i in range(new_byte_size - 1, min_scan_range, -1):
-                    if curr_bytes[i - 1:i + 1] == b'\r\n':
-                        flush = curr_bytes[:i]  # won't logger.warning \n
-                        stream = BytesIO()
-                        stream.write(curr_bytes[i + 1:])
-                        logger_level_func(flush.decode('utf-8', errors='ignore'))
-                        break
-                    if curr_bytes[i:i + 1] == b'\r':
-                        flush = curr_bytes[:i + 1]  # won't logger.warning \n
-                        stream = BytesIO()
-                        stream.write(curr_bytes[i + 1:])
-                        logger_level_func(flush.decode('utf-8', errors='ignore'))
-                        break
-
-            except AzureHttpError as ae:
-                if ae.status_code != 404:
-                    raise CLIError(ae)
-            except KeyboardInterrupt:
-                curr_bytes = stream.getvalue()
-                if curr_bytes:
-                    logger_level_func(curr_bytes.decode('utf-8', errors='ignore'))
-                return
-
+    while _blob_is_not_complete(metadata) or start < available:
+        # Read what was appended since the last read, in ranges growing with how far behind the reads are.
+        # Once all of the log was read, the read only returns when the blob changed since.
+        caught_up = start >= available
+        range_size = min(max(available - start, byte_size), MAX_CHUNK_SIZE)
+        pending = len(lines)
         try:
-            props = blob_service.get_blob_properties(
-                container_name=container_name, blob_name=blob_name)
-            metadata = props.metadata
-            available = props.properties.content_length
+            blob = blob_service.get_blob_to_stream(
+                container_name=container_name,
+                blob_name=blob_name,
+                stream=lines,
+                start_range=start,
+                end_range=start + range_size - 1,
+                if_none_match=etag if caught_up else None,
+                max_connections=1)
+            metadata = blob.metadata
+            etag = blob.properties.etag
+            available = _get_blob_size(blob.properties, start)
         except AzureHttpError as ae:
-            if ae.status_code != 404:
+            if ae.status_code == 416:
+                # Nothing was appended but the blob changed, e.g. its metadata was set on completion.
+                try:
+                    props = blob_service.get_blob_properties(
+                        container_name=container_name, blob_name=blob_name)
+                    metadata = props.metadata
+                    etag = props.properties.etag
+                    available = props.properties.content_length
+                except AzureHttpError as props_error:
+                    if props_error.status_code != 404:
+                        raise CLIError(props_error)
+            elif ae.status_code not in (304, 404):
                 raise CLIError(ae)
         except KeyboardInterrupt:
-            if curr_bytes:
-                logger_level_func(curr_bytes.decode('utf-8', errors='ignore'))
+            text = lines.pop_all()
+            if text:
+                logger_level_func(text)
             return
         except Exception as err:
             raise CLIError(err)
 
+        amount_read = len(lines) - pending
+        if amount_read:
+            # Success! Reset our polling backoff.
+            sleep_time = 1
+            num_fails = 0
+            consecutive_sleep_in_sec = 0
+            start += amount_read
+
+            # Only scan what's newly read.
+            text = lines.pop_lines(pending)
+            if text is not None:
+                logger_level_func(text)
+            continue
+
         if consecutive_sleep_in_sec > timeout_in_seconds:
             # Flush anything remaining in the buffer - this would be the case
             # if the file has expired and we weren't able to detect any \r\n
-            curr_bytes = stream.getvalue()
-            if curr_bytes:
-                logger_level_func(curr_bytes.decode('utf-8', errors='ignore'))
+            text = lines.pop_all()
+            if text:
+                logger_level_func(text)
 
             return
 
         # If no new data available but not complete, sleep before trying to process additional data.
-        if (_blob_is_not_complete(metadata) and start >= available):
+        if _blob_is_not_complete(metadata) and start >= available:
             num_fails += 1
 
             if num_fails >= num_fails_for_backoff:
@@ -178,15 +200,21 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
             rnd = uniform(1, 2)  # 1.0 <= x < 2.0
             total_sleep_time = sleep_time + rnd
             consecutive_sleep_in_sec += total_sleep_time
-            time.sleep(total_sleep_time)
+            try:
+                time.sleep(total_sleep_time)
+            except KeyboardInterrupt:
+                text = lines.pop_all()
+                if text:
+                    logger_level_func(text)
+                return
 
     # One final check to see if there's anything in the buffer to flush
     # E.g., metadata has been set and start == available, but the log file
     # didn't end in \r\n, so we were unable to flush out the final contents.
-    curr_bytes = stream.getvalue()
+    text = lines.pop_all()
 
-    if curr_bytes:
-        logger_level_func(curr_bytes.decode('utf-8', errors='ignore'))
+    if text:
+        logger_level_func(text)
 
     build_status = _get_run_status(metadata).lower()
     logger_level_func("Log status was: '%s'", build_status)
@@ -200,6 +228,14 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
             raise CLIError("Run was canceled")
 
 
+def _get_blob_size(properties, start):
+    # the content range of a read is 'bytes <start>-<end>/<size of the blob>'
+    content_range = getattr(properties, 'content_range', None)
+    if content_range and '/' in content_range:
+        return int(content_range.split('/')[-1])
+    return start + properties.content_length
+
+
 def _blob_is_not_complete(metadata):
     if not metadata:
         return True
@@ -0,0 +1,377 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import tempfile
+import threading
+import time
+import timeit
+import concurrent.futures
+from collections import deque
+
+# the largest range a file share accepts in one request
+RANGE_SIZE = 4 * 1024 * 1024
+# one connection for every few ranges, so small packages don't open connections they won't use
+RANGES_PER_CONNECTION = 4
+MIN_UPLOAD_CONNECTIONS = 2
+MAX_UPLOAD_CONNECTIONS = 32
+# the connections to upload content of unknown size with, e.g. the source code as it is packed
+STREAM_UPLOAD_CONNECTIONS = 8
+
+# content defined chunks start at the local file headers of the entries of a jar or at the members of a gzip stream,
+# so an entry changing in size doesn't move the chunks after it
+CHUNK_MARKER = re.compile(b'PK\x03\x04|\x1f\x8b\x08')
+MIN_CHUNK_SIZE = 512 * 1024
+# the directory of a file share the chunks are uploaded into, named by their SHA256
+CHUNK_DIRECTORY = 'chunks'
+# how long in seconds a chunk not used by a deployment is trusted to be in the file share
+CHUNK_MAX_AGE = 14 * 24 * 3600
+
+
+class UploadResult(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, size, ranges, max_connections, elapsed, transferred=None):
+        self.size = size
+        self.ranges = ranges
+        self.max_connections = max_connections
+        self.elapsed = elapsed
+        # the bytes sent, less than the size when chunks already in the file share were reused
+        self.transferred = size if transferred is None else transferred
+
+    @property
+    def throughput(self):
+        """ the upload throughput in bytes per second """
+        return self.size / self.elapsed if self.elapsed else 0
+
+
+class ChunkManifest(object):
+    """ The chunks uploaded into each file share with when a deployment last used them, kept in a JSON file. """
+
+    def __init__(self, path, max_age=CHUNK_MAX_AGE, timer=time.time):
+        self.path = path
+        self.max_age = max_age
+        self.timer = timer
+
+    def load(self, share_url):
+        """ the SHA256 of the chunks in the file share """
+        now = self.timer()
+        return {digest for digest, used in self._load().get(share_url, {}).items() if now - used <= self.max_age}
+
+    def save(self, share_url, digests, missing_digests=()):
+        """
+        Record the chunks used by a deployment and forget the chunks missing from the file share, or unused for
+        longer than max_age.
+        """
+        now = self.timer()
+        shares = {}
+        for url, chunks in self._load().items():
+            chunks = {digest: used for digest, used in chunks.items() if now - used <= self.max_age}
+            if chunks:
+                shares[url] = chunks
+        chunks = shares.setdefault(share_url, {})
+        chunks.update((digest, now) for digest in digests)
+        for digest in missing_digests:
+            chunks.pop(digest, None)
+
+        # written to a unique file next to the manifest and moved over it, concurrent deployments never read it
+        # half written
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or None,
+                                         prefix=os.path.basename(self.path) + '.')
+        try:
+            with os.fdopen(fd, 'w') as manifest_file:
+                json.dump(shares, manifest_file)
+            if hasattr(os, 'replace'):
+                os.replace(temp_path, self.path)
+            else:
+                if os.name == 'nt' and os.path.exists(self.path):
+                    os.remove(self.path)
+                os.rename(temp_path, self.path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as manifest_file:
+                return json.load(manifest_file)
+        except (IOError, OSError, ValueError):
+            return {}
+
+
+class _RangeReader(object):
+    """
+    Reads ranges of a file at their offsets, so the workers don't share a file position or a lock.
+    os.pread is used where the platform has it, a read only memory map elsewhere.
+    """
+
+    def __init__(self, file_path, size):
+        self.fd = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        self.map = None
+        if not hasattr(os, 'pread') and size:
+            self.map = mmap.mmap(self.fd, 0, access=mmap.ACCESS_READ)
+
+    def read(self, offset, count):
+        if self.map is not None:
+            return self.map[offset:offset + count]
+        data = os.pread(self.fd, count, offset)
+        # pread may return less than asked for, e.g. when interrupted
+        while len(data) < count:
+            chunk = os.pread(self.fd, count - len(data), offset + len(data))
+            if not chunk:
+                break
+            data += chunk
+        return data
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        os.close(self.fd)
+
+
+class FileUploadStream(object):
+    """
+    A file object uploading what is written to it into a file share in ranges over parallel connections, for
+    content whose size isn't known before it is written. The file grows as it is written, doubling its size,
+    and is cut down to the size written when closed. Writing blocks while max_connections ranges are uploading.
+    """
+
+    def __init__(self, file_service, share_name, directory_name, file_name, max_connections=STREAM_UPLOAD_CONNECTIONS,
+                 range_size=RANGE_SIZE):
+        self.file_service = file_service
+        self.share_name = share_name
+        self.directory_name = directory_name
+        self.file_name = file_name
+        self.max_connections = max_connections
+        self.range_size = range_size
+        self.buffer = bytearray()
+        self.position = 0
+        self.file_size = 0
+        self.ranges = 0
+        self.pending = deque()
+        self.executor = None
+        self.result = None
+        self.start_time = timeit.default_timer()
+        file_service.create_file(share_name, directory_name, file_name, 0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif self.executor is not None:
+            for pending in self.pending:
+                pending.cancel()
+            self.executor.shutdown()
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.range_size:
+            self._upload_range(bytes(self.buffer[:self.range_size]))
+            del self.buffer[:self.range_size]
+        return len(data)
+
+    def tell(self):
+        return self.position + len(self.buffer)
+
+    def close(self):
+        """ upload the rest of the content and wait for the ranges, the UploadResult is in result """
+        if self.result is not None:
+            return
+        if self.buffer:
+            self._upload_range(bytes(self.buffer))
+            self.buffer = bytearray()
+        while self.pending:
+            self.pending.popleft().result()
+        if self.executor is not None:
+            self.executor.shutdown()
+        if self.file_size != self.position:
+            self.file_service.resize_file(self.share_name, self.directory_name, self.file_name, self.position)
+        self.result = UploadResult(self.position, self.ranges, self.max_connections,
+                                   timeit.default_timer() - self.start_time)
+
+    def _upload_range(self, data):
+        offset = self.position
+        self.position += len(data)
+        self.ranges += 1
+        if self.position > self.file_size:
+            self.file_size = max(self.position, self.file_size * 2)
+            self.file_service.resize_file(self.share_name, self.directory_name, self.file_name, self.file_size)
+
+        if self.max_connections <= 1:
+            self.file_service.update_range(self.share_name, self.directory_name, self.file_name, data, offset,
+                                           self.position - 1)
+            return
+        if self.executor is None:
+            self.executor = concurrent.futures.ThreadPoolExecutor(self.max_connections)
+        while self.pending and (self.pending[0].done() or len(self.pending) >= self.max_connections):
+            # raises the failure of a range
+            self.pending.popleft().result()
+        self.pending.append(self.executor.submit(self.file_service.update_range, self.share_name,
+                                                 self.directory_name, self.file_name, data, offset,
+                                                 self.position - 1))
+
+
+def get_max_connections(size, range_size=RANGE_SIZE):
+    """ the number of parallel connections to upload a file of the size with """
+    ranges = (size + range_size - 1) // range_size
+    return max(MIN_UPLOAD_CONNECTIONS, min(MAX_UPLOAD_CONNECTIONS, ranges // RANGES_PER_CONNECTION))
+
+
+def get_request_session(max_connections=MAX_UPLOAD_CONNECTIONS):
+    """ a requests session keeping a connection open for each upload worker """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def upload_file(file_service, share_name, directory_name, file_name, file_path,
+                max_connections=None, range_size=RANGE_SIZE, progress_callback=None):
+    """
+    Upload a local file into a file share in ranges over parallel connections. Each worker reads its own range,
+    at most max_connections ranges are in memory at a time.
+
+    :param file_service: A FileService, or any client with its create_file and update_range operations.
+    :param int max_connections: The number of parallel connections, tuned to the file size if not set.
+    :param progress_callback: Called with the bytes uploaded so far and the file size after each range.
+    :type progress_callback: func(current, total)
+    """
+    start_time = timeit.default_timer()
+    size = os.path.getsize(file_path)
+    max_connections = max_connections or get_max_connections(size, range_size)
+    offsets = list(range(0, size, range_size))
+    file_service.create_file(share_name, directory_name, file_name, size)
+
+    progress = [0]
+    progress_lock = threading.Lock()
+    reader = _RangeReader(file_path, size)
+
+    def _upload_range(offset):
+        data = reader.read(offset, min(range_size, size - offset))
+        file_service.update_range(share_name, directory_name, file_name, data, offset, offset + len(data) - 1)
+        if progress_callback is not None:
+            with progress_lock:
+                progress[0] += len(data)
+                current = progress[0]
+            progress_callback(current, size)
+
+    try:
+        _run_parallel(_upload_range, offsets, max_connections)
+    finally:
+        reader.close()
+
+    return UploadResult(size, len(offsets), max_connections, timeit.default_timer() - start_time)
+
+
+def get_chunks(data, min_size=MIN_CHUNK_SIZE, max_size=RANGE_SIZE):
+    """
+    The start and end offsets of the content defined chunks of the data, a bytes-like object or a memory map.
+    A chunk ends at the first marker at least min_size into it, or after max_size bytes.
+    """
+    chunks = []
+    start = 0
+    size = len(data)
+    while start < size:
+        end = min(start + max_size, size)
+        match = CHUNK_MARKER.search(data, start + min_size, end)
+        if match:
+            end = match.start()
+        chunks.append((start, end))
+        start = end
+    return chunks
+
+
+def upload_file_incremental(file_service, share_name, directory_name, file_name, file_path, manifest,
+                            sas_token=None, max_connections=None):
+    """
+    Upload a local file into a file share in content defined chunks, sending only the chunks the manifest doesn't
+    have. The chunks are uploaded into the chunks directory of the share as files named by their SHA256, and the
+    file is assembled from them on the service in ranges copied from their URLs.
+
+    :param file_service: A FileService, or any client with its create_directory, create_file, update_range,
+        update_range_from_file_url and make_file_url operations.
+    :param ChunkManifest manifest: The chunks already uploaded into the file shares.
+    :param str sas_token: The shared access signature the chunks are copied from their URLs with.
+    """
+    start_time = timeit.default_timer()
+    size = os.path.getsize(file_path)
+    max_connections = max_connections or get_max_connections(size)
+    share_url = '{}/{}'.format(file_service.account_name, share_name)
+    transferred = [0]
+    transferred_lock = threading.Lock()
+    chunks = []
+    missing_chunks = set()
+
+    if not size:
+        file_service.create_file(share_name, directory_name, file_name, 0)
+        return UploadResult(0, 0, max_connections, timeit.default_timer() - start_time)
+
+    with open(file_path, 'rb') as source_file:
+        data = mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            chunks = [(start, end, hashlib.sha256(data[start:end]).hexdigest()) for start, end in get_chunks(data)]
+            uploaded = manifest.load(share_url)
+            new_chunks = {digest: (start, end) for start, end, digest in chunks if digest not in uploaded}
+
+            def _add_transferred(count):
+                with transferred_lock:
+                    transferred[0] += count
+
+            def _upload_chunk(digest):
+                start, end = new_chunks[digest]
+                file_service.create_file(share_name, CHUNK_DIRECTORY, digest, end - start)
+                file_service.update_range(share_name, CHUNK_DIRECTORY, digest, data[start:end], 0, end - start - 1)
+                _add_transferred(end - start)
+
+            def _copy_chunk(chunk):
+                start, end, digest = chunk
+                source = file_service.make_file_url(share_name, CHUNK_DIRECTORY, digest, sas_token=sas_token)
+                try:
+                    file_service.update_range_from_file_url(share_name, directory_name, file_name,
+                                                            start, end - 1, source, 0)
+                except Exception as ex:  # pylint: disable=broad-except
+                    if getattr(ex, 'status_code', None) != 404:
+                        raise
+                    # the chunk is gone from the file share, the manifest forgets it
+                    file_service.update_range(share_name, directory_name, file_name, data[start:end], start, end - 1)
+                    missing_chunks.add(digest)
+                    _add_transferred(end - start)
+
+            if new_chunks:
+                file_service.create_directory(share_name, CHUNK_DIRECTORY)
+                _run_parallel(_upload_chunk, sorted(new_chunks), max_connections)
+            file_service.create_file(share_name, directory_name, file_name, size)
+            _run_parallel(_copy_chunk, chunks, max_connections)
+        finally:
+            data.close()
+
+    manifest.save(share_url, {digest for _, _, digest in chunks} - missing_chunks, missing_chunks)
+    return UploadResult(size, len(chunks), max_connections, timeit.default_timer() - start_time, transferred[0])
+
+
+def _run_parallel(func, items, max_connections):
+    """ call the function with each item over at most max_connections threads, stopping at the first failure """
+    if max_connections <= 1 or len(items) <= 1:
+        for item in items:
+            func(item)
+        return
+
+    with concurrent.futures.ThreadPoolExecutor(min(max_connections, len(items))) as executor:
+        futures = [executor.submit(func, item) for item in items]
+        for future in concurrent.futures.as_completed(futures):
+            if future.exception() is not None:
+                # stop at the first failure instead of uploading the rest of a file that won't be used
+                for pending in futures:
+                    pending.cancel()
+                raise future.exception()
@@ -6,11 +6,17 @@
 from enum import Enum
 import os
 import codecs
+import multiprocessing
+import re
+import sys
 import tarfile
 import tempfile
+import struct
 import uuid
+import zlib
+from collections import deque
 from io import open
-from re import (search, match)
+from re import search
 from json import dumps
 from knack.util import CLIError, todict
 from knack.log import get_logger
@@ -19,103 +25,312 @@ from ._client_factory import cf_resource_groups
 
 logger = get_logger(__name__)
 
-
-def _get_upload_local_file(jar_path=None):
+# the uncompressed bytes of the source tarball compressed as a block by one thread
+GZIP_BLOCK_SIZE = 1024 * 1024
+# the compressed blocks of each thread kept in memory before they are written out
+GZIP_PENDING_BLOCKS = 2
+# the previous block's bytes a block is compressed with, the deflate window
+GZIP_DICTIONARY_SIZE = 32 * 1024
+# the header of a gzip stream without a name or modification time, so unchanged content compresses the same
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+# a block of an rsyncable tarball also ends before the files whose name hashes to a multiple of this
+RSYNCABLE_MEMBER_FILES = 16
+
+COMMON_VCS_IGNORE_LIST = {'.git', '.gitignore', 'bzrignore', '.hg',
+                          '.hgignore', '.svn', '.circleci', 'target', 'docker'}
+# the rank of the parent matching rule of the source root, any rule has a higher priority
+NO_MATCHING_RULE = sys.maxsize
+# the rules compiled into one regular expression, below the limit of named groups of older Python versions
+MAX_COMBINED_RULES = 90
+
+
+def _get_upload_local_file(jar_path=None, rsyncable=False):
     file_path = jar_path
     file_type = "Jar"
 
     if file_path is None:
         file_type = "Source"
-        file_path = os.path.join(tempfile.gettempdir(
-        ), 'build_archive_{}.tar.gz'.format(uuid.uuid4().hex))
-        _pack_source_code(os.getcwd(), file_path)
+        if rsyncable:
+            # the chunks of the tarball are found in the whole file, it is packed before the upload
+            file_path = os.path.join(tempfile.gettempdir(
+            ), 'build_archive_{}.tar.gz'.format(uuid.uuid4().hex))
+            _pack_source_code(os.getcwd(), file_path, rsyncable)
+        # otherwise the source code is packed as it is uploaded, see _pack_source_code_to_stream
     return file_type, file_path
 
 
-def _pack_source_code(source_location, tar_file_path):
+def _compress_block(data, rsyncable, zdict=None):
+    if rsyncable:
+        # a gzip member of its own
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+    # raw deflate blocks ending on a byte boundary, continuing the stream of the previous block
+    if zdict and sys.version_info >= (3, 3):
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS, zlib.DEF_MEM_LEVEL, zlib.Z_DEFAULT_STRATEGY,
+                                      zdict)
+    else:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+class _ParallelGzipWriter(object):
+    """
+    Writes a gzip stream of the data written to it, compressing blocks of the data in parallel like pigz does.
+    The blocks are deflated with the end of the previous block as their dictionary and make up one gzip member.
+
+    An rsyncable stream is a gzip member per block instead, and a block also ends before the files chosen by their
+    name. A file changed in the source tree then only changes the compressed bytes of its block.
+    """
+
+    def __init__(self, fileobj, rsyncable=False, max_workers=None):
+        import concurrent.futures
+        self.fileobj = fileobj
+        self.rsyncable = rsyncable
+        self.max_workers = max_workers or multiprocessing.cpu_count()
+        self.executor = concurrent.futures.ThreadPoolExecutor(self.max_workers)
+        self.pending = deque()
+        self.block = []
+        self.block_size = 0
+        self.dictionary = b''
+        self.position = 0
+        self.crc = 0
+        if not rsyncable:
+            self.fileobj.write(GZIP_HEADER)
+
+    def start_file(self, name):
+        if self.rsyncable and self.block_size and \
+                zlib.crc32(name.encode('utf-8')) % RSYNCABLE_MEMBER_FILES == 0:
+            self._end_block()
+
+    def write(self, data):
+        self.position += len(data)
+        if not self.rsyncable:
+            self.crc = zlib.crc32(data, self.crc)
+        while data:
+            count = min(len(data), GZIP_BLOCK_SIZE - self.block_size)
+            self.block.append(data[:count])
+            self.block_size += count
+            data = data[count:]
+            if self.block_size >= GZIP_BLOCK_SIZE:
+                self._end_block()
+
+    def tell(self):
+        return self.position
+
+    def close(self):
+        try:
+            self._end_block()
+            while self.pending:
+                self.fileobj.write(self.pending.popleft().result())
+            if not self.rsyncable:
+                # the last, empty deflate block and the trailer of the gzip member
+                self.fileobj.write(zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS).flush())
+                self.fileobj.write(struct.pack('<II', self.crc & 0xffffffff, self.position & 0xffffffff))
+        finally:
+            self.executor.shutdown()
+
+    def _end_block(self):
+        if not self.block_size:
+            return
+        data = b''.join(self.block)
+        self.block = []
+        self.block_size = 0
+        self.pending.append(self.executor.submit(_compress_block, data, self.rsyncable, self.dictionary))
+        if not self.rsyncable:
+            self.dictionary = data[-GZIP_DICTIONARY_SIZE:]
+        # write out the blocks compressed in order, waiting for them when the threads are ahead of the output
+        while self.pending and (self.pending[0].done() or
+                                len(self.pending) > self.max_workers * GZIP_PENDING_BLOCKS):
+            self.fileobj.write(self.pending.popleft().result())
+
+
+def _pack_source_code(source_location, tar_file_path, rsyncable=False):
+    with open(tar_file_path, "wb") as tar_file:
+        _pack_source_code_to_stream(source_location, tar_file, rsyncable)
+
+
+def _pack_source_code_to_stream(source_location, stream, rsyncable=False):
+    """ pack the source code into a gzipped tarball written to the stream, e.g. a FileUploadStream """
     logger.info("Packing source code into tar to upload...")
 
-    ignore_list, ignore_list_size = _load_gitignore_file(source_location)
-    common_vcs_ignore_list = {'.git', '.gitignore', 'bzrignore', '.hg',
-                              '.hgignore', '.svn', '.circleci', 'target', 'docker'}
-
-    def _ignore_check(tarinfo, parent_ignored, parent_matching_rule_index):
-        # ignore common vcs dir or file
-        if tarinfo.name in common_vcs_ignore_list:
-            logger.info(
-                "Excluding '%s' based on default ignore rules", tarinfo.name)
-            return True, parent_matching_rule_index
-
-        if ignore_list is None:
-            # if .dockerignore doesn't exists, inherit from parent
-            # eg, it will ignore the files under .git folder.
-            return parent_ignored, parent_matching_rule_index
-
-        for index, item in enumerate(ignore_list):
-            # stop checking the remaining rules whose priorities are lower than the parent matching rule
-            # at this point, current item should just inherit from parent
-            if index >= parent_matching_rule_index:
-                break
-            if match(item.pattern, tarinfo.name):
-                logger.debug(".gitignore: rule '%s' matches '%s'.",
-                             item.rule, tarinfo.name)
-                return item.ignore, index
-
+    writer = _ParallelGzipWriter(stream, rsyncable)
+    try:
+        with tarfile.open(fileobj=writer, mode="w") as tar:
+            # need to set arcname to empty string as the archive root path
+            _archive_file_recursively(tar,
+                                      source_location,
+                                      arcname="",
+                                      parent_ignored=False,
+                                      parent_matching_rule_index=NO_MATCHING_RULE,
+                                      gitignore=_GitIgnore(),
+                                      start_file=writer.start_file)
+    finally:
+        writer.close()
+
+
+def _ignore_check(gitignore, name, is_dir, parent_ignored, parent_matching_rule_index):
+    # ignore common vcs dir or file
+    if name in COMMON_VCS_IGNORE_LIST:
+        logger.info(
+            "Excluding '%s' based on default ignore rules", name)
+        return True, parent_matching_rule_index
+
+    # only the rules whose priorities are higher than the parent matching rule are checked,
+    # with no such rule matching the item inherits from parent
+    rule = gitignore.match(name, is_dir, parent_matching_rule_index)
+    if rule is None:
         logger.debug(".gitignore: no rule for '%s'. parent ignore '%s'",
-                     tarinfo.name, parent_ignored)
-        # inherit from parent
+                     name, parent_ignored)
         return parent_ignored, parent_matching_rule_index
 
-    with tarfile.open(tar_file_path, "w:gz") as tar:
-        # need to set arcname to empty string as the archive root path
-        _archive_file_recursively(tar,
-                                  source_location,
-                                  arcname="",
-                                  parent_ignored=False,
-                                  parent_matching_rule_index=ignore_list_size,
-                                  ignore_check=_ignore_check)
+    logger.debug(".gitignore: rule '%s' matches '%s'.", rule.rule, name)
+    return rule.ignore, rule.rank
 
 
 class IgnoreRule(object):  # pylint: disable=too-few-public-methods
-    def __init__(self, rule):
+    def __init__(self, rule, base="", rank=0):
 
         self.rule = rule
+        # the lower the rank, the higher the priority
+        self.rank = rank
         self.ignore = True
         # ! makes exceptions to exclusions
         if rule.startswith('!'):
             self.ignore = False
             rule = rule[1:]  # remove !
 
-        self.pattern = "^"
-        tokens = rule.split('/')
+        # a rule ending with / only matches directories
+        self.directory_only = rule.endswith('/')
+        rule = rule.rstrip('/')
+        # a rule with no / but at the end matches at any level, otherwise from the .gitignore directory
+        anchored = '/' in rule
+        tokens = rule.lstrip('/').split('/')
+
+        # the rules of a nested .gitignore are relative to its directory
+        self.pattern = "^" + (re.escape(base + "/") if base else "")
+        if not anchored:
+            self.pattern += "(?:.*/)?"
         token_length = len(tokens)
         for index, token in enumerate(tokens, 1):
-            # ** matches any number of directories
             if token == "**":
-                self.pattern += ".*"  # treat **/ as **
+                # ** matches any number of directories, or everything inside at the end
+                self.pattern += ".+" if index == token_length else "(?:.*/)?"
             else:
-                # * matches any sequence of non-seperator characters
-                # ? matches any single non-seperator character
-                # . matches dot character
-                self.pattern += token.replace(
-                    "*", "[^/]*").replace("?", "[^/]").replace(".", "\\.")
+                self.pattern += _translate_ignore_token(token)
                 if index < token_length:
                     self.pattern += "/"  # add back / if it's not the last
         self.pattern += "$"
 
-
-def _load_gitignore_file(source_location):
+        # the pattern of each directory level, None for **, to tell the directories the rule may match under
+        self.segments = None
+        if anchored:
+            self.segments = [re.compile(re.escape(segment) + "$") for segment in base.split('/') if segment]
+            self.segments += [None if token == "**" else re.compile(_translate_ignore_token(token) + "$")
+                              for token in tokens]
+
+    def may_match_under(self, directory):
+        """ whether the rule may match a path under the directory """
+        if self.segments is None:
+            return True
+        segments = directory.split('/') if directory else []
+        for index, segment in enumerate(segments):
+            if index >= len(self.segments):
+                return False
+            if self.segments[index] is None:
+                return True
+            if not self.segments[index].match(segment):
+                return False
+        return len(self.segments) > len(segments)
+
+
+def _translate_ignore_token(token):
+    # * matches any sequence of non-seperator characters
+    # ? matches any single non-seperator character
+    # [...] matches one character of a set, [!...] one not in it
+    # \ escapes the character after it, and the rest match themselves
+    pattern = ""
+    index = 0
+    while index < len(token):
+        char = token[index]
+        if char == "*":
+            pattern += "[^/]*"
+        elif char == "?":
+            pattern += "[^/]"
+        elif char == "[" and token.find("]", index + 2) != -1:
+            end = token.find("]", index + 2)
+            chars = token[index + 1:end].replace("\\", "\\\\")
+            if chars.startswith("!"):
+                chars = "^" + chars[1:]
+            pattern += "[" + chars + "]"
+            index = end
+        elif char == "\\" and index + 1 < len(token):
+            index += 1
+            pattern += re.escape(token[index])
+        else:
+            pattern += re.escape(char)
+        index += 1
+    return pattern
+
+
+class _GitIgnore(object):
+    """
+    The rules of the .gitignore files of the directories down to a directory of the source tree, compiled into
+    regular expressions matching a path with all the rules at once. The rules of a nested .gitignore have higher
+    priorities than those of its parent directories, and a rule higher than the rules before it in its file.
+    """
+
+    def __init__(self, rules=None):
+        # the rules, the highest priority first
+        self.rules = rules or []
+        self.file_regexes = _compile_ignore_rules([(index, rule) for index, rule in enumerate(self.rules)
+                                                   if not rule.directory_only])
+        self.directory_regexes = _compile_ignore_rules(list(enumerate(self.rules)))
+        # the rules making exceptions to exclusions, the only ones including items under an ignored directory
+        self.exceptions = [rule for rule in self.rules if not rule.ignore]
+
+    def load(self, directory, name):
+        """ the rules with those of the .gitignore of the directory, named by its path in the source tree """
+        rank = self.rules[0].rank if self.rules else 0
+        rules = _load_gitignore_file(directory, name, rank)
+        if not rules:
+            return self
+        return _GitIgnore(rules + self.rules)
+
+    def match(self, name, is_dir, parent_matching_rule_index):
+        """ the rule of the highest priority matching the item, if it is higher than the parent matching rule """
+        for regex in self.directory_regexes if is_dir else self.file_regexes:
+            found = regex.match(name)
+            if found:
+                rule = self.rules[int(found.lastgroup[len("rule"):])]
+                return rule if rule.rank < parent_matching_rule_index else None
+        return None
+
+    def may_include(self, directory, matching_rule_index):
+        """ whether an item under the ignored directory may be included by a rule higher than its matching rule """
+        return any(rule.rank < matching_rule_index and rule.may_match_under(directory) for rule in self.exceptions)
+
+
+def _compile_ignore_rules(indexed_rules):
+    # a regular expression of alternatives tried in order matches with the rule of the highest priority,
+    # the group of the alternative is named by the index of the rule
+    return [re.compile("|".join("(?P<rule{}>{})".format(index, rule.pattern)
+                                for index, rule in indexed_rules[start:start + MAX_COMBINED_RULES]))
+            for start in range(0, len(indexed_rules), MAX_COMBINED_RULES)]
+
+
+def _load_gitignore_file(source_location, base="", rank=0):
     # reference: https://git-scm.com/docs/gitignore
+    # the rules are ranked below the given rank, so they have higher priorities than the rules of that rank
     git_ignore_file = os.path.join(source_location, ".gitignore")
     if not os.path.exists(git_ignore_file):
-        return None, 0
+        return []
 
     encoding = "utf-8"
     header = open(git_ignore_file, "rb").read(len(codecs.BOM_UTF8))
     if header.startswith(codecs.BOM_UTF8):
         encoding = "utf-8-sig"
 
-    ignore_list = []
+    rules = []
 
     for line in open(git_ignore_file, 'r', encoding=encoding).readlines():
         rule = line.rstrip()
@@ -124,13 +339,14 @@ def _load_gitignore_file(source_location):
         if not rule or rule.startswith('#'):
             continue
 
-        # the ignore rule at the end has higher priority
-        ignore_list = [IgnoreRule(rule)] + ignore_list
+        rules.append(rule)
 
-    return ignore_list, len(ignore_list)
+    # the ignore rule at the end has higher priority
+    return [IgnoreRule(rule, base, rank - len(rules) + index) for index, rule in enumerate(reversed(rules))]
 
 
-def _archive_file_recursively(tar, name, arcname, parent_ignored, parent_matching_rule_index, ignore_check):
+def _archive_file_recursively(tar, name, arcname, parent_ignored, parent_matching_rule_index, gitignore,
+                              start_file=None):
     # create a TarInfo object from the file
     tarinfo = tar.gettarinfo(name, arcname)
 
@@ -138,10 +354,12 @@ def _archive_file_recursively(tar, name, arcname, parent_ignored, parent_matchin
         raise CLIError("tarfile: unsupported type {}".format(name))
 
     # check if the file/dir is ignored
-    ignored, matching_rule_index = ignore_check(
-        tarinfo, parent_ignored, parent_matching_rule_index)
+    ignored, matching_rule_index = _ignore_check(
+        gitignore, tarinfo.name, tarinfo.isdir(), parent_ignored, parent_matching_rule_index)
 
     if not ignored:
+        if start_file is not None:
+            start_file(tarinfo.name)
         # append the tar header and data to the archive
         if tarinfo.isreg():
             with open(name, "rb") as f:
@@ -149,12 +367,34 @@ def _archive_file_recursively(tar, name, arcname, parent_ignored, parent_matchin
         else:
             tar.addfile(tarinfo)
 
-    # even the dir is ignored, its child items can still be included, so continue to scan
-    if tarinfo.isdir():
-        for f in os.listdir(name):
-            _archive_file_recursively(tar, os.path.join(name, f), os.path.join(arcname, f),
-                                      parent_ignored=ignored, parent_matching_rule_index=matching_rule_index,
-                                      ignore_check=ignore_check)
+    if not tarinfo.isdir():
+        return
+    # even the dir is ignored, its child items can still be included by a rule of a higher priority,
+    # the dir is only scanned when there is such a rule
+    if ignored and not gitignore.may_include(tarinfo.name, matching_rule_index):
+        logger.debug("Excluding '%s' and its child items", tarinfo.name)
+        return
+
+    entries = list(_scandir(name))
+    if any(entry.name == ".gitignore" for entry in entries):
+        gitignore = gitignore.load(name, tarinfo.name)
+    for entry in entries:
+        _archive_file_recursively(tar, entry.path, os.path.join(arcname, entry.name),
+                                  parent_ignored=ignored, parent_matching_rule_index=matching_rule_index,
+                                  gitignore=gitignore, start_file=start_file)
+
+
+class _DirEntry(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, directory, name):
+        self.name = name
+        self.path = os.path.join(directory, name)
+
+
+def _scandir(path):
+    """ the entries of a directory, read in one pass where os.scandir is available """
+    if hasattr(os, 'scandir'):
+        return os.scandir(path)
+    return [_DirEntry(path, name) for name in os.listdir(path)]
 
 
 def get_blob_info(blob_sas_url):
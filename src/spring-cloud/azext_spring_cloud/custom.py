@@ -5,16 +5,22 @@
 
 # pylint: disable=unused-argument, logging-format-interpolation, protected-access, wrong-import-order, too-many-lines
 
+import os
 import yaml   # pylint: disable=import-error
 from time import sleep
 from ._stream_utils import stream_logs
+from ._log_stream_utils import stream_instance_logs, iter_response
 from msrestazure.azure_exceptions import CloudError
+from azure.common import AzureHttpError
 from msrestazure.tools import parse_resource_id
-from ._utils import _get_upload_local_file
+from ._utils import _get_upload_local_file, _pack_source_code_to_stream
 from knack.util import CLIError
 from .vendored_sdks.appplatform import models
 from knack.log import get_logger
 from .azure_storage_file import FileService
+from ._upload_utils import (upload_file, upload_file_incremental, get_max_connections, get_request_session,
+                            ChunkManifest, FileUploadStream, STREAM_UPLOAD_CONNECTIONS)
+from azure.cli.core.api import get_config_dir
 from azure.cli.core.util import sdk_no_wait
 from ast import literal_eval
 from azure.cli.core.commands import cached_put
@@ -30,6 +36,7 @@ import urllib3.contrib.pyopenssl
 logger = get_logger(__name__)
 DEFAULT_DEPLOYMENT_NAME = "default"
 DEPLOYMENT_CREATE_OR_UPDATE_SLEEP_INTERVAL = 5
+CHUNK_MANIFEST_FILE_NAME = 'spring_cloud_upload_chunks.json'
 APP_CREATE_OR_UPDATE_SLEEP_INTERVAL = 2
 
 # pylint: disable=line-too-long
@@ -303,7 +310,9 @@ def app_deploy(cmd, client, resource_group, service, name,
                memory=None,
                instance_count=None,
                env=None,
-               no_wait=False):
+               no_wait=False,
+               upload_connections=None,
+               incremental_upload=False):
     logger.warning(LOG_RUNNING_PROMPT)
     if not deployment:
         deployment = client.apps.get(
@@ -313,7 +322,7 @@ def app_deploy(cmd, client, resource_group, service, name,
 
     client.deployments.get(resource_group, service, name, deployment)
 
-    file_type, file_path = _get_upload_local_file(jar_path)
+    file_type, file_path = _get_upload_local_file(jar_path, incremental_upload)
 
     return _app_deploy(client,
                        resource_group,
@@ -331,7 +340,9 @@ def app_deploy(cmd, client, resource_group, service, name,
                        target_module,
                        no_wait,
                        file_type,
-                       True)
+                       True,
+                       upload_connections,
+                       incremental_upload)
 
 
 def app_scale(cmd, client, resource_group, service, name,
@@ -368,7 +379,11 @@ def app_get_build_log(cmd, client, resource_group, service, name, deployment=Non
     return stream_logs(client.deployments, resource_group, service, name, deployment)
 
 
-def app_tail_log(cmd, client, resource_group, service, name, instance=None, follow=False, lines=50, since=None, limit=2048):
+def app_tail_log(cmd, client, resource_group, service, name, instance=None, follow=False, lines=50, since=None, limit=2048,
+                 all_instances=False, sort_by_time=False):
+    if instance and all_instances:
+        raise CLIError("usage error: '-i/--instance' and '--all-instances' can't be used together")
+    instance_names = None
     if not instance:
         deployment_name = client.apps.get(
             resource_group, service, name).properties.active_deployment_name
@@ -381,13 +396,17 @@ def app_tail_log(cmd, client, resource_group, service, name, instance=None, foll
             raise CLIError("No instances found for deployment '{0}' in app '{1}'".format(
                 deployment_name, name))
         instances = deployment.properties.instances
-        if len(instances) > 1:
+        if all_instances:
+            instance_names = [temp_instance.name for temp_instance in instances]
+        elif len(instances) > 1:
             logger.warning("Mulitple app instances found:")
             for temp_instance in instances:
                 logger.warning("{}".format(temp_instance.name))
-            logger.warning("Please use '-i/--instance' parameter to specify the instance name")
+            logger.warning("Please use '-i/--instance' parameter to specify the instance name, "
+                           "or '--all-instances' to show the logs of all of them")
             return None
-        instance = instances[0].name
+        else:
+            instance = instances[0].name
 
     primary_key = client.services.list_test_keys(
         resource_group, service).primary_key
@@ -395,8 +414,6 @@ def app_tail_log(cmd, client, resource_group, service, name, instance=None, foll
         raise CLIError("To use the log streaming feature, please enable the test endpoint")
 
     base_url = 'azuremicroservices.io' if cmd.cli_ctx.cloud.name == 'AzureCloud' else 'asc-test.net'
-    streaming_url = "https://{0}.{1}/api/logstream/apps/{2}/instances/{3}".format(
-        service, base_url, name, instance)
     params = {}
     params["tailLines"] = lines
     params["limitBytes"] = limit
@@ -405,8 +422,23 @@ def app_tail_log(cmd, client, resource_group, service, name, instance=None, foll
     if follow:
         params["follow"] = True
 
+    def _get_streaming_url(instance_name):
+        streaming_url = "https://{0}.{1}/api/logstream/apps/{2}/instances/{3}".format(
+            service, base_url, name, instance_name)
+        return streaming_url + ("?{}".format(parse.urlencode(params)) if params else "")
+
+    if instance_names:
+        # one connection per instance, the lines merged as they come
+        errors = stream_instance_logs(
+            {instance_name: _get_streaming_url(instance_name) for instance_name in instance_names},
+            urllib3.util.make_headers(basic_auth='{0}:{1}'.format("primary", primary_key)),
+            sort_by_time=sort_by_time)
+        if errors:
+            raise errors[0]
+        return None
+
     exceptions = []
-    streaming_url += "?{}".format(parse.urlencode(params)) if params else ""
+    streaming_url = _get_streaming_url(instance)
     t = Thread(target=_get_app_log, args=(
         streaming_url, "primary", primary_key, exceptions))
     t.daemon = True
@@ -445,7 +477,9 @@ def deployment_create(cmd, client, resource_group, service, app, name,
                       memory=None,
                       instance_count=None,
                       env=None,
-                      no_wait=False):
+                      no_wait=False,
+                      upload_connections=None,
+                      incremental_upload=False):
     logger.warning(LOG_RUNNING_PROMPT)
     deployments = _get_all_deployments(client, resource_group, service, app)
     if name in deployments:
@@ -463,7 +497,7 @@ def deployment_create(cmd, client, resource_group, service, app, name,
             jvm_options = jvm_options or active_deployment.properties.deployment_settings.jvm_options
             env = env or active_deployment.properties.deployment_settings.environment_variables
 
-    file_type, file_path = _get_upload_local_file(jar_path)
+    file_type, file_path = _get_upload_local_file(jar_path, incremental_upload)
     return _app_deploy(client, resource_group, service, app, name, version, file_path,
                        runtime_version,
                        jvm_options,
@@ -473,7 +507,9 @@ def deployment_create(cmd, client, resource_group, service, app, name,
                        env,
                        target_module,
                        no_wait,
-                       file_type)
+                       file_type,
+                       upload_connections=upload_connections,
+                       incremental_upload=incremental_upload)
 
 
 def deployment_list(cmd, client, resource_group, service, app):
@@ -947,7 +983,9 @@ def _app_deploy(client, resource_group, service, app, name, version, path, runti
                 target_module=None,
                 no_wait=False,
                 file_type="Jar",
-                update=False):
+                update=False,
+                upload_connections=None,
+                incremental_upload=False):
     upload_url = None
     relative_path = None
     logger.warning("[1/3] Requesting for upload URL")
@@ -989,8 +1027,32 @@ def _app_deploy(client, resource_group, service, app, name, version, path, runti
 
     # upload file
     logger.warning("[2/3] Uploading package to blob")
-    file_service = FileService(storage_name, sas_token=sas_token)
-    file_service.create_file_from_path(share_name, None, relative_path, path)
+    upload = None
+    if path is None:
+        # the source code is packed as it is uploaded, without a temporary file
+        max_connections = upload_connections or STREAM_UPLOAD_CONNECTIONS
+        file_service = FileService(storage_name, sas_token=sas_token,
+                                   request_session=get_request_session(max_connections))
+        with FileUploadStream(file_service, share_name, None, relative_path, max_connections) as stream:
+            _pack_source_code_to_stream(os.getcwd(), stream)
+        upload = stream.result
+    else:
+        max_connections = upload_connections or get_max_connections(os.path.getsize(path))
+        file_service = FileService(storage_name, sas_token=sas_token,
+                                   request_session=get_request_session(max_connections))
+        if incremental_upload:
+            manifest = ChunkManifest(os.path.join(get_config_dir(), CHUNK_MANIFEST_FILE_NAME))
+            try:
+                upload = upload_file_incremental(file_service, share_name, None, relative_path, path, manifest,
+                                                 sas_token=sas_token, max_connections=max_connections)
+            except AzureHttpError as e:
+                logger.warning("Failed to upload the package incrementally, uploading all of it. Error: {}".format(e))
+        if upload is None:
+            upload = upload_file(file_service, share_name, None, relative_path, path,
+                                 max_connections=max_connections)
+    logger.warning("Uploaded {:.1f} MB of {:.1f} MB in {:.1f} seconds ({:.1f} MB/s)".format(
+        upload.transferred / (1024.0 * 1024), upload.size / (1024.0 * 1024), upload.elapsed,
+        upload.throughput / (1024 * 1024)))
 
     if file_type == "Source" and not no_wait:
         def get_log_url():
@@ -1039,20 +1101,6 @@ def _get_app_log(url, user_name, password, exceptions):
     except ImportError:
         pass
 
-    def stream(self, amt=2 ** 16, decode_content=None):
-        if self.chunked and self.supports_chunked_reads():
-            try:
-                for line in self.read_chunked(amt, decode_content=decode_content):
-                    yield line
-            except urllib3.exceptions.ProtocolError:
-                return
-        else:
-            while not self.is_fp_closed(self._fp):
-                data = self.read(amt=amt, decode_content=decode_content)
-
-                if data:
-                    yield data
-
     http = urllib3.PoolManager(
         cert_reqs='CERT_REQUIRED', ca_certs=certifi.where())
     headers = urllib3.util.make_headers(
@@ -1069,7 +1117,7 @@ def _get_app_log(url, user_name, password, exceptions):
                 response.status, response.reason))
         std_encoding = sys.stdout.encoding
 
-        for chunk in stream(response):
+        for chunk in iter_response(response):
             if chunk:
                 sys.stdout.write(chunk.decode(encoding='utf-8', errors='replace')
                                  .encode(std_encoding, errors='replace')
@@ -0,0 +1,124 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import time
+import unittest
+
+from azext_spring_cloud._log_stream_utils import LogMerger, stream_instance_logs
+
+
+class LocalLogResponse(object):
+    """ A streamed response of the chunks, not chunked encoded. """
+
+    chunked = False
+    reason = 'OK'
+
+    def __init__(self, status, chunks, on_read=None):
+        self.status = status
+        self._fp = list(chunks)
+        self.on_read = on_read
+        self.released = False
+
+    def is_fp_closed(self, fp):
+        return not fp
+
+    def read(self, amt):
+        if self.on_read:
+            self.on_read()
+        return self._fp.pop(0)
+
+    def release_conn(self):
+        self.released = True
+
+
+class LocalPoolManager(object):
+    """ Returns the responses of the URLs, counting the chunks read. """
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.lock = threading.Lock()
+        self.chunks_read = 0
+
+    def request(self, method, url, headers, preload_content):
+        assert method == 'GET' and not preload_content and headers
+        status, chunks = self.responses[url]
+        return LocalLogResponse(status, chunks, self._on_read)
+
+    def _on_read(self):
+        with self.lock:
+            self.chunks_read += 1
+
+
+class TestLogMerger(unittest.TestCase):
+    def test_prefixes(self):
+        written = []
+        merger = LogMerger(['app-1', 'app-10'], written.append)
+        merger.add('app-10', [b'started\r'])
+        merger.add('app-1', [b'first', b'second'])
+        self.assertEqual(['[app-10] started', '[app-1]  first', '[app-1]  second'], written)
+
+    def test_sort_by_time(self):
+        written = []
+        now = [0]
+        merger = LogMerger(['a', 'b'], written.append, sort_by_time=True, timer=lambda: now[0])
+        merger.add('a', [b'2020-03-20 08:00:02.000 a2', b'2020-03-20 08:00:04.000 a4', b'\tat trace'])
+        # waits for the lines of b
+        self.assertEqual([], written)
+        merger.add('b', [b'2020-03-20 08:00:01.000 b1', b'2020-03-20T08:00:03,000 b3'])
+        self.assertEqual(['[b] 2020-03-20 08:00:01.000 b1', '[a] 2020-03-20 08:00:02.000 a2',
+                          '[b] 2020-03-20T08:00:03,000 b3'], written)
+
+        # the lines of a waited long enough for b
+        now[0] = 2
+        merger.flush()
+        self.assertEqual(['[a] 2020-03-20 08:00:04.000 a4', '[a] \tat trace'], written[3:])
+
+    def test_sort_by_time_ended(self):
+        written = []
+        merger = LogMerger(['a', 'b'], written.append, sort_by_time=True, timer=lambda: 0)
+        merger.add('a', [b'2020-03-20 08:00:02 a2'])
+        merger.end('b')
+        self.assertEqual(['[a] 2020-03-20 08:00:02 a2'], written)
+
+
+class TestStreamInstanceLogs(unittest.TestCase):
+    def test_stream_instance_logs(self):
+        http = LocalPoolManager({
+            'https://a': (200, [b'first\nsec', b'ond\n', b'last']),
+            'https://b': (200, [b'\n'.join('line {}'.format(i).encode('utf-8') for i in range(100)) + b'\n']),
+            'https://c': (401, [])})
+        written = []
+
+        errors = stream_instance_logs({'a': 'https://a', 'b': 'https://b', 'c': 'https://c'},
+                                      {'authorization': 'Basic'}, write=written.append, http=http)
+
+        self.assertEqual(1, len(errors))
+        self.assertIn('401', str(errors[0]))
+        self.assertEqual(['[a] first', '[a] second', '[a] last'], [line for line in written if line.startswith('[a]')])
+        self.assertEqual(['[b] line {}'.format(i) for i in range(100)],
+                         [line for line in written if line.startswith('[b]')])
+
+    def test_stream_instance_logs_backpressure(self):
+        urls = {'app-{}'.format(i): 'https://app-{}'.format(i) for i in range(20)}
+        http = LocalPoolManager({url: (200, [b'line\n'] * 50) for url in urls.values()})
+        written = []
+        behind = []
+
+        def _write(text):
+            # a slow terminal, the connections don't read far ahead of it
+            time.sleep(0.0001)
+            written.append(text)
+            behind.append(http.chunks_read - len(written))
+
+        stream_instance_logs(urls, {'authorization': 'Basic'}, write=_write, http=http, queue_size=4)
+
+        self.assertEqual(20 * 50, len(written))
+        # the chunks queued, one being put by each connection and one being written
+        self.assertLessEqual(max(behind), 4 + 20 + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,264 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import os
+import random
+import re
+import shutil
+import tarfile
+import tempfile
+import timeit
+import unittest
+import zlib
+
+import mock
+
+from azext_spring_cloud import _utils
+from azext_spring_cloud._upload_utils import FileUploadStream
+from azext_spring_cloud._utils import (_pack_source_code, _pack_source_code_to_stream, _ParallelGzipWriter,
+                                       _GitIgnore, IgnoreRule, NO_MATCHING_RULE)
+from .test_asc_upload import LocalFileService
+
+
+class TestPackSourceCode(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.temp_dir, 'source')
+        for directory in range(10):
+            os.makedirs(os.path.join(self.source, 'src', str(directory)))
+            for i in range(20):
+                with open(os.path.join(self.source, 'src', str(directory), '{}.java'.format(i)), 'wb') as source_file:
+                    source_file.write(os.urandom(1024))
+        with open(os.path.join(self.source, '.gitignore'), 'w') as gitignore:
+            gitignore.write('src/1/*\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _pack(self, rsyncable):
+        tar_file_path = os.path.join(self.temp_dir, 'source.tar.gz')
+        _pack_source_code(self.source, tar_file_path, rsyncable)
+        with tarfile.open(tar_file_path, 'r:gz') as tar:
+            names = sorted(tar.getnames())
+        with open(tar_file_path, 'rb') as tar_file:
+            return names, tar_file.read()
+
+    def test_pack_source_code_rsyncable(self):
+        names, _ = self._pack(False)
+        rsyncable_names, data = self._pack(True)
+
+        self.assertEqual(names, rsyncable_names)
+        self.assertIn('src/0/0.java', names)
+        self.assertNotIn('src/1/0.java', names)
+        # a gzip stream of many members
+        members = _get_gzip_members(data)
+        self.assertGreater(len(members), 5)
+
+        # a file changed only changes its member, and the last one padding the archive
+        with open(os.path.join(self.source, 'src', '5', '3.java'), 'ab') as source_file:
+            source_file.write(b'changed')
+        _, changed_data = self._pack(True)
+        changed_members = _get_gzip_members(changed_data)
+        self.assertEqual(len(members), len(changed_members))
+        self.assertEqual(1, len(set(changed_members[:-1]) - set(members)))
+
+    def test_pack_source_code(self):
+        names, data = self._pack(False)
+        # one gzip member, the blocks compressed in parallel continue its deflate stream
+        self.assertEqual(1, len(_get_gzip_members(data)))
+        # the root, src and its 10 directories, and the files of all but src/1
+        self.assertEqual(12 + 9 * 20, len(names))
+
+    def test_pack_source_code_to_stream(self):
+        file_service = LocalFileService(latency=0.001)
+        with FileUploadStream(file_service, 'share', None, 'source.tar.gz', range_size=16 * 1024) as stream:
+            _pack_source_code_to_stream(self.source, stream)
+
+        _, data = self._pack(False)
+        self.assertEqual(data, bytes(file_service.files[('share', None, 'source.tar.gz')]))
+        self.assertGreater(stream.result.ranges, 10)
+
+
+def _create_files(root, paths):
+    for path in paths:
+        path = os.path.join(root, *path.split('/'))
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as source_file:
+            source_file.write(path)
+
+
+def _get_git_ignore(*rules):
+    """ the rules of a .gitignore in their order in the file """
+    return _GitIgnore([IgnoreRule(rule, '', index - len(rules)) for index, rule in enumerate(reversed(rules))])
+
+
+class TestGitIgnore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _is_ignored(self, gitignore, name, is_dir=False):
+        rule = gitignore.match(name, is_dir, NO_MATCHING_RULE)
+        return rule is not None and rule.ignore
+
+    def _pack(self, paths, gitignore):
+        _create_files(self.temp_dir, paths)
+        with open(os.path.join(self.temp_dir, '.gitignore'), 'w') as gitignore_file:
+            gitignore_file.write(gitignore)
+        tar_file_path = self.temp_dir + '.tar.gz'
+        _pack_source_code(self.temp_dir, tar_file_path)
+        try:
+            with tarfile.open(tar_file_path, 'r:gz') as tar:
+                return set(name for name in tar.getnames() if name in paths)
+        finally:
+            os.remove(tar_file_path)
+
+    def test_match(self):
+        gitignore = _get_git_ignore('*.class', '/out', 'build/', 'docs/**/*.pdf', 'lib(1).jar', '[!a]?.txt')
+        self.assertTrue(self._is_ignored(gitignore, 'A.class'))
+        self.assertTrue(self._is_ignored(gitignore, 'src/main/A.class'))
+        self.assertTrue(self._is_ignored(gitignore, 'out', True))
+        self.assertFalse(self._is_ignored(gitignore, 'src/out', True))
+        self.assertTrue(self._is_ignored(gitignore, 'module/build', True))
+        self.assertFalse(self._is_ignored(gitignore, 'module/build'))
+        self.assertTrue(self._is_ignored(gitignore, 'docs/a.pdf'))
+        self.assertTrue(self._is_ignored(gitignore, 'docs/a/b/c.pdf'))
+        self.assertFalse(self._is_ignored(gitignore, 'src/docs/a.pdf'))
+        self.assertTrue(self._is_ignored(gitignore, 'lib(1).jar'))
+        self.assertFalse(self._is_ignored(gitignore, 'lib1.jar'))
+        self.assertTrue(self._is_ignored(gitignore, 'bc.txt'))
+        self.assertFalse(self._is_ignored(gitignore, 'ab.txt'))
+
+    def test_match_priority(self):
+        gitignore = _get_git_ignore('*.log', '!keep.log', 'logs/')
+        rule = gitignore.match('keep.log', False, NO_MATCHING_RULE)
+        self.assertFalse(rule.ignore)
+        self.assertTrue(self._is_ignored(gitignore, 'other.log'))
+        # the rules of a lower priority than the parent matching rule are not checked
+        parent_rule = gitignore.match('logs', True, NO_MATCHING_RULE)
+        self.assertIsNone(gitignore.match('logs/other.log', False, parent_rule.rank))
+        self.assertIsNone(gitignore.match('logs/keep.log', False, parent_rule.rank))
+        self.assertIsNone(gitignore.match('keep.log', False, parent_rule.rank))
+
+    def test_match_many_rules(self):
+        rules = ['file{}.txt'.format(i) for i in range(250)]
+        gitignore = _get_git_ignore(*rules)
+        self.assertEqual(3, len(gitignore.file_regexes))
+        for i in (0, 89, 90, 249):
+            self.assertEqual(rules[i], gitignore.match('a/file{}.txt'.format(i), False, NO_MATCHING_RULE).rule)
+        self.assertIsNone(gitignore.match('file250.txt', False, NO_MATCHING_RULE))
+
+    def test_pack_ignored(self):
+        paths = ['pom.xml', 'src/App.java', 'src/App.class', 'node_modules/a/index.js', 'logs/app.log',
+                 'logs/keep.log', 'target/app.jar', 'src/target/app.jar']
+        packed = self._pack(paths, '*.class\nnode_modules/\nlogs/\n!logs/keep.log\n')
+        self.assertEqual({'pom.xml', 'src/App.java', 'logs/keep.log', 'src/target/app.jar'}, packed)
+
+    def test_pack_ignored_directories_not_scanned(self):
+        paths = ['src/App.java', 'node_modules/a/index.js', 'node_modules/b/c/index.js', '.git/HEAD',
+                 'logs/keep.log', 'logs/old/app.log']
+        scanned = []
+
+        def _scandir(path):
+            scanned.append(os.path.relpath(path, self.temp_dir).replace(os.path.sep, '/'))
+            return [_utils._DirEntry(path, name) for name in os.listdir(path)]
+
+        with mock.patch.object(_utils, '_scandir', _scandir):
+            packed = self._pack(paths, 'node_modules/\nlogs/\n!logs/keep.log\n')
+
+        self.assertEqual({'src/App.java', 'logs/keep.log'}, packed)
+        # logs is scanned for the exception to its exclusion, logs/old is not as the exception can't match under it
+        self.assertEqual(['.', 'logs', 'src'], sorted(scanned))
+
+    def test_pack_nested_gitignore(self):
+        paths = ['a.tmp', 'module/b.tmp', 'module/src/c.tmp', 'module/important.tmp', 'module/src/App.java',
+                 'other/build/out.txt', 'module/build/out.txt']
+        _create_files(self.temp_dir, ['module/.gitignore', 'module/src/.gitignore'])
+        with open(os.path.join(self.temp_dir, 'module', '.gitignore'), 'w') as gitignore_file:
+            gitignore_file.write('*.tmp\n/build\n')
+        with open(os.path.join(self.temp_dir, 'module', 'src', '.gitignore'), 'w') as gitignore_file:
+            gitignore_file.write('!c.tmp\n')
+
+        packed = self._pack(paths, 'important.tmp\n')
+
+        self.assertEqual({'a.tmp', 'module/src/c.tmp', 'module/src/App.java', 'other/build/out.txt'}, packed)
+
+    def test_match_benchmark(self):
+        # the rules of a .gitignore for a Java project on a synthetic tree of 100k files
+        rules = ['*.class', '*.log', 'build/', '/out', 'node_modules/', '**/generated/**', '.idea', '*.iml',
+                 '!keep.log', 'docs/*.pdf', 'tmp?', '*.swp', '.DS_Store', 'coverage/', 'dist/', '*.jar', '!lib/*.jar',
+                 '*.war', '*.ear', 'bin/', 'obj/', '.vscode/', '*.pyc', '__pycache__/', '*.orig', '*.rej', '*.bak',
+                 'logs/', '.gradle/', '*.tmp']
+        gitignore = _get_git_ignore(*rules)
+        generator = random.Random(0)
+        names = ['/'.join('dir{}'.format(generator.randint(0, 20)) for _ in range(generator.randint(1, 6))) +
+                 '/file{}.{}'.format(i, generator.choice(['java', 'class', 'xml', 'log', 'jar', 'txt']))
+                 for i in range(100000)]
+
+        def _match_each_rule(name):
+            # matching the rules one by one, as the rules were matched before they were compiled together
+            for rule in gitignore.rules:
+                if not rule.directory_only and re.match(rule.pattern, name):
+                    return rule
+            return None
+
+        start = timeit.default_timer()
+        compiled = [gitignore.match(name, False, NO_MATCHING_RULE) for name in names]
+        compiled_elapsed = timeit.default_timer() - start
+        start = timeit.default_timer()
+        each_rule = [_match_each_rule(name) for name in names]
+        each_rule_elapsed = timeit.default_timer() - start
+
+        self.assertEqual(each_rule, compiled)
+        self.assertLess(compiled_elapsed * 2, each_rule_elapsed)
+
+
+class TestParallelGzipWriter(unittest.TestCase):
+    def test_parallel_gzip_writer(self):
+        # compressible and incompressible data over many blocks
+        data = b''.join((b'spring cloud %d ' % i) * 1000 + os.urandom(50000) for i in range(100))
+        for rsyncable in (False, True):
+            output = io.BytesIO()
+            writer = _ParallelGzipWriter(output, rsyncable, max_workers=4)
+            for i in range(0, len(data), 100000):
+                writer.write(data[i:i + 100000])
+            writer.close()
+
+            self.assertEqual(len(data), writer.tell())
+            self.assertEqual(data, _decompress(output.getvalue()))
+            self.assertEqual(1 if not rsyncable else 7, len(_get_gzip_members(output.getvalue())))
+
+    def test_parallel_gzip_writer_empty(self):
+        output = io.BytesIO()
+        _ParallelGzipWriter(output).close()
+        self.assertEqual(b'', _decompress(output.getvalue()))
+
+
+def _decompress(data):
+    content = []
+    while data:
+        decompressor = zlib.decompressobj(31)
+        content.append(decompressor.decompress(data))
+        data = decompressor.unused_data
+    return b''.join(content)
+
+
+def _get_gzip_members(data):
+    members = []
+    while data:
+        decompressor = zlib.decompressobj(31)
+        decompressor.decompress(data)
+        end = len(data) - len(decompressor.unused_data)
+        members.append(data[:end])
+        data = data[end:]
+    return members
+
+
+if __name__ == '__main__':
+    unittest.main()
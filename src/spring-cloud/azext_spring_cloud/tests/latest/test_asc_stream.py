@@ -0,0 +1,145 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+
+import mock
+from azure.common import AzureHttpError
+
+from azext_spring_cloud import _stream_utils
+from azext_spring_cloud._stream_utils import _stream_logs, _LineBuffer, MAX_CHUNK_SIZE
+
+
+class LocalBlob(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, properties, metadata):
+        self.properties = properties
+        self.metadata = metadata
+
+
+class LocalBlobProperties(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, etag, content_length, content_range=None):
+        self.etag = etag
+        self.content_length = content_length
+        self.content_range = content_range
+
+
+class LocalAppendBlobService(object):
+    """ An append blob in memory, appended with the next of the appends on each read, created by the first not None. """
+
+    def __init__(self, appends):
+        self.appends = list(appends)
+        self.content = None
+        self.metadata = {}
+        self.etag = 0
+        self.reads = []
+        self.property_reads = 0
+
+    def _append(self):
+        if self.appends:
+            data, metadata = self.appends.pop(0)
+            if self.content is None and data is not None:
+                self.content = bytearray()
+            if data or metadata:
+                self.content += data
+                self.metadata.update(metadata)
+                self.etag += 1
+
+    def get_blob_to_stream(self, container_name, blob_name, stream, start_range, end_range, if_none_match,
+                           max_connections):
+        self._append()
+        self.reads.append((start_range, end_range, if_none_match))
+        assert max_connections == 1
+        if self.content is None:
+            raise AzureHttpError('The blob does not exist.', 404)
+        if if_none_match == self.etag:
+            raise AzureHttpError('Not modified.', 304)
+        if start_range >= len(self.content):
+            raise AzureHttpError('The range is not satisfiable.', 416)
+        data = self.content[start_range:end_range + 1]
+        stream.write(bytes(data))
+        return LocalBlob(LocalBlobProperties(self.etag, len(data), 'bytes {}-{}/{}'.format(
+            start_range, end_range, len(self.content))), dict(self.metadata))
+
+    def get_blob_properties(self, container_name, blob_name):
+        self.property_reads += 1
+        return LocalBlob(LocalBlobProperties(self.etag, len(self.content)), dict(self.metadata))
+
+
+class TestLineBuffer(unittest.TestCase):
+    def test_pop_lines(self):
+        lines = _LineBuffer()
+        lines.write(b'first\r\nsec')
+        self.assertEqual('first', lines.pop_lines())
+        self.assertEqual(3, len(lines))
+        lines.write(b'ond\r')
+        # the \r may be followed by \n
+        self.assertIsNone(lines.pop_lines(3))
+        lines.write(b'\nthird\nfourth')
+        self.assertEqual('second\r\nthird', lines.pop_lines(7))
+        self.assertEqual('fourth', lines.pop_all())
+        self.assertEqual(0, len(lines))
+
+    def test_pop_lines_compacts(self):
+        lines = _LineBuffer()
+        for i in range(100):
+            lines.write('line {}\npartial'.format(i).encode('utf-8'))
+            self.assertEqual('partial' * bool(i) + 'line {}'.format(i), lines.pop_lines())
+        self.assertLess(len(lines.buffer), 20)
+
+
+class TestStreamLogs(unittest.TestCase):
+    def _stream_logs(self, blob_service, byte_size=8):
+        printed = []
+        with mock.patch.object(_stream_utils.time, 'sleep') as sleep:
+            _stream_logs(True, byte_size, 60, blob_service, 'logs', 'build.log', False,
+                         lambda text, *args: printed.append(text % args if args else text))
+        return printed, sleep.call_count
+
+    def test_stream_logs(self):
+        blob_service = LocalAppendBlobService([
+            (None, {}),
+            (b'', {}),
+            (b'Step 1/2\r\nStep', {}),
+            (b'', {}),
+            (b'', {}),
+            (b' 2/2\r\n', {}),
+            (b'done', {'__complete_status': 'Succeeded'})])
+
+        printed, sleeps = self._stream_logs(blob_service)
+
+        self.assertEqual(['Step 1/2', 'Step 2/2', 'done', "Log status was: 'succeeded'"], printed)
+        # the blob missing, empty and unchanged
+        self.assertEqual(3, sleeps)
+        self.assertEqual(1, blob_service.property_reads)
+        # read until the end in ranges of the bytes available, then only when the blob changed
+        self.assertEqual([(0, 7, None), (0, 7, None), (0, 7, 0), (8, 15, None), (14, 21, 1), (14, 21, 1),
+                          (20, 27, 2)], blob_service.reads)
+
+    def test_stream_logs_completed_without_data(self):
+        blob_service = LocalAppendBlobService([
+            (b'log\r\n', {}),
+            (b'', {}),
+            (b'', {'__complete_status': 'Failed'})])
+
+        printed, sleeps = self._stream_logs(blob_service)
+
+        self.assertEqual(['log', "Log status was: 'failed'"], printed)
+        self.assertEqual(1, sleeps)
+        # only the metadata changed
+        self.assertEqual(1, blob_service.property_reads)
+
+    def test_stream_logs_catch_up(self):
+        data = b''.join('line {}\r\n'.format(i).encode('utf-8') for i in range(1000000))
+        blob_service = LocalAppendBlobService([(data, {'__complete_status': 'Succeeded'})])
+
+        printed, _ = self._stream_logs(blob_service, byte_size=4096)
+
+        self.assertEqual(data.decode('utf-8').rstrip('\r\n'), '\r\n'.join(printed[:-1]))
+        # the first range has the default size, the rest are as large as allowed
+        self.assertEqual(1 + (len(data) - 4096 + MAX_CHUNK_SIZE - 1) // MAX_CHUNK_SIZE, len(blob_service.reads))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,323 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from azext_spring_cloud._upload_utils import (upload_file, upload_file_incremental, get_max_connections, get_chunks,
+                                              ChunkManifest, FileUploadStream, RANGE_SIZE, MAX_UPLOAD_CONNECTIONS,
+                                              CHUNK_DIRECTORY)
+
+
+class LocalFileNotFoundError(Exception):
+    status_code = 404
+
+
+class LocalFileService(object):
+    """ A file share in memory, each request taking the latency in seconds like a round trip to the service. """
+
+    account_name = 'account'
+
+    def __init__(self, latency=0, fail_offset=None):
+        self.latency = latency
+        self.fail_offset = fail_offset
+        self.files = {}
+        self.requests = 0
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+        self.resizes = 0
+
+    def create_file(self, share_name, directory_name, file_name, content_length):
+        self.files[(share_name, directory_name, file_name)] = bytearray(content_length)
+
+    def resize_file(self, share_name, directory_name, file_name, content_length):
+        self.resizes += 1
+        content = self.files[(share_name, directory_name, file_name)]
+        if content_length < len(content):
+            del content[content_length:]
+        else:
+            content.extend(bytearray(content_length - len(content)))
+
+    def update_range(self, share_name, directory_name, file_name, data, start_range, end_range):
+        with self.lock:
+            self.requests += 1
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            time.sleep(self.latency)
+            if start_range == self.fail_offset:
+                raise IOError('The range {} failed to upload.'.format(start_range))
+            assert end_range - start_range + 1 == len(data) <= RANGE_SIZE
+            assert end_range < len(self.files[(share_name, directory_name, file_name)])
+            self.files[(share_name, directory_name, file_name)][start_range:end_range + 1] = data
+        finally:
+            with self.lock:
+                self.running -= 1
+
+    def create_directory(self, share_name, directory_name):
+        pass
+
+    def make_file_url(self, share_name, directory_name, file_name, sas_token=None):
+        return 'https://{}.file.core.windows.net/{}/{}/{}{}'.format(self.account_name, share_name, directory_name,
+                                                                    file_name, sas_token or '')
+
+    def update_range_from_file_url(self, share_name, directory_name, file_name, start_range, end_range, source,
+                                   source_start_range):
+        source_share, source_directory, source_name = source.split('?')[0].split('/')[3:]
+        source_file = self.files.get((source_share, source_directory, source_name))
+        if source_file is None:
+            raise LocalFileNotFoundError(source)
+        length = end_range - start_range + 1
+        assert length <= RANGE_SIZE
+        self.files[(share_name, directory_name, file_name)][start_range:end_range + 1] = \
+            source_file[source_start_range:source_start_range + length]
+
+
+class TestUploadFile(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _create_file(self, size):
+        path = os.path.join(self.temp_dir, 'app.jar')
+        with open(path, 'wb') as jar:
+            jar.write(os.urandom(size))
+        return path
+
+    def _read(self, path):
+        with open(path, 'rb') as jar:
+            return jar.read()
+
+    def test_upload_file(self):
+        path = self._create_file(RANGE_SIZE * 5 + 123)
+        file_service = LocalFileService()
+        progress = []
+
+        result = upload_file(file_service, 'share', None, 'resources/app.jar', path, max_connections=4,
+                             progress_callback=lambda current, total: progress.append((current, total)))
+
+        self.assertEqual(bytes(file_service.files[('share', None, 'resources/app.jar')]), self._read(path))
+        self.assertEqual(6, result.ranges)
+        self.assertEqual(6, file_service.requests)
+        self.assertEqual(RANGE_SIZE * 5 + 123, result.size)
+        self.assertEqual((result.size, result.size), progress[-1])
+        self.assertLessEqual(file_service.max_running, 4)
+
+    def test_upload_file_memory_map(self):
+        # the platforms without os.pread read the ranges from a memory map
+        path = self._create_file(1000)
+        file_service = LocalFileService()
+        pread = getattr(os, 'pread', None)
+        if pread is not None:
+            del os.pread
+        try:
+            upload_file(file_service, 'share', None, 'app.jar', path, max_connections=4, range_size=64)
+        finally:
+            if pread is not None:
+                os.pread = pread
+
+        self.assertEqual(bytes(file_service.files[('share', None, 'app.jar')]), self._read(path))
+        self.assertEqual(16, file_service.requests)
+
+    def test_upload_empty_file(self):
+        path = self._create_file(0)
+        file_service = LocalFileService()
+
+        result = upload_file(file_service, 'share', None, 'app.jar', path)
+
+        self.assertEqual(bytearray(), file_service.files[('share', None, 'app.jar')])
+        self.assertEqual(0, result.ranges)
+        self.assertEqual(0, file_service.requests)
+
+    def test_upload_file_failure(self):
+        path = self._create_file(1000)
+        file_service = LocalFileService(fail_offset=640)
+
+        with self.assertRaises(IOError):
+            upload_file(file_service, 'share', None, 'app.jar', path, max_connections=2, range_size=64)
+
+    def test_get_max_connections(self):
+        self.assertEqual(2, get_max_connections(0))
+        self.assertEqual(2, get_max_connections(RANGE_SIZE * 8))
+        self.assertEqual(18, get_max_connections(300 * 1024 * 1024))
+        self.assertEqual(MAX_UPLOAD_CONNECTIONS, get_max_connections(4 * 1024 * 1024 * 1024))
+
+
+class TestFileUploadStream(unittest.TestCase):
+    def test_file_upload_stream(self):
+        file_service = LocalFileService(latency=0.001)
+        content = os.urandom(1000)
+
+        with FileUploadStream(file_service, 'share', None, 'source.tar.gz', max_connections=3, range_size=64) as stream:
+            for i in range(0, len(content), 7):
+                stream.write(content[i:i + 7])
+
+        self.assertEqual(content, bytes(file_service.files[('share', None, 'source.tar.gz')]))
+        self.assertEqual(1000, stream.result.size)
+        self.assertEqual(16, stream.result.ranges)
+        self.assertLessEqual(file_service.max_running, 3)
+        # grown to 64, 128, 256, 512 and 1024 bytes and cut down to 1000
+        self.assertEqual(6, file_service.resizes)
+
+    def test_file_upload_stream_empty(self):
+        file_service = LocalFileService()
+        with FileUploadStream(file_service, 'share', None, 'source.tar.gz') as stream:
+            pass
+        self.assertEqual(bytearray(), file_service.files[('share', None, 'source.tar.gz')])
+        self.assertEqual(0, stream.result.size)
+
+    def test_file_upload_stream_failure(self):
+        file_service = LocalFileService(fail_offset=128)
+        with self.assertRaises(IOError):
+            with FileUploadStream(file_service, 'share', None, 'source.tar.gz', range_size=64) as stream:
+                stream.write(os.urandom(1000))
+
+
+def _create_jar(entries):
+    """ the bytes of a jar like file, each entry a local file header and its content """
+    return b''.join(b'PK\x03\x04' + name.encode('utf-8') + content for name, content in entries) + b'PK\x05\x06'
+
+
+class TestUploadFileIncremental(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.manifest = ChunkManifest(os.path.join(self.temp_dir, 'chunks.json'))
+        self.entries = [('lib/{}.jar'.format(i), os.urandom(300 * 1024)) for i in range(20)]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _upload(self, file_service, entries):
+        path = os.path.join(self.temp_dir, 'app.jar')
+        content = _create_jar(entries)
+        with open(path, 'wb') as jar:
+            jar.write(content)
+        result = upload_file_incremental(file_service, 'share', None, 'resources/app.jar', path, self.manifest,
+                                         sas_token='?sig=1', max_connections=4)
+        self.assertEqual(content, bytes(file_service.files[('share', None, 'resources/app.jar')]))
+        return result
+
+    def test_get_chunks(self):
+        data = _create_jar(self.entries)
+        chunks = get_chunks(data)
+        self.assertEqual((0, len(data)), (chunks[0][0], chunks[-1][1]))
+        for (_, end), (start, _) in zip(chunks, chunks[1:]):
+            self.assertEqual(end, start)
+            # every chunk but the last starts at an entry
+            self.assertEqual(b'PK\x03\x04', data[start:start + 4])
+
+        # an entry growing doesn't move the chunks after it
+        entries = list(self.entries)
+        entries[3] = (entries[3][0], entries[3][1] + b'changed')
+        changed = _create_jar(entries)
+        chunk_data = set(data[start:end] for start, end in chunks)
+        changed_chunk_data = [changed[start:end] for start, end in get_chunks(changed)]
+        self.assertEqual(1, len([chunk for chunk in changed_chunk_data if chunk not in chunk_data]))
+
+    def test_get_chunks_without_markers(self):
+        self.assertEqual([(0, RANGE_SIZE), (RANGE_SIZE, RANGE_SIZE + 10)], get_chunks(b'\0' * (RANGE_SIZE + 10)))
+        self.assertEqual([], get_chunks(b''))
+
+    def test_upload_file_incremental(self):
+        file_service = LocalFileService()
+        size = len(_create_jar(self.entries))
+        result = self._upload(file_service, self.entries)
+        self.assertEqual(size, result.transferred)
+
+        entries = list(self.entries)
+        entries[3] = (entries[3][0], entries[3][1] + b'changed')
+        result = self._upload(file_service, entries)
+        self.assertGreater(size / 5, result.transferred)
+        self.assertEqual(size + len(b'changed'), result.size)
+
+        # the chunks of both deployments are in the share and the manifest
+        chunk_names = set(name for _, directory, name in file_service.files if directory == CHUNK_DIRECTORY)
+        self.assertEqual(chunk_names, self.manifest.load('account/share'))
+
+    def test_upload_file_incremental_chunks_gone(self):
+        file_service = LocalFileService()
+        self._upload(file_service, self.entries)
+
+        # the chunks were deleted from the share since
+        file_service = LocalFileService()
+        size = len(_create_jar(self.entries))
+        result = self._upload(file_service, self.entries)
+        self.assertEqual(size, result.transferred)
+        self.assertEqual(set(), self.manifest.load('account/share'))
+
+    def test_chunk_manifest_max_age(self):
+        now = [1000]
+        manifest = ChunkManifest(os.path.join(self.temp_dir, 'chunks.json'), max_age=100, timer=lambda: now[0])
+        manifest.save('account/share', {'a', 'b'})
+        now[0] = 1050
+        manifest.save('account/share', {'b', 'c'})
+        manifest.save('account/other', {'d'})
+        self.assertEqual({'a', 'b', 'c'}, manifest.load('account/share'))
+        now[0] = 1120
+        self.assertEqual({'b', 'c'}, manifest.load('account/share'))
+        self.assertEqual({'d'}, manifest.load('account/other'))
+        self.assertEqual(set(), manifest.load('account/missing'))
+        manifest.save('account/share', set(), {'c'})
+        self.assertEqual({'b'}, manifest.load('account/share'))
+
+    def test_chunk_manifest_concurrent_saves(self):
+        errors = []
+
+        def _save(share):
+            try:
+                for i in range(50):
+                    self.manifest.save(share, {str(i)})
+            except Exception as ex:  # pylint: disable=broad-except
+                errors.append(ex)
+
+        savers = [threading.Thread(target=_save, args=('account/share{}'.format(i),)) for i in range(4)]
+        for saver in savers:
+            saver.start()
+        for saver in savers:
+            saver.join()
+        self.assertEqual([], errors)
+        # the temporary files were all moved over the manifest, which is whole
+        self.assertEqual(['chunks.json'], os.listdir(self.temp_dir))
+        with open(self.manifest.path) as manifest_file:
+            self.assertTrue(json.load(manifest_file))
+
+
+class TestUploadThroughput(unittest.TestCase):
+    """ Compares the parallel upload to the two connections of FileService.create_file_from_path. """
+
+    def test_upload_throughput(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, 'app.jar')
+            range_size = 64 * 1024
+            with open(path, 'wb') as jar:
+                jar.write(os.urandom(range_size * 64))
+
+            elapsed = {}
+            for max_connections in (2, None):
+                file_service = LocalFileService(latency=0.02)
+                result = upload_file(file_service, 'share', None, 'app.jar', path,
+                                     max_connections=max_connections, range_size=range_size)
+                elapsed[max_connections] = result.elapsed
+                self.assertEqual(64, file_service.requests)
+
+            self.assertEqual(16, get_max_connections(range_size * 64, range_size))
+            # 32 round trips in sequence against 4
+            self.assertLess(elapsed[None] * 3, elapsed[2])
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -79,6 +79,8 @@ helps['storage azcopy blob upload'] = """
           text: az storage azcopy blob upload -c MyContainer --account-name MyStorageAccount -s "path/to/directory" --recursive
         - name: Upload the contents of a directory to a container.
           text: az storage azcopy blob upload -c MyContainer --account-name MyStorageAccount -s "path/to/directory/*" --recursive
+        - name: Upload a directory to a container with the native transfer engine instead of AzCopy.
+          text: az storage azcopy blob upload -c MyContainer --account-name MyStorageAccount -s "path/to/directory" --recursive --mode native
 """
 
 helps['storage azcopy blob download'] = """
@@ -91,6 +93,8 @@ helps['storage azcopy blob download'] = """
           text: az storage azcopy blob download -c MyContainer --account-name MyStorageAccount -s "path/to/virtual_directory" -d "download/path" --recursive
         - name: Download the contents of a container onto a local file system.
           text: az storage azcopy blob download -c MyContainer --account-name MyStorageAccount -s * -d "download/path" --recursive
+        - name: Download a single blob with the native transfer engine, resuming an interrupted download.
+          text: az storage azcopy blob download -c MyContainer --account-name MyStorageAccount -s "path/to/blob" -d "path/to/file" --mode native
 """
 
 helps['storage azcopy blob delete'] = """
@@ -113,6 +117,8 @@ helps['storage azcopy blob sync'] = """
           text: az storage azcopy blob sync -c MyContainer --account-name MyStorageAccount -s "path/to/file" -d NewBlob
         - name: Sync a directory to a container.
           text: az storage azcopy blob sync -c MyContainer --account-name MyStorageAccount -s "path/to/directory"
+        - name: Sync a directory to a container, only transferring the files changed since the last sync.
+          text: az storage azcopy blob sync -c MyContainer --account-name MyStorageAccount -s "path/to/directory" --manifest "path/to/manifest.gz"
 """
 
 helps['storage azcopy run-command'] = """
@@ -221,6 +227,8 @@ helps['storage blob directory delete'] = """
     examples:
         - name: Delete a storage blob directory in a storage container.
           text: az storage blob directory delete -c MyContainer -d MyDirectoryPath --account-name MyStorageAccount
+        - name: Delete a storage blob directory with millions of blobs in an account without Hierarchical Namespace.
+          text: az storage blob directory delete -c MyContainer -d MyDirectoryPath --account-name MyStorageAccount --recursive --batch
 """
 
 helps['storage blob directory download'] = """
@@ -249,6 +257,10 @@ helps['storage blob directory list'] = """
     examples:
         - name: List blobs and blob subdirectories in a storage directory.
           text: az storage blob directory list -c MyContainer -d DestinationDirectoryPath --account-name MyStorageAccount
+        - name: Stream the blobs in a storage directory as TSV rows as they are listed, 5000 at a time.
+          text: az storage blob directory list -c MyContainer -d DestinationDirectoryPath --account-name MyStorageAccount --stream --max-items 5000 -o tsv
+        - name: Continue listing a storage directory from the marker logged by a previous listing.
+          text: az storage blob directory list -c MyContainer -d DestinationDirectoryPath --account-name MyStorageAccount --stream --max-items 5000 --marker NextMarker
 """
 
 helps['storage blob directory metadata'] = """
@@ -285,6 +297,8 @@ helps['storage blob directory move'] = """
           text: az storage blob directory move -c MyContainer -d my-new-directory -s dir --account-name MyStorageAccount
         - name: Move a storage subdirectory to another storage blob directory in a storage container.
           text: az storage blob directory move -c MyContainer -d my-new-directory -s dir/subdirectory --account-name MyStorageAccount
+        - name: Move a storage directory with millions of blobs in an account without Hierarchical Namespace.
+          text: az storage blob directory move -c MyContainer -d my-new-directory -s dir --account-name MyStorageAccount --batch
 """
 
 helps['storage blob directory show'] = """
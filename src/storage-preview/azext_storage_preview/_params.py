@@ -51,6 +51,16 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
                                     '"[default:]user|group|other|mask:[entity id or UPN]:r|-w|-x|-,'
                                     '[default:]user|group|other|mask:[entity id or UPN]:r|-w|-x|-,...". '
                                     'e.g."user::rwx,user:john.doe@contoso:rwx,group::r--,other::---,mask::rwx".')
+    transfer_mode_type = CLIArgumentType(
+        arg_type=get_enum_type(['azcopy', 'native']),
+        help='The transfer engine. "native" transfers the blobs in parallel blocks in process and resumes interrupted '
+             'transfers. Defaults to azcopy, or native where AzCopy is not available.')
+    directory_batch_type = CLIArgumentType(
+        action='store_true',
+        help='Only for accounts without hierarchical namespace. List the directory once and delete (or copy and '
+             'delete) its blobs in parallel batches from the client, instead of following the continuation of the '
+             'service one call at a time. An interrupted run is resumed by running the command again. The snapshots '
+             'of the blobs are deleted with them, a move does not copy them to the new path.')
 
     with self.argument_context('storage') as c:
         c.argument('container_name', container_name_type)
@@ -178,6 +188,7 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
                    help='The source file path to upload from.')
         c.argument('recursive', options_list=['--recursive', '-r'], action='store_true',
                    help='Recursively upload blobs.')
+        c.argument('mode', transfer_mode_type)
         c.ignore('destination')
 
     with self.argument_context('storage azcopy blob download') as c:
@@ -190,6 +201,7 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
                    help='The destination file path to download to.')
         c.argument('recursive', options_list=['--recursive', '-r'], action='store_true',
                    help='Recursively download blobs.')
+        c.argument('mode', transfer_mode_type)
         c.ignore('source')
 
     with self.argument_context('storage azcopy blob delete') as c:
@@ -210,6 +222,11 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
                 help='The sync destination path.')
         c.argument('source', options_list=['--source', '-s'],
                    help='The source file path to sync from.')
+        c.argument('manifest',
+                   help='The path of a local sync manifest. The blobs are synced natively instead of with AzCopy and '
+                        'the manifest records the files synced, so the next sync only stats the local files and '
+                        'transfers the changes. The destination is listed again when the manifest is missing, of '
+                        'another sync or a week old.')
         c.ignore('destination')
 
     with self.argument_context('storage azcopy run-command') as c:
@@ -277,6 +294,14 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
                         'is supported here.')
         c.argument('directory_path', directory_path_type, validator=validate_directory_name)
 
+    with self.argument_context('storage blob directory delete') as c:
+        c.argument('recursive', options_list=['--recursive', '-r'], action='store_true',
+                   help='Delete all paths beneath the directory. If not set and the directory is non-empty, an error '
+                        'occurs.')
+        c.argument('fail_not_exist', action='store_true',
+                   help='Throw an exception if the directory does not exist.')
+        c.argument('batch', directory_batch_type)
+
     with self.argument_context('storage blob directory download') as c:
         c.extra('source_container', options_list=['--container', '-c'], required=True,
                 help='The download source container.')
@@ -288,6 +313,7 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
         c.argument('recursive', options_list=['--recursive', '-r'], action='store_true',
                    help='Recursively download blobs. If enabled, all the blobs including the blobs in subdirectories '
                         'will be downloaded.')
+        c.argument('mode', transfer_mode_type)
         c.ignore('source')
 
     with self.argument_context('storage blob directory exists') as c:
@@ -295,6 +321,14 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
 
     with self.argument_context('storage blob directory list') as c:
         c.argument('include', validator=validate_included_datasets, default='mc')
+        c.argument('num_results', options_list=['--num-results', '--max-items'], type=int,
+                   help='The maximum number of blobs to list. When there are more, the marker to continue the listing '
+                        'from is logged.')
+        c.argument('marker', options_list=['--marker', '--next-token'],
+                   help='The marker logged by a previous listing, to continue the listing from.')
+        c.argument('stream', action='store_true',
+                   help='Write the blobs as they are listed, one JSON object per line, or TSV rows with --output tsv. '
+                        'Memory use stays bounded for directories with millions of blobs. --query is not applied.')
 
     with self.argument_context('storage blob directory metadata') as c:
         c.argument('blob_name', directory_path_type)
@@ -312,12 +346,13 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
         c.argument('lease_id', options_list=['--lease-id'],
                    help='A lease ID for destination directory_path. The destination directory_path must have an active '
                         'lease and the lease ID must match.')
-        c.argument('mode', options_list=['--move-mode'], arg_type=get_enum_type(["legacy", "posix"]), default="posix",
-                   help="Valid only when namespace is enabled. This parameter determines the behavior "
-                        "of the move operation. If the destination directory is empty, for both two mode, "
+        c.argument('mode', options_list=['--move-mode'], arg_type=get_enum_type(["legacy", "posix"]),
+                   help="Valid only when namespace is enabled, defaults to posix. This parameter determines the "
+                        "behavior of the move operation. If the destination directory is empty, for both two mode, "
                         "the destination directory will be overwritten. But if the destination directory is not empty, "
                         "in legacy mode the move operation will fail and in posix mode, the source directory will be "
                         "moved into the destination directory. ")
+        c.argument('batch', directory_batch_type)
 
     with self.argument_context('storage blob directory show') as c:
         c.argument('directory_name', directory_path_type)
@@ -345,4 +380,5 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
         c.argument('recursive', options_list=['--recursive', '-r'], action='store_true',
                    help='Recursively upload blobs. If enabled, all the blobs including the blobs in subdirectories will'
                         ' be uploaded.')
+        c.argument('mode', transfer_mode_type)
         c.ignore('destination')
@@ -0,0 +1,139 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+A cache of the SAS tokens and OAuth token payloads handed to AzCopy, so commands run in a loop reuse them. The
+credentials are encrypted with a key kept in a file only the user can read, and expire before the credential does.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_FILE_NAME = 'azcopy_credential_cache.json'
+KEY_FILE_NAME = 'azcopy_credential_cache.key'
+
+
+def get_cache_key(*parts):
+    """ a key not revealing what it was made of, e.g. the account key a SAS token was signed with """
+    return hashlib.sha256(json.dumps(parts).encode('utf-8')).hexdigest()
+
+
+class CredentialCache(object):
+    """
+    The credentials cached by key until their expiry, encrypted at rest with Fernet. Without the cryptography package
+    nothing is cached.
+    """
+
+    def __init__(self, cache_dir, timer=time.time):
+        self.cache_path = os.path.join(cache_dir, CACHE_FILE_NAME)
+        self.key_path = os.path.join(cache_dir, KEY_FILE_NAME)
+        self.timer = timer
+        self.lock = threading.Lock()
+        self._fernet = None
+
+    def get(self, key, margin=0):
+        """ the credential of the key, None if it is missing or expires within margin seconds """
+        with self.lock:
+            try:
+                return self._get(key, margin)
+            except Exception as ex:  # pylint: disable=broad-except
+                # e.g. the credentials of another key, or a cache file being replaced by another command
+                logger.debug('Ignoring the AzCopy credential cache: %s', ex)
+                return None
+
+    def set(self, key, credential, expires_on):
+        """ cache the credential, a JSON serializable value, until expires_on seconds since the epoch """
+        with self.lock:
+            try:
+                self._set(key, credential, expires_on)
+            except Exception as ex:  # pylint: disable=broad-except
+                logger.debug('Failed to cache the AzCopy credential: %s', ex)
+
+    def clear(self):
+        with self.lock:
+            if os.path.exists(self.cache_path):
+                os.remove(self.cache_path)
+
+    def _get(self, key, margin):
+        fernet = self._get_fernet()
+        if fernet is None:
+            return None
+        entry = self._load().get(key)
+        if not entry or entry['expires_on'] - margin <= self.timer():
+            return None
+        return json.loads(fernet.decrypt(entry['value'].encode('utf-8')).decode('utf-8'))
+
+    def _set(self, key, credential, expires_on):
+        fernet = self._get_fernet()
+        if fernet is None:
+            return
+        now = self.timer()
+        entries = {cache_key: entry for cache_key, entry in self._load().items() if entry['expires_on'] > now}
+        entries[key] = {
+            'expires_on': expires_on,
+            'value': fernet.encrypt(json.dumps(credential).encode('utf-8')).decode('utf-8')
+        }
+        self._save(entries)
+
+    def _get_fernet(self):
+        if self._fernet is None:
+            try:
+                from cryptography.fernet import Fernet
+            except ImportError:
+                logger.debug('The cryptography package is not installed, AzCopy credentials are not cached.')
+                return None
+            self._fernet = Fernet(self._get_key(Fernet))
+        return self._fernet
+
+    def _get_key(self, fernet_cls):
+        if os.path.exists(self.key_path):
+            with open(self.key_path, 'rb') as key_file:
+                return key_file.read()
+        key = fernet_cls.generate_key()
+        _write_private_file(self.key_path, key)
+        # the credentials of another key cannot be read
+        if os.path.exists(self.cache_path):
+            os.remove(self.cache_path)
+        return key
+
+    def _load(self):
+        try:
+            with open(self.cache_path, 'r') as cache_file:
+                return json.load(cache_file)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _save(self, entries):
+        _write_private_file(self.cache_path, json.dumps(entries).encode('utf-8'))
+
+
+def _write_private_file(path, data):
+    """
+    write the file readable by the user only, replacing it at once, through a unique temporary file next to it so
+    that concurrent commands never read it half written
+    """
+    # mkstemp creates the file readable and writable by the user only
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + '.')
+    try:
+        with os.fdopen(fd, 'wb') as private_file:
+            private_file.write(data)
+        if hasattr(os, 'replace'):
+            os.replace(temp_path, path)
+        else:
+            if os.name == 'nt' and os.path.exists(path):
+                os.remove(path)
+            os.rename(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -9,9 +9,13 @@ import json
 import platform
 import subprocess
 import datetime
+import calendar
+import timeit
 from six.moves.urllib.parse import urlparse
 from azure.cli.core._profile import Profile
 from knack.log import get_logger
+from knack.util import CLIError
+from .credential_cache import CredentialCache, get_cache_key
 
 logger = get_logger(__name__)
 
@@ -19,6 +23,12 @@ logger = get_logger(__name__)
 STORAGE_RESOURCE_ENDPOINT = "https://storage.azure.com"
 SERVICES = {'blob', 'file'}
 AZCOPY_VERSION = '10.3.1'
+SAS_RESOURCE_TYPES = 'sco'
+SAS_PERMISSIONS = 'rwdlacup'
+# a cached SAS token is only reused while an AzCopy job still has this long, in seconds, before it expires
+SAS_CACHE_MARGIN = 12 * 3600
+# AzCopy refreshes an OAuth token itself, it only needs to be valid when the job starts
+TOKEN_CACHE_MARGIN = 5 * 60
 
 
 class AzCopy(object):
@@ -38,22 +48,129 @@ class AzCopy(object):
         args = [self.executable] + args
         args = ' '.join(args)
         logger.warning("Azcopy command: %s", args)
-        env_kwargs = {}
-        if self.creds and self.creds.token_info:
-            env_kwargs = {'AZCOPY_OAUTH_TOKEN_INFO': json.dumps(self.creds.token_info)}
-        subprocess.call(args, env=dict(os.environ, **env_kwargs))
+        subprocess.call(args, env=self._get_env())
 
-    def copy(self, source, destination, flags=None):
+    def run_job(self, args, progress_callback=None):
+        """
+        Run an AzCopy job with JSON output, calling progress_callback with the AzCopyJobSummary of every progress
+        message. Returns the summary of the finished job.
+        """
+        args = [self.executable] + args + ['--output-type=json']
+        logger.info("Azcopy command: %s", ' '.join(args))
+        start_time = timeit.default_timer()
+        process = subprocess.Popen(args, env=self._get_env(), stdout=subprocess.PIPE, universal_newlines=True)
+        try:
+            summary = parse_job_output(iter(process.stdout.readline, ''), progress_callback, start_time)
+        finally:
+            process.stdout.close()
+            return_code = process.wait()
+
+        if summary.job_id is None:
+            raise CLIError('AzCopy failed with exit code {}: {}'.format(
+                return_code, '\n'.join(summary.errors) or 'no job was started.'))
+        if return_code or summary.transfers_failed:
+            logger.warning('AzCopy job %s finished with status %s, %d transfer(s) failed. See the log %s. Resume '
+                           'it with: az storage azcopy run-command "azcopy jobs resume %s"', summary.job_id,
+                           summary.status, summary.transfers_failed or 0, summary.log_file, summary.job_id)
+        return summary
+
+    def copy(self, source, destination, flags=None, progress_callback=None):
         flags = flags or []
-        self.run_command(['copy', source, destination] + flags)
+        return self.run_job(['copy', source, destination] + flags, progress_callback)
 
     def remove(self, target, flags=None):
         flags = flags or []
         self.run_command(['remove', target] + flags)
 
-    def sync(self, source, destination, flags=None):
+    def sync(self, source, destination, flags=None, progress_callback=None):
         flags = flags or []
-        self.run_command(['sync', source, destination] + flags)
+        return self.run_job(['sync', source, destination] + flags, progress_callback)
+
+    def _get_env(self):
+        env_kwargs = {}
+        if self.creds and self.creds.token_info:
+            env_kwargs = {'AZCOPY_OAUTH_TOKEN_INFO': json.dumps(self.creds.token_info)}
+        return dict(os.environ, **env_kwargs)
+
+
+class AzCopyJobSummary(object):  # pylint: disable=too-many-instance-attributes
+    """ The progress of an AzCopy job, from the messages of its JSON output. """
+
+    def __init__(self):
+        self.job_id = None
+        self.status = None
+        self.log_file = None
+        self.percent_complete = 0
+        self.total_transfers = None
+        self.transfers_completed = None
+        self.transfers_failed = None
+        self.transfers_skipped = None
+        self.bytes_transferred = None
+        self.elapsed = 0
+        self.throughput = 0
+        self.failed_transfers = []
+        self.errors = []
+
+    def update(self, progress, elapsed):
+        """ Update from the content of a progress or end of job message, a copy or a sync job summary. """
+        self.job_id = progress.get('JobID', self.job_id)
+        self.status = progress.get('JobStatus', self.status)
+        self.percent_complete = progress.get('PercentComplete', self.percent_complete)
+        self.total_transfers = _first_of(progress, 'TotalTransfers', 'CopyTotalTransfers')
+        self.transfers_completed = _first_of(progress, 'TransfersCompleted', 'CopyTransfersCompleted')
+        self.transfers_failed = _first_of(progress, 'TransfersFailed', 'CopyTransfersFailed')
+        self.transfers_skipped = progress.get('TransfersSkipped')
+        self.bytes_transferred = _first_of(progress, 'TotalBytesTransferred', 'BytesOverWire')
+        self.failed_transfers = [{'source': transfer.get('Src'), 'destination': transfer.get('Dst'),
+                                  'status': transfer.get('TransferStatus')}
+                                 for transfer in progress.get('FailedTransfers') or []]
+        self.elapsed = elapsed
+        if elapsed and self.bytes_transferred:
+            self.throughput = self.bytes_transferred / elapsed
+
+
+def parse_job_output(lines, progress_callback=None, start_time=None):
+    """ Parse the lines of the JSON output of an AzCopy job into an AzCopyJobSummary as they are read. """
+    summary = AzCopyJobSummary()
+    start_time = timeit.default_timer() if start_time is None else start_time
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            message = json.loads(line)
+            message_type = message['MessageType']
+            content = message.get('MessageContent') or ''
+        except (ValueError, KeyError, TypeError):
+            logger.debug(line)
+            continue
+
+        if message_type in ('Progress', 'EndOfJob', 'Init'):
+            try:
+                content = json.loads(content)
+            except ValueError:
+                logger.debug(content)
+                continue
+            if message_type == 'Init':
+                summary.job_id = content.get('JobID')
+                summary.log_file = content.get('LogFileLocation')
+                continue
+            summary.update(content, timeit.default_timer() - start_time)
+            if progress_callback:
+                progress_callback(summary)
+        elif message_type == 'Error':
+            summary.errors.append(content)
+            logger.error(content)
+        else:
+            logger.info(content)
+    return summary
+
+
+def _first_of(content, *keys):
+    for key in keys:
+        if key in content:
+            return content[key]
+    return None
 
 
 class AzCopyCredentials(object):  # pylint: disable=too-few-public-methods
@@ -63,12 +180,7 @@ class AzCopyCredentials(object):  # pylint: disable=too-few-public-methods
 
 
 def login_auth_for_azcopy(cmd):
-    token_info = Profile(cli_ctx=cmd.cli_ctx).get_raw_token(resource=STORAGE_RESOURCE_ENDPOINT)[0][2]
-    try:
-        token_info = _unserialize_non_msi_token_payload(token_info)
-    except KeyError:  # unserialized MSI token payload
-        raise Exception('MSI auth not yet supported.')
-    return AzCopyCredentials(token_info=token_info)
+    return AzCopyCredentials(token_info=_get_token_info(cmd))
 
 
 def blob_client_auth_for_azcopy(cmd, blob_client):
@@ -77,12 +189,7 @@ def blob_client_auth_for_azcopy(cmd, blob_client):
         return azcopy_creds
 
     # oauth mode
-    token_info = Profile(cli_ctx=cmd.cli_ctx).get_raw_token(resource=STORAGE_RESOURCE_ENDPOINT)[0][2]
-    try:
-        token_info = _unserialize_non_msi_token_payload(token_info)
-    except KeyError:  # unserialized MSI token payload
-        raise Exception('MSI auth not yet supported.')
-    return AzCopyCredentials(token_info=token_info)
+    return AzCopyCredentials(token_info=_get_token_info(cmd))
 
 
 def storage_client_auth_for_azcopy(cmd, client, service):
@@ -94,11 +201,40 @@ def storage_client_auth_for_azcopy(cmd, client, service):
 
     # if account key provided, generate a sas token
     if client.account_key:
-        sas_token = _generate_sas_token(cmd, client.account_name, client.account_key, service)
+        # the account key is part of the key, so a SAS token is not reused once the account key is rotated
+        cache_key = get_cache_key('sas', client.account_name, client.account_key, service, SAS_RESOURCE_TYPES,
+                                  SAS_PERMISSIONS)
+        cache = _get_credential_cache(cmd)
+        sas_token = cache.get(cache_key, margin=SAS_CACHE_MARGIN)
+        if sas_token is None:
+            expiry = datetime.datetime.utcnow() + datetime.timedelta(days=1)
+            sas_token = _generate_sas_token(cmd, client.account_name, client.account_key, service, expiry)
+            cache.set(cache_key, sas_token, calendar.timegm(expiry.utctimetuple()))
         return AzCopyCredentials(sas_token=sas_token)
     return None
 
 
+def _get_token_info(cmd):
+    """ the token payload of the logged in account for AzCopy, cached until shortly before it expires """
+    profile = Profile(cli_ctx=cmd.cli_ctx)
+    account = profile.get_subscription()
+    cache_key = get_cache_key('oauth', account['user']['name'], account['tenantId'], STORAGE_RESOURCE_ENDPOINT)
+    cache = _get_credential_cache(cmd)
+    token_info = cache.get(cache_key, margin=TOKEN_CACHE_MARGIN)
+    if token_info is None:
+        token_info = profile.get_raw_token(resource=STORAGE_RESOURCE_ENDPOINT)[0][2]
+        try:
+            token_info = _unserialize_non_msi_token_payload(token_info)
+        except KeyError:  # unserialized MSI token payload
+            raise Exception('MSI auth not yet supported.')
+        cache.set(cache_key, token_info, int(token_info['expires_on']))
+    return token_info
+
+
+def _get_credential_cache(cmd):
+    return CredentialCache(cmd.cli_ctx.config.config_dir)
+
+
 def _unserialize_non_msi_token_payload(token_info):
     import jwt  # pylint: disable=import-error
 
@@ -119,7 +255,7 @@ def _unserialize_non_msi_token_payload(token_info):
     }
 
 
-def _generate_sas_token(cmd, account_name, account_key, service):
+def _generate_sas_token(cmd, account_name, account_key, service, expiry):
     from .._client_factory import cloud_storage_account_service_factory
     from .._validators import resource_type_type, services_type
 
@@ -132,7 +268,7 @@ def _generate_sas_token(cmd, account_name, account_key, service):
 
     return cloud_storage_client.generate_shared_access_signature(
         services_type(cmd.loader)(service[0]),
-        resource_type_type(cmd.loader)('sco'),
-        t_account_permissions(_str='rwdlacup'),
-        datetime.datetime.utcnow() + datetime.timedelta(days=1)
+        resource_type_type(cmd.loader)(SAS_RESOURCE_TYPES),
+        t_account_permissions(_str=SAS_PERMISSIONS),
+        expiry
     )
@@ -3,26 +3,46 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
-from __future__ import print_function
-# from knack.util import CLIError
+from __future__ import print_function, division
+
+import os
+from contextlib import contextmanager
+
+from six.moves.urllib.parse import unquote
+from knack.log import get_logger
+from knack.util import CLIError
 from ..azcopy.util import AzCopy, blob_client_auth_for_azcopy, login_auth_for_azcopy
 
+logger = get_logger(__name__)
+
 
-def storage_blob_copy(azcopy, source, destination, recursive=None):
+def storage_blob_copy(azcopy, source, destination, recursive=None, progress_callback=None):
     flags = []
     if recursive is not None:
         flags.append('--recursive')
-    azcopy.copy(source, destination, flags=flags)
+    return azcopy.copy(source, destination, flags=flags, progress_callback=progress_callback)
 
 
-def storage_blob_upload(cmd, client, source, destination, recursive=None):
+def storage_blob_upload(cmd, client, source, destination, recursive=None, mode=None):
+    if _use_native_transfer(mode):
+        container, blob_path = _parse_blob_url(cmd, destination)
+        return _transfer_results(_native_transfer(cmd, client).upload(source, container, blob_path,
+                                                                      recursive=recursive))
     azcopy = _azcopy_blob_client(cmd, client)
-    storage_blob_copy(azcopy, source, _add_url_sas(destination, azcopy.creds.sas_token), recursive=recursive)
+    with _job_progress(cmd) as progress_callback:
+        return storage_blob_copy(azcopy, source, _add_url_sas(destination, azcopy.creds.sas_token),
+                                 recursive=recursive, progress_callback=progress_callback)
 
 
-def storage_blob_download(cmd, client, source, destination, recursive=None):
+def storage_blob_download(cmd, client, source, destination, recursive=None, mode=None):
+    if _use_native_transfer(mode):
+        container, blob_path = _parse_blob_url(cmd, source)
+        return _transfer_results(_native_transfer(cmd, client).download(container, blob_path, destination,
+                                                                        recursive=recursive))
     azcopy = _azcopy_blob_client(cmd, client)
-    storage_blob_copy(azcopy, _add_url_sas(source, azcopy.creds.sas_token), destination, recursive=recursive)
+    with _job_progress(cmd) as progress_callback:
+        return storage_blob_copy(azcopy, _add_url_sas(source, azcopy.creds.sas_token), destination,
+                                 recursive=recursive, progress_callback=progress_callback)
 
 
 # def storage_blob_upload_batch(cmd, client, source, destination):
@@ -43,9 +63,19 @@ def storage_blob_remove(cmd, client, target, recursive=None):
     azcopy.remove(_add_url_sas(target, azcopy.creds.sas_token), flags=flags)
 
 
-def storage_blob_sync(cmd, client, source, destination):
+def storage_blob_sync(cmd, client, source, destination, manifest=None):
+    if manifest:
+        from ..sync_manifest import SyncManifest, sync_with_manifest
+        container, blob_path = _parse_blob_url(cmd, destination)
+        result = sync_with_manifest(_native_transfer(cmd, client), source, container, blob_path,
+                                    SyncManifest(os.path.expanduser(manifest)))
+        logger.warning('Uploaded %d file(s), deleted %d blob(s), %d file(s) unchanged in %.2f sec.',
+                       result.uploaded, result.deleted, result.unchanged, result.elapsed)
+        return result
     azcopy = _azcopy_blob_client(cmd, client)
-    azcopy.sync(source, _add_url_sas(destination, azcopy.creds.sas_token), flags=['--delete-destination true'])
+    with _job_progress(cmd) as progress_callback:
+        return azcopy.sync(source, _add_url_sas(destination, azcopy.creds.sas_token),
+                           flags=['--delete-destination=true'], progress_callback=progress_callback)
 
 
 def storage_run_command(cmd, command_args):
@@ -67,3 +97,57 @@ def _azcopy_blob_client(cmd, client):
 
 def _azcopy_login_client(cmd):
     return AzCopy(creds=login_auth_for_azcopy(cmd))
+
+
+@contextmanager
+def _job_progress(cmd):
+    """ Report the progress of an AzCopy job through the progress controller of the CLI. """
+    controller = cmd.cli_ctx.get_progress_controller(det=True)
+
+    def _report(summary):
+        message = '{} of {} transfer(s), {:.2f} MiB/s'.format(summary.transfers_completed or 0,
+                                                              summary.total_transfers or 0,
+                                                              summary.throughput / 1024 / 1024)
+        controller.add(message=message, value=summary.percent_complete, total_val=100)
+
+    controller.begin()
+    try:
+        yield _report
+    finally:
+        controller.end()
+
+
+def _use_native_transfer(mode):
+    if mode is None:
+        # fall back to the native engine where AzCopy is not bundled
+        try:
+            executable = AzCopy().executable
+        except KeyError:
+            # no AzCopy build for the platform
+            return True
+        return not os.path.exists(executable)
+    return mode == 'native'
+
+
+def _native_transfer(cmd, client):
+    from ..transfer import BlockBlobTransfer, TransferJournal, JOURNAL_FILE_NAME
+    journal = TransferJournal(os.path.join(cmd.cli_ctx.config.config_dir, JOURNAL_FILE_NAME))
+    block_cls, content_settings_cls = cmd.get_models('blob.models#BlobBlock', 'blob.models#ContentSettings')
+    return BlockBlobTransfer(client, block_cls, journal=journal, content_settings_cls=content_settings_cls)
+
+
+def _parse_blob_url(cmd, url):
+    from ..storage_url_helpers import StorageResourceIdentifier
+    identifier = StorageResourceIdentifier(cmd.cli_ctx.cloud, url)
+    if not identifier.container:
+        raise CLIError('usage error: {} is not a blob container or blob url.'.format(url))
+    return identifier.container, unquote(identifier.blob or '')
+
+
+def _transfer_results(results):
+    total_size = sum(result.size for result in results)
+    elapsed = sum(result.elapsed for result in results)
+    logger.warning('Transferred %d file(s), %d bytes in %.2f sec (%.2f MiB/s)', len(results), total_size, elapsed,
+                   total_size / elapsed / 1024 / 1024 if elapsed else 0)
+    return [{'source': result.source, 'destination': result.destination, 'size': result.size,
+             'resumedBlocks': result.resumed_blocks, 'elapsed': result.elapsed} for result in results]
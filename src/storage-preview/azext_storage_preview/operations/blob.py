@@ -10,6 +10,11 @@ from knack.log import get_logger
 
 logger = get_logger(__name__)
 
+# the most blobs the service takes in a batch request
+BATCH_SIZE = 256
+MAX_BATCH_CONNECTIONS = 8
+BATCH_COPY_POLL_INTERVAL = 1
+
 
 def set_service_properties(client, parameters, delete_retention=None, days_retained=None, static_website=None,
                            index_document=None, error_document_404_path=None):
@@ -73,9 +78,21 @@ def show_blob(cmd, client, container_name, blob_name, snapshot=None, lease_id=No
 
 
 # pylint: disable=unused-variable,logging-format-interpolation
-def delete_directory(client, container_name, directory_name):
+def delete_directory(cmd, client, container_name, directory_path, fail_not_exist=False, recursive=None, batch=None,
+                     lease_id=None, if_modified_since=None, if_unmodified_since=None, if_match=None,
+                     if_none_match=None, timeout=None):
+    if batch:
+        if not recursive:
+            raise CLIError('usage error: --batch requires --recursive.')
+        _validate_batch_account(cmd, client)
+        _delete_blobs_in_batches(cmd, client, container_name, _list_directory_blobs(client, container_name,
+                                                                                    directory_path))
 
-    deleted, marker = client.delete_directory(container_name, directory_name, recursive=True)
+    deleted, marker = client.delete_directory(container_name, directory_path, fail_not_exist=fail_not_exist,
+                                              recursive=recursive, lease_id=lease_id,
+                                              if_modified_since=if_modified_since,
+                                              if_unmodified_since=if_unmodified_since, if_match=if_match,
+                                              if_none_match=if_none_match, timeout=timeout)
 
     # if HNS is enabled, the delete operation is atomic and no marker is returned
     # if HNS is not enabled, and there are too more files/subdirectories in the directories to be deleted
@@ -83,9 +100,11 @@ def delete_directory(client, container_name, directory_name):
     # the rest of the files/subdirectories
     count = 1
     while marker is not None:
-        deleted, marker = client.delete_directory(container_name, directory_name, marker=marker, recursive=True)
+        deleted, marker = client.delete_directory(container_name, directory_path, marker=marker,
+                                                  recursive=recursive, timeout=timeout)
         count += 1
-    logger.info("Took {} call(s) to finish moving.".format(count))
+    logger.info("Took {} call(s) to finish deleting.".format(count))
+    return deleted
 
 
 def list_blobs(client, container_name, prefix=None, num_results=None, include='mc',
@@ -94,8 +113,8 @@ def list_blobs(client, container_name, prefix=None, num_results=None, include='m
                       delimiter, marker, timeout)
 
 
-def list_directory(client, container_name, directory_path, prefix=None, num_results=None, include='mc',
-                   delimiter=None, marker=None, timeout=None):
+def list_directory(cmd, client, container_name, directory_path, prefix=None, num_results=None, include='mc',
+                   delimiter=None, marker=None, timeout=None, stream=None):
     '''
     :param str container_name:
         Name of existing container.
@@ -124,16 +143,28 @@ def list_directory(client, container_name, directory_path, prefix=None, num_resu
         where the previous generator stopped.
     :param int timeout:
         The timeout parameter is expressed in seconds.
+    :param bool stream:
+        Write the blobs as JSON lines, or TSV rows with the tsv output format, as they are listed
+        instead of returning them.
     '''
     directory_prefix = directory_path + '/' + prefix if prefix else directory_path + '/'
-    return client.list_blobs(container_name, directory_prefix, num_results, include,
-                             delimiter, marker, timeout)
+    blobs = client.list_blobs(container_name, directory_prefix, num_results, include,
+                              delimiter, marker, timeout)
+    if not stream:
+        return blobs
 
+    from ..util import stream_output
+    stream_output(cmd, blobs)
+    if getattr(blobs, 'next_marker', None):
+        logger.warning('Next Marker:')
+        logger.warning(blobs.next_marker)
+    return None
 
-def rename_directory(client, container_name, new_path, source_path,
+
+def rename_directory(cmd, client, container_name, new_path, source_path,
                      mode=None, lease_id=None, source_lease_id=None,
                      source_if_modified_since=None, source_if_unmodified_since=None,
-                     source_if_match=None, source_if_none_match=None, timeout=None):
+                     source_if_match=None, source_if_none_match=None, timeout=None, batch=None):
     """
      Rename a directory(which can contain other directories or blobs).
 
@@ -148,7 +179,7 @@ def rename_directory(client, container_name, new_path, source_path,
      :param mode:
          Optional. Valid only when namespace is enabled.
          This parameter determines the behavior of the move operation.
-         The value must be "legacy" or "posix", and the default value will be "posix".
+         The value must be "legacy" or "posix", and the default value will be "posix". Not supported with batch.
          Legacy: if the destination of the move is an existing directory and that directory is empty,
          the source will overwrite the destination. If the directory is not empty, the move will fail.
          Posix: if the destination of the move is an existing empty directory,
@@ -175,10 +206,21 @@ def rename_directory(client, container_name, new_path, source_path,
          only if the source's ETag does not match the value specified.
      :param int timeout:
          The timeout parameter is expressed in seconds.
+     :param bool batch:
+         Optional. Valid only when namespace is disabled. Copy the blobs of the directory into new_path on the
+         service and delete them in batches over a thread pool, instead of following the continuation of the move
+         one call at a time.
 
      """
+    if batch:
+        if mode:
+            raise CLIError('usage error: --move-mode is not supported with --batch, which is only for accounts '
+                           'without hierarchical namespace.')
+        _validate_batch_account(cmd, client)
+        return _move_blobs_in_batches(cmd, client, container_name, new_path, source_path)
+
     marker = client.rename_path(container_name, new_path, source_path,
-                                mode=mode, lease_id=lease_id, source_lease_id=source_lease_id,
+                                mode=mode or 'posix', lease_id=lease_id, source_lease_id=source_lease_id,
                                 source_if_modified_since=source_if_modified_since,
                                 source_if_unmodified_since=source_if_unmodified_since,
                                 source_if_match=source_if_match, source_if_none_match=source_if_none_match,
@@ -194,3 +236,133 @@ def rename_directory(client, container_name, new_path, source_path,
         marker = client.rename_path(container_name, new_path, source_path, marker=marker)
         count += 1
     logger.info("Took {} call(s) to finish moving.".format(count))
+
+
+def _validate_batch_account(cmd, client):
+    """ the blobs are only listed and moved from the client on accounts without hierarchical namespace """
+    from .._validators import _query_account_rg
+    try:
+        rg, scf = _query_account_rg(cmd.cli_ctx, client.account_name)
+        hns_enabled = scf.storage_accounts.get_properties(rg, client.account_name).is_hns_enabled
+    except Exception as ex:  # pylint: disable=broad-except
+        logger.warning("Unable to check whether storage account '%s' has hierarchical namespace enabled: %s",
+                       client.account_name, ex)
+        return
+    if hns_enabled:
+        raise CLIError('usage error: --batch is only supported on accounts without hierarchical namespace, where '
+                       'the operation is atomic on the service.')
+
+
+def _list_directory_blobs(client, container_name, directory_path):
+    """ the names of the blobs under the directory, listed a page at a time """
+    prefix = directory_path.rstrip('/') + '/'
+    return (blob.name for blob in client.list_blobs(container_name, prefix=prefix))
+
+
+def _delete_blobs_in_batches(cmd, client, container_name, blob_names):
+    t_delete_request, t_delete_snapshot = cmd.get_models('blob.models#BatchDeleteSubRequest',
+                                                         'blob.models#DeleteSnapshot')
+
+    def _delete(batch):
+        responses = client.batch_delete_blobs([t_delete_request(container_name, blob_name,
+                                                                delete_snapshots=t_delete_snapshot.Include)
+                                               for blob_name in batch])
+        # the blobs deleted since they were listed are not failures
+        return [response.batch_sub_request.blob_name for response in responses
+                if not response.is_successful and response.http_response.status != 404]
+
+    _run_batches(cmd, blob_names, _delete, 'deleted')
+
+
+def _move_blobs_in_batches(cmd, client, container_name, new_path, source_path):
+    """
+    Move a directory by copying its blobs on the service and deleting them in batches. The blobs are moved into the
+    destination path, the blobs moved are gone from the source directory so running it again continues where it
+    stopped. A copy does not carry the snapshots of its source, they are deleted with the source blobs.
+    """
+    import time
+    t_delete_request, t_delete_snapshot = cmd.get_models('blob.models#BatchDeleteSubRequest',
+                                                         'blob.models#DeleteSnapshot')
+    source_path = source_path.rstrip('/')
+    new_path = new_path.rstrip('/')
+
+    def _copy(destinations):
+        """ starts the copies of all the blobs before polling the pending ones, returns the blobs copied """
+        statuses = {}
+        for source_name, destination_name in destinations.items():
+            source_url = client.make_blob_url(container_name, source_name, sas_token=client.sas_token)
+            statuses[source_name] = client.copy_blob(container_name, destination_name, source_url).status
+        pending = [source_name for source_name, status in statuses.items() if status == 'pending']
+        while pending:
+            time.sleep(BATCH_COPY_POLL_INTERVAL)
+            for source_name in pending:
+                statuses[source_name] = client.get_blob_properties(
+                    container_name, destinations[source_name]).properties.copy.status
+            pending = [source_name for source_name in pending if statuses[source_name] == 'pending']
+        return [source_name for source_name, status in statuses.items() if status == 'success']
+
+    def _move(batch):
+        copied = _copy({blob_name: new_path + blob_name[len(source_path):] for blob_name in batch})
+        failures = sorted(set(batch) - set(copied))
+        if copied:
+            responses = client.batch_delete_blobs([t_delete_request(container_name, blob_name,
+                                                                    delete_snapshots=t_delete_snapshot.Include)
+                                                   for blob_name in copied])
+            failures.extend(response.batch_sub_request.blob_name for response in responses
+                            if not response.is_successful and response.http_response.status != 404)
+        return failures
+
+    _run_batches(cmd, _list_directory_blobs(client, container_name, source_path), _move, 'moved')
+
+    # the blob of the directory itself
+    if client.exists(container_name, source_path):
+        if not _copy({source_path: new_path}):
+            raise CLIError('Failed to move the directory {}.'.format(source_path))
+        client.delete_blob(container_name, source_path)
+
+
+def _run_batches(cmd, blob_names, operation, action):
+    """
+    Run the operation on batches of the blobs over a thread pool, only listing the blobs as the batches are
+    started. The operation returns the blobs of the batch it failed on.
+    """
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+    controller = cmd.cli_ctx.get_progress_controller()
+    failures = []
+    done = [0]
+
+    def _finish(futures):
+        for future in futures:
+            batch_size, batch_failures = future.result()
+            failures.extend(batch_failures)
+            done[0] += batch_size - len(batch_failures)
+        controller.add(message='{} blob(s) {}'.format(done[0], action))
+
+    controller.begin()
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_BATCH_CONNECTIONS) as executor:
+            running = set()
+            for batch in _chunks(blob_names, BATCH_SIZE):
+                if len(running) >= MAX_BATCH_CONNECTIONS:
+                    finished, running = wait(running, return_when=FIRST_COMPLETED)
+                    _finish(finished)
+                running.add(executor.submit(lambda batch: (len(batch), operation(batch)), batch))
+            _finish(running)
+    finally:
+        controller.end()
+
+    logger.info('%d blob(s) %s.', done[0], action)
+    if failures:
+        raise CLIError('{} blob(s) could not be {}, run the command again to retry them: {}'.format(
+            len(failures), action, ', '.join(failures[:10]) + (', ...' if len(failures) > 10 else '')))
+
+
+def _chunks(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,207 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Syncs a local directory to a blob directory with a local manifest of what was synced. With a current manifest a sync
+only stats the local files and transfers the difference, without listing the blobs.
+"""
+
+import base64
+import calendar
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+import timeit
+
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_VERSION = 1
+# how long in seconds a manifest is trusted before the blobs are listed again
+MANIFEST_MAX_AGE = 7 * 24 * 3600
+MD5_CHUNK_SIZE = 4 * 1024 * 1024
+
+# the fields of a manifest entry
+SIZE, MTIME, MD5, ETAG = range(4)
+
+
+class SyncManifest(object):
+    """
+    The files synced from a source directory to a blob directory. It is stored as gzipped JSON, each entry is a list
+    of the size, modification time, content MD5 and blob ETag keyed by the path relative to the source.
+    """
+
+    def __init__(self, path, max_age=MANIFEST_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        # when the blobs were last listed
+        self.created = None
+
+    def load(self, source, destination):
+        """ The entries of the manifest, None if it is missing, of another sync or older than max_age. """
+        try:
+            with gzip.open(self.path, 'rb') as manifest_file:
+                manifest = json.loads(manifest_file.read().decode('utf-8'))
+        except (IOError, OSError, ValueError):
+            return None
+
+        if manifest.get('version') != MANIFEST_VERSION or manifest.get('source') != source or \
+                manifest.get('destination') != destination:
+            logger.warning('The sync manifest %s is of another sync, listing the destination.', self.path)
+            return None
+        if time.time() - manifest.get('created', 0) > self.max_age:
+            logger.info('The sync manifest %s is stale, listing the destination.', self.path)
+            return None
+        self.created = manifest['created']
+        return manifest['entries']
+
+    def save(self, source, destination, entries):
+        """ Write the manifest into a temporary file and replace the manifest with it. """
+        data = json.dumps({
+            'version': MANIFEST_VERSION,
+            'source': source,
+            'destination': destination,
+            'created': self.created,
+            'entries': entries
+        }, separators=(',', ':'))
+        # a temporary file of its own, concurrent syncs don't write over each other's
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)),
+                                         prefix=os.path.basename(self.path) + '.')
+        os.close(fd)
+        try:
+            with gzip.open(temp_path, 'wb') as manifest_file:
+                manifest_file.write(data.encode('utf-8'))
+            if hasattr(os, 'replace'):
+                os.replace(temp_path, self.path)
+            else:
+                # Python 2.x: os.rename does not overwrite existing files on Windows
+                if os.name == 'nt' and os.path.exists(self.path):
+                    os.remove(self.path)
+                os.rename(temp_path, self.path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+
+class SyncResult(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, full_enumeration):
+        self.full_enumeration = full_enumeration
+        self.uploaded = 0
+        self.deleted = 0
+        self.unchanged = 0
+        self.bytes_transferred = 0
+        self.elapsed = 0
+
+
+def sync_with_manifest(transfer, source, container, blob_path, manifest):
+    """
+    Sync the files of the source directory to the blob directory, deleting the blobs of files that were deleted.
+
+    Without a current manifest the blobs are listed, and a file is uploaded when its blob is missing, of another size
+    or older than the file. With the manifest a file is only uploaded when its size and modification time changed
+    and so did its content MD5, and only the blobs of the files gone from the manifest are deleted.
+
+    :param transfer: The BlockBlobTransfer uploading the files.
+    :param manifest: The SyncManifest, written with the files synced even when the sync fails.
+    """
+    start_time = timeit.default_timer()
+    source = os.path.abspath(source)
+    if not os.path.isdir(source):
+        raise ValueError('The source {} is not a directory.'.format(source))
+    client = transfer.client
+    blob_path = (blob_path or '').strip('/')
+    destination = '{}/{}'.format(container, blob_path)
+    prefix = blob_path + '/' if blob_path else ''
+
+    entries = manifest.load(source, destination)
+    full_enumeration = entries is None
+    if full_enumeration:
+        manifest.created = time.time()
+        entries = _list_blob_entries(client, container, prefix)
+    result = SyncResult(full_enumeration)
+    synced = {}
+
+    try:
+        for relative_path, stat in _walk_files(source):
+            entry = entries.pop(relative_path, None)
+            if entry is not None and not _is_changed(entry, stat, full_enumeration):
+                synced[relative_path] = [stat.st_size, stat.st_mtime, entry[MD5], entry[ETAG]]
+                result.unchanged += 1
+                continue
+
+            file_path = os.path.join(source, *relative_path.split('/'))
+            md5 = _get_file_md5(file_path)
+            if entry is not None and entry[SIZE] == stat.st_size and entry[MD5] == md5:
+                # only touched
+                synced[relative_path] = [stat.st_size, stat.st_mtime, md5, entry[ETAG]]
+                result.unchanged += 1
+                continue
+
+            # with the content MD5 on the blob, a full listing finds the files only touched since
+            upload = transfer.upload_file(file_path, container, prefix + relative_path, content_md5=md5)
+            synced[relative_path] = [stat.st_size, stat.st_mtime, md5, upload.etag]
+            result.uploaded += 1
+            result.bytes_transferred += upload.size
+
+        # the rest are the blobs of deleted files
+        for relative_path in sorted(entries):
+            try:
+                client.delete_blob(container, prefix + relative_path)
+            except Exception as ex:  # pylint: disable=broad-except
+                if getattr(ex, 'status_code', None) != 404:
+                    raise
+            result.deleted += 1
+        entries = {}
+    finally:
+        # the entries of the files not synced yet are kept for the next sync
+        synced.update(entries)
+        manifest.save(source, destination, synced)
+
+    result.elapsed = timeit.default_timer() - start_time
+    return result
+
+
+def _is_changed(entry, stat, full_enumeration):
+    if entry[SIZE] != stat.st_size:
+        return True
+    if full_enumeration:
+        # the entry of a blob has its last modified time, like AzCopy a newer file is synced
+        return stat.st_mtime > entry[MTIME]
+    return entry[MTIME] != stat.st_mtime
+
+
+def _list_blob_entries(client, container, prefix):
+    entries = {}
+    for blob in client.list_blobs(container, prefix=prefix or None):
+        if blob.name.endswith('/'):
+            continue
+        properties = blob.properties
+        content_settings = getattr(properties, 'content_settings', None)
+        last_modified = calendar.timegm(properties.last_modified.utctimetuple()) if properties.last_modified else 0
+        entries[blob.name[len(prefix):]] = [properties.content_length, last_modified,
+                                            getattr(content_settings, 'content_md5', None), properties.etag]
+    return entries
+
+
+def _walk_files(source):
+    for root, dirs, files in os.walk(source):
+        dirs.sort()
+        for file_name in sorted(files):
+            file_path = os.path.join(root, file_name)
+            yield os.path.relpath(file_path, source).replace(os.path.sep, '/'), os.stat(file_path)
+
+
+def _get_file_md5(file_path):
+    """ the base64 encoded MD5 of the file, as the service returns the content MD5 of a blob """
+    md5 = hashlib.md5()
+    with open(file_path, 'rb') as source_file:
+        for chunk in iter(lambda: source_file.read(MD5_CHUNK_SIZE), b''):
+            md5.update(chunk)
+    return base64.b64encode(md5.digest()).decode('utf-8')
@@ -85,3 +85,307 @@ class StorageTestFilesPreparer(AbstractPreparer):
 
     def get_temp_dir(self):
         return getattr(self, '_temp_dir', None)
+
+
+class LocalBlobNotFoundError(Exception):
+    def __init__(self, blob_name):
+        super(LocalBlobNotFoundError, self).__init__('The specified blob {} does not exist.'.format(blob_name))
+        self.status_code = 404
+
+
+class LocalConditionNotMetError(Exception):
+    def __init__(self, blob_name):
+        super(LocalConditionNotMetError, self).__init__(
+            'The condition specified using HTTP conditional header(s) is not met for {}.'.format(blob_name))
+        self.status_code = 412
+
+
+class LocalBlob(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, name, content, etag):
+        import datetime
+        self.name = name
+        self.content = content
+        self.properties = LocalBlobProperties(len(content), etag, datetime.datetime.utcnow())
+
+
+class LocalBlobPrefix(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, name):
+        self.name = name
+
+
+class LocalBlobProperties(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, content_length, etag, last_modified=None):
+        self.content_length = content_length
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_settings = LocalContentSettings()
+
+
+class LocalContentSettings(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, content_md5=None):
+        self.content_md5 = content_md5
+
+
+class LocalBlobService(object):
+    """
+    An in memory stand-in for BlockBlobService, in the spirit of Azurite. Blocks are staged with put_block and the
+    blob is only created when they are committed with put_block_list. Every request sleeps for latency seconds.
+    """
+
+    def __init__(self, latency=0):
+        import threading
+        self.latency = latency
+        self.account_name = 'local'
+        self.sas_token = None
+        self.lock = threading.Lock()
+        self.blobs = {}
+        self.uncommitted_blocks = {}
+        self.requests = []
+
+    def _request(self, operation):
+        import time
+        with self.lock:
+            self.requests.append(operation)
+        if self.latency:
+            time.sleep(self.latency)
+
+    def count_requests(self, operation):
+        return len([request for request in self.requests if request == operation])
+
+    def put_block(self, container_name, blob_name, block, block_id, **_kwargs):
+        self._request('put_block')
+        with self.lock:
+            self.uncommitted_blocks.setdefault((container_name, blob_name), {})[block_id] = bytes(block)
+
+    def put_block_list(self, container_name, blob_name, block_list, content_settings=None, **_kwargs):
+        self._request('put_block_list')
+        with self.lock:
+            staged = self.uncommitted_blocks.pop((container_name, blob_name), {})
+            content = b''.join(staged[block.id] for block in block_list)
+            etag = '"{}"'.format(len(self.requests))
+            blob = self.blobs[(container_name, blob_name)] = LocalBlob(blob_name, content, etag)
+            if content_settings is not None:
+                blob.properties.content_settings = content_settings
+            return blob.properties
+
+    def create_blob_from_bytes(self, container_name, blob_name, blob, **_kwargs):
+        self._request('create_blob_from_bytes')
+        with self.lock:
+            etag = '"{}"'.format(len(self.requests))
+            self.blobs[(container_name, blob_name)] = LocalBlob(blob_name, bytes(blob), etag)
+
+    def get_blob_properties(self, container_name, blob_name, **_kwargs):
+        self._request('get_blob_properties')
+        try:
+            return self.blobs[(container_name, blob_name)]
+        except KeyError:
+            raise LocalBlobNotFoundError(blob_name)
+
+    def exists(self, container_name, blob_name=None, **_kwargs):
+        self._request('exists')
+        if blob_name is None:
+            return any(container == container_name for container, _ in self.blobs)
+        return (container_name, blob_name) in self.blobs
+
+    def get_blob_to_bytes(self, container_name, blob_name, start_range=None, end_range=None, if_match=None,
+                          **_kwargs):
+        blob = self.get_blob_properties(container_name, blob_name)
+        if if_match is not None and if_match != blob.properties.etag:
+            raise LocalConditionNotMetError(blob_name)
+        start = start_range or 0
+        end = len(blob.content) if end_range is None else end_range + 1
+        return LocalBlob(blob_name, blob.content[start:end], blob.properties.etag)
+
+    def list_blobs(self, container_name, prefix=None, delimiter=None, **_kwargs):
+        self._request('list_blobs')
+        prefix = prefix or ''
+        results = []
+        for (container, name), blob in sorted(self.blobs.items()):
+            if container != container_name or not name.startswith(prefix):
+                continue
+            if delimiter and delimiter in name[len(prefix):]:
+                # roll the blobs of a virtual directory up into one blob prefix
+                directory = name[:name.index(delimiter, len(prefix)) + len(delimiter)]
+                if not results or results[-1].name != directory:
+                    results.append(LocalBlobPrefix(directory))
+                continue
+            results.append(blob)
+        return results
+
+    def batch_delete_blobs(self, batch_delete_sub_requests, **_kwargs):
+        if not 1 <= len(batch_delete_sub_requests) <= 256:
+            raise ValueError("Batch request should take 1 to 256 sub-requests")
+        self._request('batch_delete_blobs')
+        responses = []
+        with self.lock:
+            for request in batch_delete_sub_requests:
+                found = self.blobs.pop((request.container_name, request.blob_name), None) is not None
+                responses.append(LocalBatchSubResponse(request, 202 if found else 404))
+        return responses
+
+    def make_blob_url(self, container_name, blob_name, sas_token=None, **_kwargs):
+        return 'https://local.blob/{}/{}{}'.format(container_name, blob_name, '?' + sas_token if sas_token else '')
+
+    def copy_blob(self, container_name, blob_name, copy_source, **_kwargs):
+        self._request('copy_blob')
+        source_container, source_name = copy_source.split('?')[0][len('https://local.blob/'):].split('/', 1)
+        source = self.get_blob_properties(source_container, source_name)
+        with self.lock:
+            etag = '"{}"'.format(len(self.requests))
+            self.blobs[(container_name, blob_name)] = LocalBlob(blob_name, source.content, etag)
+        return LocalCopyProperties('success')
+
+    def delete_directory(self, container_name, directory_path, fail_not_exist=False, recursive=False, marker=None,
+                         **_kwargs):
+        """ deletes the directory and at most 10 of its blobs, like the service without hierarchical namespace """
+        self._request('delete_directory')
+        prefix = directory_path + '/'
+        with self.lock:
+            names = [name for container, name in sorted(self.blobs) if container == container_name and
+                     name.startswith(prefix)]
+            if fail_not_exist and not names and (container_name, directory_path) not in self.blobs:
+                raise LocalBlobNotFoundError(directory_path)
+            if names and not recursive:
+                raise ValueError('The directory is not empty.')
+            for name in names[:10]:
+                del self.blobs[(container_name, name)]
+            if len(names) > 10:
+                return True, 'marker'
+            return self.blobs.pop((container_name, directory_path), None) is not None, None
+
+    def delete_blob(self, container_name, blob_name, **_kwargs):
+        self._request('delete_blob')
+        with self.lock:
+            if self.blobs.pop((container_name, blob_name), None) is None:
+                raise LocalBlobNotFoundError(blob_name)
+
+
+class LocalBlobBlock(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, id=None):  # pylint: disable=redefined-builtin
+        self.id = id
+
+
+class LocalDirectory(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, name):
+        self.name = name
+
+
+class LocalFile(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, name):
+        self.name = name
+
+
+class LocalFileService(object):
+    """
+    An in memory stand-in for the directory listing of FileService. Every listing sleeps for latency seconds, the
+    directories listed and the most listings running at a time are recorded.
+    """
+
+    def __init__(self, file_paths, latency=0):
+        import threading
+        self.file_paths = file_paths
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.listed_directories = []
+        self.running = 0
+        self.max_running = 0
+
+    def list_directories_and_files(self, share_name, directory_name=None, **_kwargs):  # pylint: disable=unused-argument
+        import time
+        with self.lock:
+            self.listed_directories.append(directory_name or '')
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        if self.latency:
+            time.sleep(self.latency)
+
+        prefix = directory_name + '/' if directory_name else ''
+        names = set()
+        results = []
+        for path in sorted(self.file_paths):
+            if not path.startswith(prefix):
+                continue
+            name = path[len(prefix):].split('/')[0]
+            if name not in names:
+                names.add(name)
+                results.append(LocalDirectory(name) if '/' in path[len(prefix):] else LocalFile(name))
+        with self.lock:
+            self.running -= 1
+        return iter(results)
+
+
+class LocalBatchDeleteSubRequest(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, container_name, blob_name, delete_snapshots=None, **_kwargs):
+        self.container_name = container_name
+        self.blob_name = blob_name
+        self.delete_snapshots = delete_snapshots
+
+
+class LocalBatchSubResponse(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, batch_sub_request, status):
+        self.batch_sub_request = batch_sub_request
+        self.is_successful = status < 300
+        self.http_response = LocalHttpResponse(status)
+
+
+class LocalHttpResponse(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, status):
+        self.status = status
+
+
+class LocalDeleteSnapshot(object):  # pylint: disable=too-few-public-methods
+    Include = 'include'
+    Only = 'only'
+
+
+class LocalCopyProperties(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, status):
+        self.status = status
+
+
+class LocalProgressController(object):
+    def __init__(self):
+        self.messages = []
+        self.running = False
+
+    def begin(self, **_kwargs):
+        self.running = True
+
+    def add(self, message=None, **_kwargs):
+        self.messages.append(message)
+
+    def end(self, **_kwargs):
+        self.running = False
+
+
+class LocalInvocation(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, output=None):
+        self.data = {'output': output}
+
+
+class LocalCliContext(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, output=None):
+        self.progress_controller = LocalProgressController()
+        self.invocation = LocalInvocation(output)
+
+    def get_progress_controller(self, det=False):  # pylint: disable=unused-argument
+        return self.progress_controller
+
+
+class LocalCommand(object):  # pylint: disable=too-few-public-methods
+    """ a command resolving the models of the local services """
+
+    models = {
+        'file.models#Directory': LocalDirectory,
+        'file.models#File': LocalFile,
+        'blob.models#BatchDeleteSubRequest': LocalBatchDeleteSubRequest,
+        'blob.models#DeleteSnapshot': LocalDeleteSnapshot,
+        'blob.models#BlobBlock': LocalBlobBlock,
+        'blob.models#ContentSettings': LocalContentSettings
+    }
+
+    def __init__(self, output=None):
+        self.cli_ctx = LocalCliContext(output)
+
+    def get_models(self, *names):
+        return tuple(self.models[name] for name in names)
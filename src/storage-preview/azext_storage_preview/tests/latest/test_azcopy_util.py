@@ -0,0 +1,179 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+import mock
+
+from ...azcopy.credential_cache import CredentialCache, CACHE_FILE_NAME, KEY_FILE_NAME
+from ...azcopy.util import parse_job_output, storage_client_auth_for_azcopy
+from ...operations.azcopy import _use_native_transfer
+
+
+def _message(message_type, content):
+    if not isinstance(content, str):
+        content = json.dumps(content)
+    return json.dumps({'TimeStamp': '2020-01-01T00:00:00Z', 'MessageType': message_type,
+                       'MessageContent': content}) + '\n'
+
+
+class TestAzCopyJobOutput(unittest.TestCase):
+    def test_parse_copy_job(self):
+        lines = [
+            'INFO: Scanning...\n',
+            _message('Init', {'LogFileLocation': '/tmp/job.log', 'JobID': 'job-1', 'IsCleanupJob': False}),
+            _message('Info', 'Authenticating to destination using Azure AD'),
+            _message('Progress', {'JobID': 'job-1', 'JobStatus': 'InProgress', 'TotalTransfers': 4,
+                                  'TransfersCompleted': 1, 'TransfersFailed': 0, 'TransfersSkipped': 0,
+                                  'TotalBytesTransferred': 1024, 'PercentComplete': 25}),
+            _message('EndOfJob', {'JobID': 'job-1', 'JobStatus': 'CompletedWithErrors', 'TotalTransfers': 4,
+                                  'TransfersCompleted': 3, 'TransfersFailed': 1, 'TransfersSkipped': 0,
+                                  'TotalBytesTransferred': 3072, 'PercentComplete': 100,
+                                  'FailedTransfers': [{'Src': '/data/d.txt', 'Dst': 'https://a/c/d.txt',
+                                                       'TransferStatus': 'Failed'}]})
+        ]
+        progress = []
+        summary = parse_job_output(lines, lambda s: progress.append((s.percent_complete, s.transfers_completed)),
+                                   start_time=0)
+
+        self.assertEqual([(25, 1), (100, 3)], progress)
+        self.assertEqual('job-1', summary.job_id)
+        self.assertEqual('/tmp/job.log', summary.log_file)
+        self.assertEqual('CompletedWithErrors', summary.status)
+        self.assertEqual(3072, summary.bytes_transferred)
+        self.assertEqual(1, summary.transfers_failed)
+        self.assertEqual([{'source': '/data/d.txt', 'destination': 'https://a/c/d.txt', 'status': 'Failed'}],
+                         summary.failed_transfers)
+        self.assertGreater(summary.throughput, 0)
+
+    def test_parse_sync_job(self):
+        lines = [
+            _message('Init', {'JobID': 'job-2'}),
+            _message('EndOfJob', {'JobID': 'job-2', 'JobStatus': 'Completed', 'CopyTotalTransfers': 2,
+                                  'CopyTransfersCompleted': 2, 'CopyTransfersFailed': 0, 'BytesOverWire': 10,
+                                  'PercentComplete': 100})
+        ]
+        summary = parse_job_output(lines)
+        self.assertEqual(2, summary.total_transfers)
+        self.assertEqual(2, summary.transfers_completed)
+        self.assertEqual(0, summary.transfers_failed)
+        self.assertEqual(10, summary.bytes_transferred)
+
+    def test_parse_failed_job(self):
+        lines = [_message('Error', 'failed to perform copy command due to error: cannot find source')]
+        summary = parse_job_output(lines)
+        self.assertIsNone(summary.job_id)
+        self.assertEqual(['failed to perform copy command due to error: cannot find source'], summary.errors)
+
+
+class TestCredentialCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.now = 1000
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def _cache(self):
+        return CredentialCache(self.cache_dir, timer=lambda: self.now)
+
+    def test_cache_until_expiry(self):
+        self._cache().set('key', {'token': 'secret-token'}, expires_on=2000)
+        self.assertEqual({'token': 'secret-token'}, self._cache().get('key'))
+        self.assertEqual({'token': 'secret-token'}, self._cache().get('key', margin=900))
+        # expires within the margin
+        self.assertIsNone(self._cache().get('key', margin=1000))
+        self.now = 2000
+        self.assertIsNone(self._cache().get('key'))
+        self.assertIsNone(self._cache().get('missing'))
+
+    def test_cache_is_encrypted(self):
+        self._cache().set('key', 'secret-token', expires_on=2000)
+        with open(os.path.join(self.cache_dir, CACHE_FILE_NAME), 'r') as f:
+            self.assertNotIn('secret-token', f.read())
+        if os.name == 'posix':
+            for name in (CACHE_FILE_NAME, KEY_FILE_NAME):
+                mode = os.stat(os.path.join(self.cache_dir, name)).st_mode
+                self.assertEqual(0o600, stat.S_IMODE(mode))
+
+        # a new key cannot read the credentials of the old one
+        os.remove(os.path.join(self.cache_dir, KEY_FILE_NAME))
+        self.assertIsNone(self._cache().get('key'))
+
+    def test_expired_entries_are_removed(self):
+        self._cache().set('old', 'old-token', expires_on=1500)
+        self.now = 1600
+        self._cache().set('new', 'new-token', expires_on=2000)
+        with open(os.path.join(self.cache_dir, CACHE_FILE_NAME), 'r') as f:
+            self.assertEqual(['new'], list(json.load(f)))
+
+    def test_concurrent_commands(self):
+        import threading
+        errors = []
+
+        def _command(i):
+            # a cache of its own, like another az process
+            cache = self._cache()
+            try:
+                for j in range(20):
+                    cache.set('key{}'.format(i), 'token{}'.format(j), expires_on=2000)
+                    cache.get('key{}'.format(i))
+            except Exception as ex:  # pylint: disable=broad-except
+                errors.append(ex)
+
+        self._cache().set('key', 'token', expires_on=2000)
+        commands = [threading.Thread(target=_command, args=(i,)) for i in range(4)]
+        for command in commands:
+            command.start()
+        for command in commands:
+            command.join()
+        self.assertEqual([], errors)
+        self.assertEqual(sorted([CACHE_FILE_NAME, KEY_FILE_NAME]), sorted(os.listdir(self.cache_dir)))
+
+    def test_cache_errors_are_misses(self):
+        self._cache().set('key', 'token', expires_on=2000)
+        with mock.patch('azext_storage_preview.azcopy.credential_cache._write_private_file',
+                        side_effect=OSError('disk full')):
+            self._cache().set('other', 'token', expires_on=2000)
+        self.assertIsNone(self._cache().get('other'))
+
+        with open(os.path.join(self.cache_dir, CACHE_FILE_NAME), 'w') as f:
+            json.dump({'key': {'expires_on': 2000, 'value': 'not encrypted'}, 'other': {}}, f)
+        self.assertIsNone(self._cache().get('key'))
+        self.assertIsNone(self._cache().get('other'))
+
+    @mock.patch('azext_storage_preview.azcopy.util._generate_sas_token', autospec=True)
+    def test_sas_token_is_reused(self, generate_sas_token):
+        generate_sas_token.side_effect = ['sas1', 'sas2']
+        cmd = mock.MagicMock()
+        cmd.cli_ctx.config.config_dir = self.cache_dir
+        client = mock.MagicMock(sas_token=None, account_name='account', account_key='key1')
+
+        self.assertEqual('sas1', storage_client_auth_for_azcopy(cmd, client, 'blob').sas_token)
+        self.assertEqual('sas1', storage_client_auth_for_azcopy(cmd, client, 'blob').sas_token)
+        self.assertEqual(1, generate_sas_token.call_count)
+
+        # a rotated account key signs a new token
+        client.account_key = 'key2'
+        self.assertEqual('sas2', storage_client_auth_for_azcopy(cmd, client, 'blob').sas_token)
+
+
+class TestTransferMode(unittest.TestCase):
+    def test_native_transfer_without_azcopy(self):
+        with mock.patch('platform.system', return_value='SunOS'):
+            self.assertTrue(_use_native_transfer(None))
+            self.assertFalse(_use_native_transfer('azcopy'))
+        with mock.patch('os.path.exists', return_value=True):
+            self.assertFalse(_use_native_transfer(None))
+            self.assertTrue(_use_native_transfer('native'))
+
+
+if __name__ == '__main__':
+    unittest.main()
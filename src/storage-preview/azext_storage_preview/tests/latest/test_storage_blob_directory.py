@@ -0,0 +1,181 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+
+import mock
+from knack.util import CLIError
+
+from ...operations import blob
+from ...operations.blob import delete_directory, rename_directory
+from .storage_test_util import (LocalBlobService, LocalBatchSubResponse, LocalBlobNotFoundError, LocalCommand,
+                                LocalCopyProperties)
+
+
+class FailingDeleteBlobService(LocalBlobService):
+    """ fails to delete the given blobs once """
+
+    def __init__(self, failing_names):
+        super(FailingDeleteBlobService, self).__init__()
+        self.failing_names = set(failing_names)
+
+    def batch_delete_blobs(self, batch_delete_sub_requests, **kwargs):
+        failing = [request for request in batch_delete_sub_requests if request.blob_name in self.failing_names]
+        responses = super(FailingDeleteBlobService, self).batch_delete_blobs(
+            [request for request in batch_delete_sub_requests if request not in failing], **kwargs)
+        self.failing_names -= set(request.blob_name for request in failing)
+        return responses + [LocalBatchSubResponse(request, 500) for request in failing]
+
+
+class PendingCopyBlobService(LocalBlobService):
+    """ copies stay pending until they are polled, and the copies of the failing blobs fail """
+
+    def __init__(self, failing_names=()):
+        super(PendingCopyBlobService, self).__init__()
+        self.failing_names = set(failing_names)
+        self.sources = {}
+        self.copy_events = []
+
+    def copy_blob(self, container_name, blob_name, copy_source, **kwargs):
+        super(PendingCopyBlobService, self).copy_blob(container_name, blob_name, copy_source, **kwargs)
+        self.sources[blob_name] = copy_source.split('?')[0].split('/', 4)[4]
+        self.copy_events.append('copy')
+        return LocalCopyProperties('pending')
+
+    def get_blob_properties(self, container_name, blob_name, **kwargs):
+        blob = super(PendingCopyBlobService, self).get_blob_properties(container_name, blob_name, **kwargs)
+        if blob_name in self.sources:
+            self.copy_events.append('poll')
+        failed = self.sources.get(blob_name) in self.failing_names
+        blob.properties.copy = LocalCopyProperties('failed' if failed else 'success')
+        return blob
+
+
+class TestBlobDirectoryBatch(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(blob, '_validate_batch_account')
+        self.validate_batch_account = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _create_directory(self, service, name, count):
+        service.create_blob_from_bytes('cont', name, b'')
+        for i in range(count):
+            service.create_blob_from_bytes('cont', '{}/sub{}/blob{:04d}'.format(name, i % 3, i),
+                                           str(i).encode('utf-8'))
+        service.create_blob_from_bytes('cont', name + '-other', b'')
+
+    def _blob_names(self, service):
+        return sorted(name for _, name in service.blobs)
+
+    def test_delete_directory_in_batches(self):
+        service = LocalBlobService()
+        self._create_directory(service, 'dir', 600)
+        cmd = LocalCommand()
+        delete_directory(cmd, service, 'cont', 'dir', recursive=True, batch=True)
+
+        self.assertEqual(['dir-other'], self._blob_names(service))
+        # 3 batches of at most 256 blobs and one delete of the empty directory
+        self.assertEqual(3, service.count_requests('batch_delete_blobs'))
+        self.assertEqual(1, service.count_requests('delete_directory'))
+        self.assertEqual('600 blob(s) deleted', cmd.cli_ctx.progress_controller.messages[-1])
+
+    def test_delete_directory_without_batch(self):
+        service = LocalBlobService()
+        self._create_directory(service, 'dir', 25)
+        delete_directory(LocalCommand(), service, 'cont', 'dir', recursive=True)
+        self.assertEqual(['dir-other'], self._blob_names(service))
+        self.assertEqual(3, service.count_requests('delete_directory'))
+
+        with self.assertRaises(CLIError):
+            delete_directory(LocalCommand(), service, 'cont', 'dir', batch=True)
+
+    def test_delete_directory_fail_not_exist(self):
+        service = LocalBlobService()
+        self.assertFalse(delete_directory(LocalCommand(), service, 'cont', 'dir', recursive=True, batch=True))
+        with self.assertRaises(LocalBlobNotFoundError):
+            delete_directory(LocalCommand(), service, 'cont', 'dir', fail_not_exist=True, recursive=True, batch=True)
+        with self.assertRaises(LocalBlobNotFoundError):
+            delete_directory(LocalCommand(), service, 'cont', 'dir', fail_not_exist=True)
+
+        self._create_directory(service, 'dir', 5)
+        self.assertTrue(delete_directory(LocalCommand(), service, 'cont', 'dir', fail_not_exist=True,
+                                         recursive=True, batch=True))
+        self.assertEqual(['dir-other'], self._blob_names(service))
+
+    def test_delete_directory_failures_are_retried(self):
+        service = FailingDeleteBlobService(['dir/sub0/blob0000', 'dir/sub1/blob0100'])
+        self._create_directory(service, 'dir', 300)
+        with self.assertRaises(CLIError) as error:
+            delete_directory(LocalCommand(), service, 'cont', 'dir', recursive=True, batch=True)
+        self.assertIn('2 blob(s) could not be deleted', str(error.exception))
+        self.assertEqual(['dir', 'dir-other', 'dir/sub0/blob0000', 'dir/sub1/blob0100'], self._blob_names(service))
+
+        delete_directory(LocalCommand(), service, 'cont', 'dir', recursive=True, batch=True)
+        self.assertEqual(['dir-other'], self._blob_names(service))
+
+    def test_move_directory_in_batches(self):
+        service = LocalBlobService()
+        self._create_directory(service, 'dir', 300)
+        rename_directory(LocalCommand(), service, 'cont', 'moved/dir', 'dir', batch=True)
+
+        names = self._blob_names(service)
+        self.assertEqual(302, len(names))
+        self.assertIn('moved/dir', names)
+        self.assertIn('dir-other', names)
+        self.assertEqual(b'299', service.blobs[('cont', 'moved/dir/sub2/blob0299')].content)
+        self.assertFalse([name for name in names if name.startswith('dir/')])
+        self.assertEqual(2, service.count_requests('batch_delete_blobs'))
+
+    @mock.patch.object(blob, 'BATCH_COPY_POLL_INTERVAL', 0)
+    def test_move_directory_copies_started_before_polling(self):
+        service = PendingCopyBlobService(['dir/sub1/blob0001'])
+        self._create_directory(service, 'dir', 10)
+        with self.assertRaises(CLIError) as error:
+            rename_directory(LocalCommand(), service, 'cont', 'moved/dir', 'dir', batch=True)
+        self.assertIn('1 blob(s) could not be moved', str(error.exception))
+
+        # the 10 copies of the batch are started before the first one is polled
+        self.assertEqual(['copy'] * 10 + ['poll'] * 10, service.copy_events)
+        # the blob whose copy failed is kept in the source directory
+        self.assertIn('dir/sub1/blob0001', self._blob_names(service))
+        self.assertFalse([name for name in self._blob_names(service)
+                          if name.startswith('dir/') and name != 'dir/sub1/blob0001'])
+
+    def test_move_directory_without_batch_defaults_to_posix(self):
+        service = mock.MagicMock(rename_path=mock.MagicMock(return_value=None))
+        rename_directory(LocalCommand(), service, 'cont', 'moved/dir', 'dir')
+        self.assertEqual('posix', service.rename_path.call_args[1]['mode'])
+
+    def test_move_directory_batch_with_mode(self):
+        service = LocalBlobService()
+        self._create_directory(service, 'dir', 3)
+        with self.assertRaises(CLIError):
+            rename_directory(LocalCommand(), service, 'cont', 'moved/dir', 'dir', mode='legacy', batch=True)
+        self.assertEqual(5, len(self._blob_names(service)))
+
+
+class TestBlobDirectoryBatchAccount(unittest.TestCase):
+    def _storage_accounts(self, is_hns_enabled):
+        scf = mock.MagicMock()
+        scf.storage_accounts.get_properties.return_value.is_hns_enabled = is_hns_enabled
+        return mock.patch('azext_storage_preview._validators._query_account_rg', return_value=('rg', scf))
+
+    def test_batch_rejected_with_hierarchical_namespace(self):
+        service = LocalBlobService()
+        service.create_blob_from_bytes('cont', 'dir/blob', b'')
+        with self._storage_accounts(True):
+            with self.assertRaises(CLIError):
+                delete_directory(LocalCommand(), service, 'cont', 'dir', recursive=True, batch=True)
+            with self.assertRaises(CLIError):
+                rename_directory(LocalCommand(), service, 'cont', 'moved', 'dir', batch=True)
+        self.assertEqual(['dir/blob'], [name for _, name in service.blobs])
+
+        with self._storage_accounts(False):
+            delete_directory(LocalCommand(), service, 'cont', 'dir', recursive=True, batch=True)
+        self.assertFalse(service.blobs)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,200 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import timeit
+import types
+import unittest
+from fnmatch import fnmatch, fnmatchcase
+
+from six import StringIO
+
+from ...util import collect_blobs, compile_blob_pattern, glob_files_locally, glob_files_remotely, stream_output
+from .storage_test_util import LocalBlobService, LocalFileService, LocalCommand
+
+BLOB_NAMES = [
+    'logs/2020/03/app.gz',
+    'logs/2020/04/app.gz',
+    'logs/2020/04/app.txt',
+    'logs/2020/04/archive/old.gz',
+    'logs/2020/05/app.gz',
+    'logs/2019/04/app.gz',
+    'images/a.png',
+    'readme.md'
+]
+
+
+class TestCollectBlobs(unittest.TestCase):
+    def setUp(self):
+        self.service = LocalBlobService()
+        for name in BLOB_NAMES:
+            self.service.create_blob_from_bytes('cont', name, b'')
+
+    def test_blob_pattern(self):
+        # the fnmatch syntax of the other globs, '*' matches across virtual directories
+        for pattern in ['logs/*/04/*.gz', 'logs/**/*.gz', 'logs/2020/0[!4]/app.?z', '*.md', 'LOGS/*']:
+            matcher = compile_blob_pattern(pattern)
+            for name in BLOB_NAMES + ['logs/2020/0/']:
+                self.assertEqual(fnmatchcase(name, pattern), bool(matcher(name)), (pattern, name))
+        self.assertTrue(compile_blob_pattern('logs/*/04/*.gz')('logs/2020/04/archive/old.gz'))
+
+    def test_collect_blobs_with_literal_prefix(self):
+        self.assertEqual(['logs/2020/04/app.gz', 'logs/2020/04/archive/old.gz'],
+                         sorted(collect_blobs(self.service, 'cont', 'logs/2020/04/*.gz')))
+        # a single listing of the literal prefix
+        self.assertEqual(1, self.service.count_requests('list_blobs'))
+
+    def test_collect_blobs_by_directory(self):
+        self.assertEqual(['logs/2020/04/app.gz', 'logs/2020/04/archive/old.gz', 'logs/2020/05/app.gz'],
+                         sorted(collect_blobs(self.service, 'cont', 'logs/20?0/0[45]/*.gz')))
+        # logs/20, logs/2020/, then logs/2020/04/ and logs/2020/05/, the other directories are never listed
+        self.assertEqual(4, self.service.count_requests('list_blobs'))
+
+    def test_collect_blobs_matches_fnmatch(self):
+        for pattern in [None, '*', '*.gz', 'logs/*/04/*', 'logs/20?9/*', 'images/[a-b].png', 'logs/2020/0?/app.*']:
+            self.assertEqual(sorted(name for name in BLOB_NAMES if not pattern or fnmatchcase(name, pattern)),
+                             sorted(collect_blobs(self.service, 'cont', pattern)), pattern)
+
+    def test_collect_blobs_without_wildcards(self):
+        blobs = collect_blobs(self.service, 'cont', 'readme.md')
+        self.assertIsInstance(blobs, types.GeneratorType)
+        self.assertEqual(['readme.md'], list(blobs))
+        self.assertEqual([], list(collect_blobs(self.service, 'cont', 'missing.md')))
+
+
+class TestGlobFilesRemotely(unittest.TestCase):
+    def setUp(self):
+        self.file_paths = ['dir{}/sub{}/file{}.txt'.format(i, j, k)
+                           for i in range(4) for j in range(4) for k in range(2)] + ['root.txt']
+
+    def _glob(self, service, pattern, max_connections=8):
+        return sorted(glob_files_remotely(LocalCommand(), service, 'share', pattern,
+                                          max_connections=max_connections))
+
+    def test_glob_all_files(self):
+        service = LocalFileService(self.file_paths)
+        matches = self._glob(service, None)
+        self.assertEqual(sorted(self.file_paths), sorted('/'.join(filter(None, match)) for match in matches))
+        # the root, 4 directories and 16 sub directories
+        self.assertEqual(21, len(service.listed_directories))
+
+    def test_glob_prunes_directories(self):
+        service = LocalFileService(self.file_paths)
+        self.assertEqual([('dir2/sub1', 'file0.txt'), ('dir2/sub1', 'file1.txt')],
+                         self._glob(service, 'dir2/sub1/*.txt'))
+        self.assertEqual(['', 'dir2', 'dir2/sub1'], sorted(service.listed_directories))
+
+    def test_glob_lists_directories_in_parallel(self):
+        service = LocalFileService(self.file_paths, latency=0.01)
+        self.assertEqual(32, len(self._glob(service, 'dir*/sub*/*.txt', max_connections=4)))
+        self.assertEqual(4, service.max_running)
+
+    def test_glob_stopped_early(self):
+        service = LocalFileService(self.file_paths, latency=0.01)
+        matches = glob_files_remotely(LocalCommand(), service, 'share', '*.txt', max_connections=2)
+        next(matches)
+        matches.close()
+        listed = len(service.listed_directories)
+        # the listings running when the caller stopped were waited for, no other listing starts
+        self.assertEqual(0, service.running)
+        time.sleep(0.05)
+        self.assertEqual(listed, len(service.listed_directories))
+        self.assertLess(listed, 21)
+
+
+def _glob_files_with_walk(folder_path, pattern):
+    """ the os.walk implementation glob_files_locally replaced, for comparison """
+    pattern = os.path.join(folder_path, pattern.lstrip('/')) if pattern else None
+    len_folder_path = len(folder_path) + 1
+    for root, _, files in os.walk(folder_path):
+        for f in files:
+            full_path = os.path.join(root, f)
+            if not pattern or fnmatch(full_path, pattern):
+                yield (full_path, full_path[len_folder_path:])
+
+
+class TestGlobFilesLocally(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.test_dir = tempfile.mkdtemp()
+        for i in range(10):
+            for j in range(10):
+                directory = os.path.join(cls.test_dir, 'src', 'pkg{}'.format(i), 'mod{}'.format(j))
+                os.makedirs(directory)
+                for k in range(10):
+                    extension = 'py' if k % 2 else 'txt'
+                    with open(os.path.join(directory, 'file{}.{}'.format(k, extension)), 'w') as f:
+                        f.write('content')
+        with open(os.path.join(cls.test_dir, 'readme.md'), 'w') as f:
+            f.write('readme')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.test_dir)
+
+    def test_glob_matches_walk(self):
+        for pattern in [None, '*', '*.md', 'src/pkg1/*', 'src/pkg?/mod[12]/*.py', 'src/pkg[!0-8]/mod9/file1.py',
+                        'src/pkg3/mod3/file3.py', 'src/pkg3', '/src/pkg1*/*/file[0-2].*', 'src/*/mod1/*.txt']:
+            self.assertEqual(sorted(_glob_files_with_walk(self.test_dir, pattern)),
+                             sorted(glob_files_locally(self.test_dir, pattern)), pattern)
+
+    def test_glob_with_stat(self):
+        files = list(glob_files_locally(self.test_dir, 'src/pkg1/mod1/*.py', with_stat=True))
+        self.assertEqual(5, len(files))
+        for full_path, _, stat in files:
+            self.assertEqual(os.stat(full_path).st_size, stat.st_size)
+
+    def test_glob_benchmark(self):
+        pattern = 'src/pkg4/mod[12]/*.py'
+        walk = min(timeit.repeat(lambda: list(_glob_files_with_walk(self.test_dir, pattern)), number=3, repeat=3))
+        scan = min(timeit.repeat(lambda: list(glob_files_locally(self.test_dir, pattern)), number=3, repeat=3))
+        print('os.walk: {:.2f} ms, pruned scandir: {:.2f} ms'.format(walk * 1000 / 3, scan * 1000 / 3))
+        self.assertLess(scan, walk)
+
+
+class ListedItem(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, name, content_length):
+        self.name = name
+        self.content_length = content_length
+
+
+class TestStreamOutput(unittest.TestCase):
+    def _items(self, count, listed):
+        for i in range(count):
+            listed.append(i)
+            yield ListedItem('blob{}'.format(i), i)
+
+    def test_stream_json_lines(self):
+        stream = StringIO()
+        listed = []
+        written = []
+
+        class _Stream(object):
+            def write(self, text):
+                # the items are written before the rest are listed
+                written.append(len(listed))
+                stream.write(text)
+
+            def flush(self):
+                pass
+
+        stream_output(LocalCommand(), self._items(25, listed), stream=_Stream(), flush_size=10)
+        self.assertEqual([10, 20, 25], written)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(25, len(lines))
+        self.assertEqual({'name': 'blob3', 'contentLength': 3}, json.loads(lines[3]))
+
+    def test_stream_tsv(self):
+        stream = StringIO()
+        stream_output(LocalCommand(output='tsv'), self._items(3, []), stream=stream)
+        self.assertEqual(['0\tblob0', '1\tblob1', '2\tblob2'], stream.getvalue().splitlines())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from ...sync_manifest import SyncManifest, sync_with_manifest
+from ...transfer import BlockBlobTransfer
+from .storage_test_util import LocalBlobService, LocalBlobBlock, LocalContentSettings
+
+
+class TestSyncManifest(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.test_dir, 'source')
+        self.manifest_path = os.path.join(self.test_dir, 'manifest.gz')
+        self.client = LocalBlobService()
+        for i in range(20):
+            self._write_file('dir{}/file{}.txt'.format(i % 4, i), 'content {}'.format(i))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _write_file(self, name, content, mtime=None):
+        path = os.path.join(self.source, *name.split('/'))
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(content)
+        # older than the blobs uploaded
+        mtime = time.time() - 3600 if mtime is None else mtime
+        os.utime(path, (mtime, mtime))
+
+    def _sync(self, manifest=None):
+        transfer = BlockBlobTransfer(self.client, LocalBlobBlock, content_settings_cls=LocalContentSettings)
+        return sync_with_manifest(transfer, self.source, 'cont', 'backup', manifest or SyncManifest(self.manifest_path))
+
+    def _blob_names(self):
+        return sorted(name for _, name in self.client.blobs)
+
+    def test_sync_with_manifest(self):
+        result = self._sync()
+        self.assertTrue(result.full_enumeration)
+        self.assertEqual(20, result.uploaded)
+        self.assertEqual(1, self.client.count_requests('list_blobs'))
+        self.assertTrue(os.path.exists(self.manifest_path))
+
+        # nothing changed, the blobs are not listed again
+        result = self._sync()
+        self.assertFalse(result.full_enumeration)
+        self.assertEqual((0, 0, 20), (result.uploaded, result.deleted, result.unchanged))
+        self.assertEqual(1, self.client.count_requests('list_blobs'))
+
+        self._write_file('dir1/file1.txt', 'changed content')
+        self._write_file('dir2/file2.txt', 'content 2', mtime=time.time() - 60)
+        self._write_file('new/file.txt', 'new')
+        os.remove(os.path.join(self.source, 'dir3', 'file3.txt'))
+        result = self._sync()
+        self.assertEqual((2, 1, 18), (result.uploaded, result.deleted, result.unchanged))
+        self.assertEqual(b'changed content', self.client.blobs[('cont', 'backup/dir1/file1.txt')].content)
+        self.assertIn('backup/new/file.txt', self._blob_names())
+        self.assertNotIn('backup/dir3/file3.txt', self._blob_names())
+        self.assertEqual(22, self.client.count_requests('put_block_list'))
+
+    def test_stale_manifest_lists_blobs(self):
+        self._sync()
+        # a blob deleted by someone else is uploaded again once the manifest is stale
+        self.client.delete_blob('cont', 'backup/dir0/file0.txt')
+        result = self._sync(SyncManifest(self.manifest_path, max_age=-1))
+        self.assertTrue(result.full_enumeration)
+        self.assertEqual((1, 0, 19), (result.uploaded, result.deleted, result.unchanged))
+        self.assertIn('backup/dir0/file0.txt', self._blob_names())
+
+    def test_stale_manifest_skips_touched_files(self):
+        self._sync()
+        # newer than the blobs, but the same content MD5
+        for i in range(20):
+            self._write_file('dir{}/file{}.txt'.format(i % 4, i), 'content {}'.format(i), mtime=time.time() + 60)
+        result = self._sync(SyncManifest(self.manifest_path, max_age=-1))
+        self.assertTrue(result.full_enumeration)
+        self.assertEqual((0, 0, 20), (result.uploaded, result.deleted, result.unchanged))
+
+    def test_concurrent_saves(self):
+        import threading
+        errors = []
+
+        def _save(i):
+            try:
+                for _ in range(20):
+                    SyncManifest(self.manifest_path).save(self.source, 'cont/backup{}'.format(i), {})
+            except Exception as ex:  # pylint: disable=broad-except
+                errors.append(ex)
+
+        savers = [threading.Thread(target=_save, args=(i,)) for i in range(4)]
+        for saver in savers:
+            saver.start()
+        for saver in savers:
+            saver.join()
+        self.assertEqual([], errors)
+        self.assertEqual(['manifest.gz', 'source'], sorted(os.listdir(self.test_dir)))
+
+    def test_full_enumeration_deletes_extra_blobs(self):
+        self.client.create_blob_from_bytes('cont', 'backup/extra.txt', b'')
+        self.client.create_blob_from_bytes('cont', 'other/file.txt', b'')
+        result = self._sync()
+        self.assertEqual((20, 1), (result.uploaded, result.deleted))
+        self.assertNotIn('backup/extra.txt', self._blob_names())
+        self.assertIn('other/file.txt', self._blob_names())
+
+    def test_manifest_of_another_sync(self):
+        self._sync()
+        transfer = BlockBlobTransfer(self.client, LocalBlobBlock)
+        result = sync_with_manifest(transfer, self.source, 'cont', 'other', SyncManifest(self.manifest_path))
+        self.assertTrue(result.full_enumeration)
+        self.assertEqual(20, result.uploaded)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,259 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import subprocess
+import tempfile
+import timeit
+import unittest
+
+from knack.util import CLIError
+
+from ...transfer import BlockBlobTransfer, TransferJournal
+from .storage_test_util import LocalBlobService, LocalBlobBlock
+
+BLOCK_SIZE = 1024
+
+
+class FailingBlobService(LocalBlobService):
+    """ fails the first request for the given block """
+
+    def __init__(self, fail_offset):
+        super(FailingBlobService, self).__init__()
+        self.fail_offset = fail_offset
+
+    def put_block(self, container_name, blob_name, block, block_id, **kwargs):
+        if int(block_id) * BLOCK_SIZE == self.fail_offset:
+            self.fail_offset = None
+            raise IOError('connection reset')
+        super(FailingBlobService, self).put_block(container_name, blob_name, block, block_id, **kwargs)
+
+    def get_blob_to_bytes(self, container_name, blob_name, start_range=None, end_range=None, **kwargs):
+        if start_range == self.fail_offset:
+            self.fail_offset = None
+            raise IOError('connection reset')
+        return super(FailingBlobService, self).get_blob_to_bytes(container_name, blob_name, start_range=start_range,
+                                                                 end_range=end_range, **kwargs)
+
+
+class OverwritingBlobService(LocalBlobService):
+    """ overwrites the blob with the given content before the request for the given block """
+
+    def __init__(self, overwrite_offset, content):
+        super(OverwritingBlobService, self).__init__()
+        self.overwrite_offset = overwrite_offset
+        self.content = content
+
+    def get_blob_to_bytes(self, container_name, blob_name, start_range=None, end_range=None, **kwargs):
+        if start_range == self.overwrite_offset:
+            self.overwrite_offset = None
+            self.create_blob_from_bytes(container_name, blob_name, self.content)
+        return super(OverwritingBlobService, self).get_blob_to_bytes(container_name, blob_name,
+                                                                     start_range=start_range, end_range=end_range,
+                                                                     **kwargs)
+
+
+class TestBlockBlobTransfer(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.journal_path = os.path.join(self.test_dir, 'journal.json')
+        self.content = os.urandom(BLOCK_SIZE * 10 + 100)
+        self.source = self._write_file('source.bin', self.content)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _write_file(self, name, content):
+        path = os.path.join(self.test_dir, *name.split('/'))
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def _read_file(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def _transfer(self, client, max_concurrency=4):
+        return BlockBlobTransfer(client, LocalBlobBlock, journal=TransferJournal(self.journal_path),
+                                 block_size=BLOCK_SIZE, max_concurrency=max_concurrency)
+
+    def test_upload_and_download_file(self):
+        client = LocalBlobService()
+        result = self._transfer(client).upload(self.source, 'cont', 'dir/blob.bin')[0]
+        self.assertEqual(11, result.blocks)
+        self.assertEqual(11, client.count_requests('put_block'))
+        self.assertEqual(self.content, client.blobs[('cont', 'dir/blob.bin')].content)
+
+        destination = os.path.join(self.test_dir, 'downloaded.bin')
+        result = self._transfer(client).download('cont', 'dir/blob.bin', destination)[0]
+        self.assertEqual(len(self.content), result.size)
+        self.assertEqual(self.content, self._read_file(destination))
+        self.assertFalse(os.path.exists(destination + '.partial'))
+
+    def test_upload_and_download_empty_file(self):
+        client = LocalBlobService()
+        source = self._write_file('empty', b'')
+        self._transfer(client).upload(source, 'cont', '')
+        self.assertEqual(b'', client.blobs[('cont', 'empty')].content)
+
+        destination = os.path.join(self.test_dir, 'download')
+        os.mkdir(destination)
+        self._transfer(client).download('cont', 'empty', destination)
+        self.assertEqual(b'', self._read_file(os.path.join(destination, 'empty')))
+
+    def test_resume_upload(self):
+        client = FailingBlobService(fail_offset=BLOCK_SIZE * 5)
+        with self.assertRaises(IOError):
+            self._transfer(client, max_concurrency=1).upload(self.source, 'cont', 'blob.bin')
+        self.assertNotIn(('cont', 'blob.bin'), client.blobs)
+
+        uploaded = client.count_requests('put_block')
+        result = self._transfer(client, max_concurrency=1).upload(self.source, 'cont', 'blob.bin')[0]
+        self.assertEqual(5, result.resumed_blocks)
+        self.assertEqual(uploaded + 6, client.count_requests('put_block'))
+        self.assertEqual(self.content, client.blobs[('cont', 'blob.bin')].content)
+        self.assertEqual({}, TransferJournal(self.journal_path).transfers)
+
+    def test_journal_appends_blocks(self):
+        journal = TransferJournal(self.journal_path)
+        self.assertEqual(set(), journal.start('upload|a', [10, 1.0]))
+        for index in range(100):
+            journal.add_block('upload|a', index)
+        journal.start('upload|b', [20, 2.0])
+        journal.add_block('upload|b', 0)
+        # a line per finished block since the transfer started
+        with open(self.journal_path, 'r') as journal_file:
+            self.assertEqual(3, len(journal_file.readlines()))
+
+        # a line cut short when the run was killed
+        with open(self.journal_path, 'a') as journal_file:
+            journal_file.write('{"key": "upload|b", "blo')
+        journal = TransferJournal(self.journal_path)
+        self.assertEqual(set(range(100)), journal.start('upload|a', [10, 1.0]))
+        self.assertEqual({0}, journal.start('upload|b', [20, 2.0]))
+        journal.finish('upload|a')
+        self.assertEqual(['upload|b'], list(TransferJournal(self.journal_path).transfers))
+
+    def test_changed_source_is_not_resumed(self):
+        client = FailingBlobService(fail_offset=BLOCK_SIZE * 5)
+        with self.assertRaises(IOError):
+            self._transfer(client, max_concurrency=1).upload(self.source, 'cont', 'blob.bin')
+
+        content = os.urandom(BLOCK_SIZE * 3)
+        self._write_file('source.bin', content)
+        result = self._transfer(client).upload(self.source, 'cont', 'blob.bin')[0]
+        self.assertEqual(0, result.resumed_blocks)
+        self.assertEqual(content, client.blobs[('cont', 'blob.bin')].content)
+
+    def test_resume_download(self):
+        client = FailingBlobService(fail_offset=None)
+        self._transfer(client).upload(self.source, 'cont', 'blob.bin')
+        client.fail_offset = BLOCK_SIZE * 7
+
+        destination = os.path.join(self.test_dir, 'downloaded.bin')
+        with self.assertRaises(IOError):
+            self._transfer(client, max_concurrency=1).download('cont', 'blob.bin', destination)
+        self.assertFalse(os.path.exists(destination))
+
+        result = self._transfer(client, max_concurrency=1).download('cont', 'blob.bin', destination)[0]
+        self.assertEqual(7, result.resumed_blocks)
+        self.assertEqual(self.content, self._read_file(destination))
+
+    def test_download_of_modified_blob(self):
+        new_content = os.urandom(len(self.content))
+        client = OverwritingBlobService(None, new_content)
+        self._transfer(client).upload(self.source, 'cont', 'blob.bin')
+        client.overwrite_offset = BLOCK_SIZE * 4
+
+        destination = os.path.join(self.test_dir, 'downloaded.bin')
+        with self.assertRaises(CLIError):
+            self._transfer(client, max_concurrency=1).download('cont', 'blob.bin', destination)
+        # nothing of the previous version is left to resume from
+        self.assertFalse(os.path.exists(destination))
+        self.assertFalse(os.path.exists(destination + '.partial'))
+        self.assertEqual({}, TransferJournal(self.journal_path).transfers)
+
+        result = self._transfer(client).download('cont', 'blob.bin', destination)[0]
+        self.assertEqual(0, result.resumed_blocks)
+        self.assertEqual(new_content, self._read_file(destination))
+
+    def test_recursive_upload_and_download(self):
+        client = LocalBlobService()
+        for name in ['data/a.txt', 'data/sub/b.txt', 'data/sub/deeper/c.txt']:
+            self._write_file(name, name.encode('utf-8') * 100)
+
+        source = os.path.join(self.test_dir, 'data')
+        with self.assertRaises(ValueError):
+            self._transfer(client).upload(source, 'cont', '')
+        self._transfer(client).upload(source, 'cont', 'backup', recursive=True)
+        self.assertEqual(['backup/data/a.txt', 'backup/data/sub/b.txt', 'backup/data/sub/deeper/c.txt'],
+                         sorted(name for _, name in client.blobs))
+
+        self._transfer(client).upload(source + os.path.sep + '*', 'cont', 'flat', recursive=True)
+        self.assertIn(('cont', 'flat/sub/b.txt'), client.blobs)
+
+        destination = os.path.join(self.test_dir, 'restore')
+        self._transfer(client).download('cont', 'backup/data', destination, recursive=True)
+        self.assertEqual(b'data/sub/deeper/c.txt' * 100,
+                         self._read_file(os.path.join(destination, 'data', 'sub', 'deeper', 'c.txt')))
+
+
+class TestTransferThroughput(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.test_dir, 'source.bin')
+        with open(self.source, 'wb') as f:
+            f.write(os.urandom(BLOCK_SIZE * 32))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _time_upload(self, max_concurrency):
+        # every request takes 10ms, as to a storage account in the same region
+        client = LocalBlobService(latency=0.01)
+        transfer = BlockBlobTransfer(client, LocalBlobBlock, block_size=BLOCK_SIZE, max_concurrency=max_concurrency)
+        start = timeit.default_timer()
+        transfer.upload(self.source, 'cont', 'blob.bin')
+        return timeit.default_timer() - start
+
+    def test_parallel_upload_throughput(self):
+        serial = self._time_upload(1)
+        parallel = self._time_upload(8)
+        self.assertLess(parallel, serial / 2)
+
+    @unittest.skipUnless(os.environ.get('AZURE_STORAGE_BENCHMARK_CONTAINER_URL'),
+                         'set AZURE_STORAGE_BENCHMARK_CONTAINER_URL to a container url with a SAS token')
+    def test_native_and_azcopy_upload_throughput(self):
+        from six.moves.urllib.parse import urlparse
+        from azure.multiapi.storage.v2018_03_28.blob import BlockBlobService, BlobBlock
+        from ...azcopy.util import AzCopy
+
+        url = os.environ['AZURE_STORAGE_BENCHMARK_CONTAINER_URL']
+        parsed = urlparse(url)
+        size = int(os.environ.get('AZURE_STORAGE_BENCHMARK_SIZE', 256 * 1024 * 1024))
+        source = os.path.join(self.test_dir, 'benchmark.bin')
+        with open(source, 'wb') as f:
+            f.write(os.urandom(size))
+
+        client = BlockBlobService(account_name=parsed.netloc.split('.')[0], sas_token=parsed.query)
+        start = timeit.default_timer()
+        BlockBlobTransfer(client, BlobBlock).upload(source, parsed.path.strip('/'), 'native.bin')
+        native = timeit.default_timer() - start
+
+        start = timeit.default_timer()
+        destination = '{}://{}{}/azcopy.bin?{}'.format(parsed.scheme, parsed.netloc, parsed.path.rstrip('/'),
+                                                       parsed.query)
+        subprocess.call([AzCopy().executable, 'copy', source, destination])
+        azcopy = timeit.default_timer() - start
+
+        print('native: {:.2f} MiB/s, azcopy: {:.2f} MiB/s'.format(size / native / 1024 / 1024,
+                                                                  size / azcopy / 1024 / 1024))
+
+
+if __name__ == '__main__':
+    unittest.main()
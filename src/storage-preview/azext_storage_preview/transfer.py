@@ -0,0 +1,302 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+A block blob transfer engine, used in place of AzCopy. Files are split into blocks which are uploaded or downloaded
+over a bounded thread pool, and the finished blocks are recorded in a local journal so interrupted transfers resume.
+"""
+
+import json
+import mmap
+import os
+import tempfile
+import threading
+import timeit
+
+from knack.log import get_logger
+from knack.util import CLIError
+
+logger = get_logger(__name__)
+
+BLOCK_SIZE = 8 * 1024 * 1024
+MAX_CONCURRENCY = 8
+JOURNAL_FILE_NAME = 'storage_transfer_journal.json'
+PARTIAL_DOWNLOAD_SUFFIX = '.partial'
+
+
+class TransferJournal(object):
+    """
+    Records the blocks of each transfer that are done, keyed by transfer. The journal file has a JSON line per
+    record, a finished block appends a line and the file is only rewritten with the unfinished transfers when a
+    transfer starts or finishes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.transfers = {}
+        self._journal_file = None
+        if path and os.path.exists(path):
+            self._load()
+
+    def start(self, key, state):
+        """
+        Start or resume a transfer. The finished blocks are only kept when the transfer state, e.g. the size and
+        modification time of the source, is unchanged. Returns the set of finished block indexes.
+        """
+        with self.lock:
+            transfer = self.transfers.get(key)
+            if not transfer or transfer['state'] != state:
+                transfer = self.transfers[key] = {'state': state, 'blocks': []}
+            self._compact()
+            return set(transfer['blocks'])
+
+    def add_block(self, key, index):
+        with self.lock:
+            self.transfers[key]['blocks'].append(index)
+            self._append({'key': key, 'block': index})
+
+    def finish(self, key):
+        with self.lock:
+            self.transfers.pop(key, None)
+            self._compact()
+
+    def _load(self):
+        with open(self.path, 'r') as journal_file:
+            for line in journal_file:
+                try:
+                    record = json.loads(line)
+                    if 'state' in record:
+                        self.transfers[record['key']] = {'state': record['state'], 'blocks': record['blocks']}
+                    else:
+                        self.transfers[record['key']]['blocks'].append(record['block'])
+                except (ValueError, KeyError, TypeError):
+                    # e.g. the last line of a run that was killed while writing it
+                    logger.warning('Ignoring the corrupted records of the transfer journal %s', self.path)
+                    break
+
+    def _append(self, record):
+        if not self.path:
+            return
+        if self._journal_file is None:
+            self._journal_file = open(self.path, 'a')
+        self._journal_file.write(json.dumps(record) + '\n')
+        self._journal_file.flush()
+
+    def _compact(self):
+        """ rewrite the journal with a line per unfinished transfer, replacing it at once """
+        if not self.path:
+            return
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)),
+                                         prefix=os.path.basename(self.path))
+        with os.fdopen(fd, 'w') as journal_file:
+            for key, transfer in self.transfers.items():
+                journal_file.write(json.dumps({'key': key, 'state': transfer['state'],
+                                               'blocks': transfer['blocks']}) + '\n')
+        if hasattr(os, 'replace'):
+            os.replace(temp_path, self.path)
+        else:
+            # Python 2.x: os.rename does not overwrite existing files on Windows
+            if os.name == 'nt' and os.path.exists(self.path):
+                os.remove(self.path)
+            os.rename(temp_path, self.path)
+
+
+class TransferResult(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, source, destination, size, blocks, resumed_blocks, elapsed, etag=None):
+        self.source = source
+        self.destination = destination
+        self.size = size
+        self.blocks = blocks
+        self.resumed_blocks = resumed_blocks
+        self.elapsed = elapsed
+        self.etag = etag
+
+
+class BlockBlobTransfer(object):
+    """
+    Uploads and downloads block blobs in parallel blocks.
+
+    :param client: A BlockBlobService, or any client with its put_block, put_block_list, get_blob_properties,
+        get_blob_to_bytes and list_blobs operations.
+    :param block_cls: The class of the blocks committed with put_block_list, e.g. BlobBlock.
+    :param content_settings_cls: The class of the content settings committed with put_block_list, e.g.
+        ContentSettings. Without it the content MD5 of the files is not set on their blobs.
+    """
+
+    def __init__(self, client, block_cls, journal=None, block_size=BLOCK_SIZE, max_concurrency=MAX_CONCURRENCY,
+                 content_settings_cls=None):
+        self.client = client
+        self.block_cls = block_cls
+        self.content_settings_cls = content_settings_cls
+        self.journal = journal or TransferJournal(None)
+        self.block_size = block_size
+        self.max_concurrency = max_concurrency
+
+    def upload(self, source, container, blob_path, recursive=False):
+        """ Upload a file, or the files of a directory, following the AzCopy destination rules. """
+        blob_path = (blob_path or '').strip('/')
+        contents_only = source.endswith('*')
+        source = source.rstrip('*')
+        if os.path.isfile(source):
+            if not blob_path:
+                blob_path = os.path.basename(source)
+            return [self.upload_file(source, container, blob_path)]
+
+        if not os.path.isdir(source):
+            raise ValueError('The source {} does not exist.'.format(source))
+        if not recursive:
+            raise ValueError('usage error: --recursive is required to upload the directory {}.'.format(source))
+
+        source = os.path.normpath(source)
+        prefix = blob_path if contents_only else '/'.join(filter(None, (blob_path, os.path.basename(source))))
+        results = []
+        for root, _, files in os.walk(source):
+            for file_name in sorted(files):
+                file_path = os.path.join(root, file_name)
+                relative_path = os.path.relpath(file_path, source).replace(os.path.sep, '/')
+                results.append(self.upload_file(file_path, container, '/'.join(filter(None, (prefix, relative_path)))))
+        return results
+
+    def download(self, container, blob_path, destination, recursive=False):
+        """ Download a blob, or the blobs of a virtual directory, following the AzCopy destination rules. """
+        blob_path = (blob_path or '').strip('/')
+        if not recursive:
+            if os.path.isdir(destination):
+                destination = os.path.join(destination, blob_path.split('/')[-1])
+            return [self.download_blob(container, blob_path, destination)]
+
+        contents_only = not blob_path or blob_path == '*'
+        prefix = '' if contents_only else blob_path + '/'
+        root = destination if contents_only else os.path.join(destination, blob_path.split('/')[-1])
+        results = []
+        for blob in self.client.list_blobs(container, prefix=prefix or None):
+            relative_path = blob.name[len(prefix):]
+            if not relative_path or relative_path.endswith('/'):
+                continue
+            results.append(self.download_blob(container, blob.name, os.path.join(root, *relative_path.split('/'))))
+        return results
+
+    def upload_file(self, source_path, container, blob_name, content_md5=None):
+        """
+        Upload a file into a block blob, skipping the blocks a previous run of the transfer uploaded. The base64
+        encoded content_md5 of the file is set on the blob, put_block_list does not compute it.
+        """
+        start_time = timeit.default_timer()
+        source_path = os.path.abspath(source_path)
+        stat = os.stat(source_path)
+        size = stat.st_size
+        block_count = _block_count(size, self.block_size)
+        key = 'upload|{}|{}/{}'.format(source_path, container, blob_name)
+        done = self.journal.start(key, [size, stat.st_mtime, self.block_size])
+
+        if size:
+            with open(source_path, 'rb') as source_file:
+                source_map = mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    def _put_block(index):
+                        start = index * self.block_size
+                        self.client.put_block(container, blob_name, source_map[start:start + self.block_size],
+                                              _block_id(index))
+                        self.journal.add_block(key, index)
+
+                    self._run([index for index in range(block_count) if index not in done], _put_block)
+                finally:
+                    source_map.close()
+
+        content_settings = None
+        if content_md5 and self.content_settings_cls:
+            content_settings = self.content_settings_cls(content_md5=content_md5)
+        properties = self.client.put_block_list(container, blob_name, [self.block_cls(id=_block_id(index))
+                                                                       for index in range(block_count)],
+                                                content_settings=content_settings)
+        self.journal.finish(key)
+        return TransferResult(source_path, '{}/{}'.format(container, blob_name), size, block_count,
+                              len(done), timeit.default_timer() - start_time, etag=getattr(properties, 'etag', None))
+
+    def download_blob(self, container, blob_name, destination_path):
+        """ Download a blob in ranges written into a memory mapped file, renamed to the destination when done. """
+        start_time = timeit.default_timer()
+        properties = self.client.get_blob_properties(container, blob_name).properties
+        size = properties.content_length
+        block_count = _block_count(size, self.block_size)
+        destination_path = os.path.abspath(destination_path)
+        partial_path = destination_path + PARTIAL_DOWNLOAD_SUFFIX
+        key = 'download|{}/{}|{}'.format(container, blob_name, destination_path)
+        if not os.path.exists(partial_path) or os.path.getsize(partial_path) != size:
+            # the downloaded blocks are gone with the partial file
+            self.journal.finish(key)
+        done = self.journal.start(key, [size, properties.etag, self.block_size])
+
+        parent = os.path.dirname(destination_path)
+        if parent and not os.path.isdir(parent):
+            os.makedirs(parent)
+        with open(partial_path, 'ab') as partial_file:
+            partial_file.truncate(size)
+
+        if size:
+            try:
+                with open(partial_path, 'r+b') as partial_file:
+                    destination_map = mmap.mmap(partial_file.fileno(), size)
+                    try:
+                        def _get_block(index):
+                            start = index * self.block_size
+                            end = min(start + self.block_size, size) - 1
+                            # the blocks of another version of the blob must not be mixed in
+                            data = self.client.get_blob_to_bytes(container, blob_name, start_range=start,
+                                                                 end_range=end, if_match=properties.etag).content
+                            destination_map[start:end + 1] = data
+                            self.journal.add_block(key, index)
+
+                        self._run([index for index in range(block_count) if index not in done], _get_block)
+                        destination_map.flush()
+                    finally:
+                        destination_map.close()
+            except Exception as ex:  # pylint: disable=broad-except
+                if getattr(ex, 'status_code', None) != 412:
+                    raise
+                # the blob was overwritten, the blocks downloaded are of the previous version
+                self.journal.finish(key)
+                os.remove(partial_path)
+                raise CLIError('The blob {}/{} was modified during the download. Run the command again to download '
+                               'it from the start.'.format(container, blob_name))
+
+        if os.path.exists(destination_path):
+            os.remove(destination_path)
+        os.rename(partial_path, destination_path)
+        self.journal.finish(key)
+        return TransferResult('{}/{}'.format(container, blob_name), destination_path, size, block_count,
+                              len(done), timeit.default_timer() - start_time)
+
+    def _run(self, indexes, transfer_block):
+        """ Transfer the blocks over the thread pool, at most max_concurrency blocks are in memory at a time. """
+        if not indexes:
+            return
+        if self.max_concurrency <= 1 or len(indexes) == 1:
+            for index in indexes:
+                transfer_block(index)
+            return
+
+        import concurrent.futures
+        with concurrent.futures.ThreadPoolExecutor(self.max_concurrency) as executor:
+            futures = [executor.submit(transfer_block, index) for index in indexes]
+            for future in concurrent.futures.as_completed(futures):
+                if future.exception() is not None:
+                    # stop at the first failure, the finished blocks are in the journal to resume from
+                    for pending in futures:
+                        pending.cancel()
+                    raise future.exception()
+
+
+def _block_count(size, block_size):
+    return (size + block_size - 1) // block_size
+
+
+def _block_id(index):
+    # the block ids of a blob must all be the same length, the client base64 encodes them
+    return '{:032d}'.format(index)
@@ -6,10 +6,17 @@
 
 import os
 
+# how many directories of a file share are listed at a time
+MAX_LIST_CONNECTIONS = 8
+# how many items of a streamed output are written at a time
+STREAM_FLUSH_SIZE = 100
+
 
 def collect_blobs(blob_service, container, pattern=None):
     """
-    List the blobs in the given blob container, filter the blob by comparing their path to the given pattern.
+    List the blobs in the given blob container, filter the blob by comparing their path to the given pattern, with
+    the fnmatch syntax of the other globs of this module. The blobs are listed from the literal prefix of the pattern,
+    the virtual directories before its first '*' one level at a time, and yielded as the pages are listed.
     """
     if not blob_service:
         raise ValueError('missing parameter blob_service')
@@ -18,20 +25,38 @@ def collect_blobs(blob_service, container, pattern=None):
         raise ValueError('missing parameter container')
 
     if not _pattern_has_wildcards(pattern):
-        return [pattern] if blob_service.exists(container, pattern) else []
+        return _existing_blob(blob_service, container, pattern)
+    return _list_matching_blobs(blob_service, container, pattern)
 
-    results = []
-    for blob in blob_service.list_blobs(container):
-        try:
-            blob_name = blob.name.encode(
-                'utf-8') if isinstance(blob.name, unicode) else blob.name
-        except NameError:
-            blob_name = blob.name
 
-        if not pattern or _match_path(blob_name, pattern):
-            results.append(blob_name)
+def _existing_blob(blob_service, container, blob_name):
+    if blob_service.exists(container, blob_name):
+        yield blob_name
+
+
+def _list_matching_blobs(blob_service, container, pattern):
+    from collections import deque
+    if not pattern:
+        for blob in blob_service.list_blobs(container):
+            yield _to_native_str(blob.name)
+        return
+
+    match = compile_blob_pattern(pattern)
+    can_contain_match = _compile_directory_filter(pattern, normcase=lambda path: path, sep='/')
+    # '*' matches '/' too, the virtual directories can only be told apart before it
+    directory_levels = pattern.split('*', 1)[0].count('/')
 
-    return results
+    queue = deque([_literal_prefix(pattern)])
+    while queue:
+        prefix = queue.popleft()
+        by_directory = prefix.count('/') < directory_levels
+        for item in blob_service.list_blobs(container, prefix=prefix or None, delimiter='/' if by_directory else None):
+            name = _to_native_str(item.name)
+            if by_directory and name.endswith('/'):
+                if can_contain_match(name):
+                    queue.append(name)
+            elif match(name):
+                yield name
 
 
 def collect_files(cmd, file_service, share, pattern=None):
@@ -69,34 +94,187 @@ def filter_none(iterable):
     return (x for x in iterable if x is not None)
 
 
-def glob_files_locally(folder_path, pattern):
-    """glob files in local folder based on the given pattern"""
+def glob_files_locally(folder_path, pattern, with_stat=False):
+    """
+    glob files in local folder based on the given pattern. Only the directories whose path can lead to a match are
+    scanned. With with_stat, the stat of each file is yielded too, as the directory scan returns it.
+    """
 
     pattern = os.path.join(
         folder_path, pattern.lstrip('/')) if pattern else None
+    if pattern:
+        import re
+        from fnmatch import translate
+        match_pattern = re.compile(translate(os.path.normcase(pattern))).match
+        can_contain_match = _compile_directory_filter(pattern)
 
     len_folder_path = len(folder_path) + 1
-    for root, _, files in os.walk(folder_path):
-        for f in files:
-            full_path = os.path.join(root, f)
-            if not pattern or _match_path(full_path, pattern):
-                yield (full_path, full_path[len_folder_path:])
+    directories = [folder_path]
+    while directories:
+        sub_directories = []
+        try:
+            entries = list(_scandir(directories.pop()))
+        except OSError:
+            # like os.walk, the directories that cannot be scanned are skipped
+            continue
+        for entry in entries:
+            full_path = entry.path
+            if _is_directory(entry):
+                if not entry.is_symlink() and (not pattern or can_contain_match(full_path)):
+                    sub_directories.append(full_path)
+            elif not pattern or match_pattern(os.path.normcase(full_path)):
+                if with_stat:
+                    yield (full_path, full_path[len_folder_path:], entry.stat())
+                else:
+                    yield (full_path, full_path[len_folder_path:])
+        # scanned depth first in the order they are listed, as os.walk does
+        directories.extend(reversed(sub_directories))
+
+
+def _scandir(path):
+    try:
+        return os.scandir(path)
+    except AttributeError:  # Python 2
+        return (_DirEntry(path, name) for name in os.listdir(path))
+
+
+def _is_directory(entry):
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+
+class _DirEntry(object):
+    """ the parts of os.DirEntry used, where os.scandir is not available """
+
+    def __init__(self, directory, name):
+        self.name = name
+        self.path = os.path.join(directory, name)
+
+    def is_dir(self):
+        return os.path.isdir(self.path)
+
+    def is_symlink(self):
+        return os.path.islink(self.path)
+
+    def stat(self):
+        return os.stat(self.path)
+
+
+def _compile_directory_filter(pattern, normcase=os.path.normcase, sep=os.path.sep):
+    """
+    A function telling if a directory can contain a path matching the pattern. Before its first '*' the pattern
+    matches one character for each literal, '?' or '[seq]', so a directory can only contain a match when its path
+    matches that part character by character.
+    """
+    import re
+    from fnmatch import translate
+    pattern = normcase(pattern)
+    matchers = []
+    i, n = 0, len(pattern)
+    while i < n and pattern[i] != '*':
+        c = pattern[i]
+        end = -1
+        if c == '[':
+            # the end of the sequence, as fnmatch finds it
+            j = i + 1
+            if j < n and pattern[j] == '!':
+                j += 1
+            if j < n and pattern[j] == ']':
+                j += 1
+            end = pattern.find(']', j)
+        if end != -1:
+            matchers.append(re.compile(translate(pattern[i:end + 1])).match)
+            i = end + 1
+        else:
+            matchers.append(re.compile(translate(c)).match)
+            i += 1
+    # without a '*' the matching paths are no longer than the pattern
+    has_wildcard_tail = i < n
+
+    def _can_contain_match(directory_path):
+        directory_path = normcase(directory_path)
+        if not directory_path.endswith(sep):
+            directory_path += sep
+        if len(directory_path) >= len(matchers) and not has_wildcard_tail:
+            return False
+        return all(match(c) for match, c in zip(matchers, directory_path))
 
+    return _can_contain_match
 
-def glob_files_remotely(cmd, client, share_name, pattern):
-    """glob the files in remote file share based on the given pattern"""
+
+def glob_files_remotely(cmd, client, share_name, pattern, max_connections=MAX_LIST_CONNECTIONS):
+    """
+    glob the files in remote file share based on the given pattern. The directories are listed in parallel, at most
+    max_connections at a time, skipping the directories outside the literal prefix of the pattern. The files are
+    yielded as their directories are listed.
+    """
     from collections import deque
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
     t_dir, t_file = cmd.get_models('file.models#Directory', 'file.models#File')
+    prefix = os.path.normcase(_literal_prefix(pattern))
+
+    def _can_match(directory):
+        directory = os.path.normcase(os.path.join(directory, ''))
+        return directory.startswith(prefix) or prefix.startswith(directory)
+
+    def _list(directory):
+        return directory, list(client.list_directories_and_files(share_name, directory))
 
     queue = deque([""])
-    while queue:
-        current_dir = queue.pop()
-        for f in client.list_directories_and_files(share_name, current_dir):
-            if isinstance(f, t_file):
-                if not pattern or _match_path(os.path.join(current_dir, f.name), pattern):
-                    yield current_dir, f.name
-            elif isinstance(f, t_dir):
-                queue.appendleft(os.path.join(current_dir, f.name))
+    running = set()
+    with ThreadPoolExecutor(max_workers=max_connections) as executor:
+        try:
+            while queue or running:
+                while queue and len(running) < max_connections:
+                    running.add(executor.submit(_list, queue.popleft()))
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    current_dir, items = future.result()
+                    for f in items:
+                        if isinstance(f, t_file):
+                            if not pattern or _match_path(os.path.join(current_dir, f.name), pattern):
+                                yield current_dir, f.name
+                        elif isinstance(f, t_dir):
+                            sub_dir = os.path.join(current_dir, f.name)
+                            if not pattern or _can_match(sub_dir):
+                                queue.append(sub_dir)
+        finally:
+            # when the caller stops early or a listing fails, the listings not started yet are not run
+            for future in running:
+                future.cancel()
+
+
+def stream_output(cmd, items, stream=None, flush_size=STREAM_FLUSH_SIZE):
+    """
+    Write the items as they are iterated, as TSV rows with the tsv output format and as JSON lines otherwise, so
+    only flush_size items are held in memory at a time.
+    """
+    import json
+    import sys
+    from azure.cli.core.util import todict
+    from knack.output import format_tsv
+    from knack.util import CommandResultItem
+
+    stream = stream or sys.stdout
+    output_format = cmd.cli_ctx.invocation.data.get('output') if cmd.cli_ctx.invocation else None
+    page = []
+
+    def _write_page():
+        if output_format == 'tsv':
+            stream.write(format_tsv(CommandResultItem(page)))
+        else:
+            stream.write(''.join(json.dumps(item, sort_keys=True) + '\n' for item in page))
+        stream.flush()
+        del page[:]
+
+    for item in items:
+        page.append(todict(item))
+        if len(page) >= flush_size:
+            _write_page()
+    if page:
+        _write_page()
 
 
 def create_short_lived_blob_sas(cmd, account_name, account_key, container, blob):
@@ -178,6 +356,29 @@ def _match_path(path, pattern):
     return fnmatch(path, pattern)
 
 
+def _literal_prefix(pattern):
+    """ the part of the pattern before its first wildcard """
+    import re
+    return re.split(r'[*?[]', pattern or '', maxsplit=1)[0]
+
+
+def compile_blob_pattern(pattern):
+    """
+    Compile a blob path pattern into a function matching a blob name, as fnmatch.fnmatchcase does. Blob names are
+    case sensitive on every platform.
+    """
+    import re
+    from fnmatch import translate
+    return re.compile(translate(pattern)).match
+
+
+def _to_native_str(name):
+    try:
+        return name.encode('utf-8') if isinstance(name, unicode) else name  # pylint: disable=undefined-variable
+    except NameError:
+        return name
+
+
 def guess_content_type(file_path, original, settings_class):
     if original.content_encoding or original.content_type:
         return original